@@ -1,16 +1,8 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
-from modules.content_generator import ContentGenerator
-from modules.campaign_manager import CampaignManager
-from modules.competitor_analyzer import CompetitorAnalyzer
-from modules.influencer_finder import InfluencerFinder
-from modules.user_manager import UserManager
-from modules.dashboard_manager import DashboardManager
 from modules.logger_config import LoggerConfig
-from modules.trend_analyzer import TrendAnalyzer
-from modules.notification_manager import NotificationManager
-from modules.cache_manager import CacheManager
+from modules.service_container import ServiceContainer
 
 # Cargar variables de entorno
 load_dotenv()
@@ -22,16 +14,30 @@ logger.info('Iniciando aplicación')
 # Configurar modo de depuración
 debug_mode = os.getenv('DEBUG', 'False').lower() == 'true'
 
-# Inicialización de módulos
+@st.cache_resource
+def get_services() -> ServiceContainer:
+    """Construye el contenedor de servicios una sola vez por proceso del servidor"""
+    services = ServiceContainer()
+    # Servicios necesarios en todas las páginas; el resto se construye al usar su función
+    services.get('user_manager')
+    services.get('dashboard_manager')
+    logger.info(f'Tiempos de arranque:\n{services.profiler.format_report()}')
+    return services
+
+def get_service(name: str):
+    """Obtiene un servicio compartido, deteniendo la página si no se puede inicializar"""
+    try:
+        return services.get(name)
+    except Exception as e:
+        logger.error(f'Error al inicializar {name}: {str(e)}')
+        st.error('Error al inicializar la aplicación. Por favor, contacte al administrador.')
+        st.stop()
+
+# Inicialización de módulos (compartidos entre sesiones y reruns)
 try:
-    content_gen = ContentGenerator()
-    campaign_mgr = CampaignManager()
-    competitor_analyzer = CompetitorAnalyzer()
-    influencer_finder = InfluencerFinder()
-    user_manager = UserManager()
-    dashboard_manager = DashboardManager()
-    trend_analyzer = TrendAnalyzer()
-    notification_manager = NotificationManager()
+    services = get_services()
+    user_manager = services.get('user_manager')
+    dashboard_manager = services.get('dashboard_manager')
     logger.info('Módulos inicializados correctamente')
 except Exception as e:
     logger.error(f'Error al inicializar módulos: {str(e)}')
@@ -134,11 +140,11 @@ with main_container:
             if st.button("Generar Contenido"):
                 with st.spinner("Generando contenido..."):
                     if tipo_contenido == "Post de producto":
-                        result = content_gen.generate_social_post(tienda_url, plataforma)
+                        result = get_service('content_generator').generate_social_post(tienda_url, plataforma)
                     elif tipo_contenido == "Historia":
-                        result = content_gen.generate_story(tienda_url)
+                        result = get_service('content_generator').generate_story(tienda_url)
                     else:  # Descripción SEO
-                        result = content_gen.generate_seo_description(tienda_url)
+                        result = get_service('content_generator').generate_seo_description(tienda_url)
                     
                     if 'error' not in result:
                         st.success("¡Contenido generado!")
@@ -151,7 +157,7 @@ with main_container:
             nicho = st.text_input("Nicho de mercado (ej: ropa, accesorios, etc.)")
             if st.button("Analizar Competencia"):
                 with st.spinner("Analizando competencia..."):
-                    result = competitor_analyzer.analyze_competition(tienda_url, nicho)
+                    result = get_service('competitor_analyzer').analyze_competition(tienda_url, nicho)
                     if 'error' not in result:
                         st.success("¡Análisis completado!")
                         
@@ -164,6 +170,16 @@ with main_container:
                         for i, comp in enumerate(result['competitor_features'], 1):
                             st.write(f"Competidor {i}")
                             st.json(comp)
+                        if result.get('failed_competitors'):
+                            st.warning(f"No se pudieron analizar {len(result['failed_competitors'])} competidores")
+                        
+                        # Mostrar la posición del precio propio en el nicho
+                        position = result.get('price_position', {})
+                        if position.get('count'):
+                            st.subheader("Posición de tu precio")
+                            st.metric("Percentil", f"{position.get('percentile', 0):.0f}")
+                            st.metric("Mediana del nicho", f"${position['median']:,.2f}")
+                            st.metric("Rango intercuartil", f"${position['iqr']:,.2f}")
                         
                         # Mostrar recomendaciones
                         st.subheader("Recomendaciones")
@@ -187,7 +203,7 @@ with main_container:
             if st.button("Generar Plantilla"):
                 with st.spinner("Generando plantilla..."):
                     if tipo_plantilla == "Cupón de lanzamiento":
-                        result = campaign_mgr.generate_coupon(tienda_data)
+                        result = get_service('campaign_manager').generate_coupon(tienda_data)
                         if 'error' not in result:
                             st.success("¡Cupón generado!")
                             st.code(result['imagen'], language='svg')
@@ -195,7 +211,7 @@ with main_container:
                             st.error(result['error'])
                     
                     elif tipo_plantilla == "Email marketing":
-                        result = campaign_mgr.generate_email('bienvenida', tienda_data)
+                        result = get_service('campaign_manager').generate_email('bienvenida', tienda_data)
                         if 'error' not in result:
                             st.success("¡Email generado!")
                             st.code(result['contenido'], language='html')
@@ -203,7 +219,7 @@ with main_container:
                             st.error(result['error'])
                     
                     else:  # Historia de Instagram
-                        result = campaign_mgr.generate_story('producto', tienda_data)
+                        result = get_service('campaign_manager').generate_story('producto', tienda_data)
                         if 'error' not in result:
                             st.success("¡Historia generada!")
                             st.code(result['imagen'], language='svg')
@@ -216,7 +232,7 @@ with main_container:
             ubicacion = st.text_input("Ubicación (ciudad/provincia en Argentina):")
             if st.button("Buscar Influencers"):
                 with st.spinner("Buscando influencers..."):
-                    result = influencer_finder.find_influencers(nicho, ubicacion)
+                    result = get_service('influencer_finder').find_influencers(nicho, ubicacion)
                     if 'error' not in result:
                         st.success(f"¡Se encontraron {result['total_found']} influencers!")
                         
@@ -233,7 +249,7 @@ with main_container:
             st.header("📈 Análisis Predictivo de Tendencias")
             if st.button("Analizar Tendencias"):
                 with st.spinner("Analizando tendencias..."):
-                    result = trend_analyzer.analyze_trends(tienda_url)
+                    result = get_service('trend_analyzer').analyze_trends(tienda_url)
                     if 'error' not in result:
                         st.success("¡Análisis completado!")
                         
@@ -260,7 +276,7 @@ with main_container:
             st.header("🔔 Centro de Notificaciones")
             
             # Verificar alertas
-            alerts = notification_manager.check_alerts(tienda_url)
+            alerts = get_service('notification_manager').check_alerts(tienda_url)
             
             if alerts:
                 for alert in alerts:
@@ -1,14 +1,75 @@
 import os
-from typing import Dict, List, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 import requests
 from datetime import datetime
 from dotenv import load_dotenv
 from .logger_config import LoggerConfig
-from .cache_manager import CacheManager
+from .cache_registry import get_cache
+from .http_client import RateLimitedError, get_http_client
+from .resilience import CircuitOpenError, get_resilience, is_transient_error
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Máximo de elementos por página que acepta la API de Tiendanube
+MAX_PER_PAGE = 200
+
+# Hilos que descargan la página siguiente mientras se consume la actual
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('API_PREFETCH_WORKERS', 4)),
+    thread_name_prefix='api-prefetch'
+)
+
+
+class PageIterator:
+    """Recorre un listado paginado de la API elemento por elemento, descargando la página siguiente por adelantado
+
+    Solo mantiene en memoria la página actual y la siguiente. `cursor` indica
+    la posición para retomar el recorrido más tarde; si la API devuelve un
+    error el recorrido termina y el error queda en `error`.
+    """
+
+    def __init__(self, fetch_page: Callable[[int, int], Union[Dict, List]], per_page: int = 50,
+                 cursor: Optional[Dict[str, int]] = None):
+        self._fetch_page = fetch_page
+        self.per_page = max(1, min(per_page, MAX_PER_PAGE))
+        self.page = (cursor or {}).get('page', 1)
+        self.index = (cursor or {}).get('index', 0)
+        self.error: Optional[str] = None
+        self._next: Optional[Future] = None
+
+    @property
+    def cursor(self) -> Dict[str, int]:
+        """Posición del próximo elemento a entregar"""
+        return {'page': self.page, 'index': self.index}
+
+    def __iter__(self) -> Iterator[Any]:
+        items = self._fetch(self.page)
+        while items:
+            # La página siguiente se descarga mientras se consume la actual
+            if len(items) >= self.per_page:
+                self._next = _prefetch_executor.submit(self._fetch, self.page + 1)
+            while self.index < len(items):
+                item = items[self.index]
+                self.index += 1
+                yield item
+
+            if self._next is None:
+                return
+            items = self._next.result()
+            self._next = None
+            self.page += 1
+            self.index = 0
+
+    def _fetch(self, page: int) -> List:
+        """Descarga una página y registra el error si la API no devuelve una lista"""
+        data = self._fetch_page(page, self.per_page)
+        if isinstance(data, dict) and 'error' in data:
+            self.error = data['error']
+            return []
+        return data if isinstance(data, list) else []
+
 class ApiCrudManager:
     def __init__(self):
         try:
@@ -21,8 +82,18 @@ class ApiCrudManager:
             self.app_id = os.getenv('TIENDANUBE_APP_ID')
             self.client_secret = os.getenv('TIENDANUBE_CLIENT_SECRET')
             
+            # Cliente HTTP con conexiones keep-alive compartidas
+            self.http = get_http_client()
+            self.resilience = get_resilience()
+            
             # Configurar caché
-            self.cache = CacheManager(expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            self.cache = get_cache('tiendanube_api', expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            # Margen durante el cual se sirven datos vencidos mientras se revalidan
+            self.stale_seconds = int(os.getenv('CACHE_STALE_MINUTES', 30)) * 60
+            
+            # Escrituras masivas: pedidos simultáneos y rondas de reintento de los fallidos
+            self.bulk_workers = int(os.getenv('API_BULK_WORKERS', 8))
+            self.bulk_retries = int(os.getenv('API_BULK_RETRIES', 2))
             
             # Configurar headers comunes
             self.headers = {
@@ -39,28 +110,39 @@ class ApiCrudManager:
         """Realiza una petición a la API de Tiendanube"""
         try:
             url = f"{self.api_url}/{endpoint}"
-            response = requests.request(method, url, headers=self.headers, json=data)
+            response = self.http.request(method, url, headers=self.headers, json=data)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error en la petición a la API: {str(e)}")
             return {'error': str(e)}
     
+    def _cached_get(self, cache_key: str, endpoint: str, stale_ttl: float = 0,
+                    tags: Optional[Callable[[Union[Dict, List]], List[str]]] = None) -> Dict:
+        """Obtiene un recurso desde el caché o la API, unificando pedidos concurrentes"""
+        return self.cache.get_or_compute(
+            cache_key,
+            lambda: self._make_request('GET', endpoint),
+            should_cache=lambda data: 'error' not in data,
+            stale_ttl=stale_ttl,
+            tags=tags
+        )
+    
+    @staticmethod
+    def _item_tags(data: Union[Dict, List], tag_format: str) -> List[str]:
+        """Genera una etiqueta por cada elemento de una página para invalidarla al modificarlo"""
+        items = data if isinstance(data, list) else []
+        return [tag_format.format(id=item['id']) for item in items if isinstance(item, dict) and 'id' in item]
+    
     def get_stores(self, page: int = 1, limit: int = 10) -> Dict:
         """Obtiene la lista de tiendas"""
         try:
             cache_key = f"stores_page_{page}_limit_{limit}"
-            cached_data = self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
             endpoint = f"stores?page={page}&per_page={limit}"
-            data = self._make_request('GET', endpoint)
-            
-            if 'error' not in data:
-                self.cache.set(cache_key, data)
-            
-            return data
+            return self._cached_get(
+                cache_key, endpoint,
+                tags=lambda data: ['stores'] + self._item_tags(data, 'store:{id}')
+            )
         except Exception as e:
             self.logger.error(f"Error al obtener tiendas: {str(e)}")
             return {'error': str(e)}
@@ -69,17 +151,9 @@ class ApiCrudManager:
         """Obtiene información de una tienda específica"""
         try:
             cache_key = f"store_{store_id}"
-            cached_data = self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
             endpoint = f"store/{store_id}"
-            data = self._make_request('GET', endpoint)
-            
-            if 'error' not in data:
-                self.cache.set(cache_key, data)
-            
-            return data
+            return self._cached_get(cache_key, endpoint, stale_ttl=self.stale_seconds,
+                                    tags=lambda data: [f"store:{store_id}"])
         except Exception as e:
             self.logger.error(f"Error al obtener tienda {store_id}: {str(e)}")
             return {'error': str(e)}
@@ -88,7 +162,13 @@ class ApiCrudManager:
         """Crea una nueva tienda"""
         try:
             endpoint = "stores"
-            return self._make_request('POST', endpoint, store_data)
+            data = self._make_request('POST', endpoint, store_data)
+            
+            if 'error' not in data:
+                # La nueva tienda desplaza la paginación de los listados
+                self.cache.invalidate_tag('stores')
+            
+            return data
         except Exception as e:
             self.logger.error(f"Error al crear tienda: {str(e)}")
             return {'error': str(e)}
@@ -100,7 +180,8 @@ class ApiCrudManager:
             data = self._make_request('PUT', endpoint, store_data)
             
             if 'error' not in data:
-                self.cache.delete(f"store_{store_id}")
+                # Invalida el detalle y solo las páginas del listado que incluyen la tienda
+                self.cache.invalidate_tag(f"store:{store_id}")
             
             return data
         except Exception as e:
@@ -114,28 +195,39 @@ class ApiCrudManager:
             data = self._make_request('DELETE', endpoint)
             
             if 'error' not in data:
-                self.cache.delete(f"store_{store_id}")
+                self.cache.invalidate_tag(f"store:{store_id}")
+                self.cache.invalidate_tag(f"store:{store_id}:products")
+                self.cache.invalidate_tag('stores')
             
             return data
         except Exception as e:
             self.logger.error(f"Error al eliminar tienda {store_id}: {str(e)}")
             return {'error': str(e)}
     
+    def iter_stores(self, per_page: int = 50, cursor: Optional[Dict[str, int]] = None) -> PageIterator:
+        """Recorre todas las tiendas sin cargar el listado completo en memoria"""
+        # Las páginas se piden sin pasar por el caché para no llenarlo con el catálogo entero
+        return PageIterator(
+            lambda page, limit: self._make_request('GET', f"stores?page={page}&per_page={limit}"),
+            per_page, cursor
+        )
+    
+    def iter_products(self, store_id: str, per_page: int = 50, cursor: Optional[Dict[str, int]] = None) -> PageIterator:
+        """Recorre todos los productos de una tienda sin cargar el catálogo completo en memoria"""
+        return PageIterator(
+            lambda page, limit: self._make_request('GET', f"store/{store_id}/products?page={page}&per_page={limit}"),
+            per_page, cursor
+        )
+    
     def get_products(self, store_id: str, page: int = 1, limit: int = 10) -> Dict:
         """Obtiene la lista de productos de una tienda"""
         try:
             cache_key = f"products_store_{store_id}_page_{page}_limit_{limit}"
-            cached_data = self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
             endpoint = f"store/{store_id}/products?page={page}&per_page={limit}"
-            data = self._make_request('GET', endpoint)
-            
-            if 'error' not in data:
-                self.cache.set(cache_key, data)
-            
-            return data
+            return self._cached_get(
+                cache_key, endpoint, stale_ttl=self.stale_seconds,
+                tags=lambda data: [f"store:{store_id}:products"] + self._item_tags(data, f"store:{store_id}:product:{{id}}")
+            )
         except Exception as e:
             self.logger.error(f"Error al obtener productos de tienda {store_id}: {str(e)}")
             return {'error': str(e)}
@@ -144,17 +236,8 @@ class ApiCrudManager:
         """Obtiene información de un producto específico"""
         try:
             cache_key = f"product_{store_id}_{product_id}"
-            cached_data = self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
             endpoint = f"store/{store_id}/products/{product_id}"
-            data = self._make_request('GET', endpoint)
-            
-            if 'error' not in data:
-                self.cache.set(cache_key, data)
-            
-            return data
+            return self._cached_get(cache_key, endpoint, tags=lambda data: [f"store:{store_id}:product:{product_id}"])
         except Exception as e:
             self.logger.error(f"Error al obtener producto {product_id} de tienda {store_id}: {str(e)}")
             return {'error': str(e)}
@@ -163,7 +246,13 @@ class ApiCrudManager:
         """Crea un nuevo producto en una tienda"""
         try:
             endpoint = f"store/{store_id}/products"
-            return self._make_request('POST', endpoint, product_data)
+            data = self._make_request('POST', endpoint, product_data)
+            
+            if 'error' not in data:
+                # El nuevo producto desplaza la paginación de los listados de la tienda
+                self.cache.invalidate_tag(f"store:{store_id}:products")
+            
+            return data
         except Exception as e:
             self.logger.error(f"Error al crear producto en tienda {store_id}: {str(e)}")
             return {'error': str(e)}
@@ -175,7 +264,8 @@ class ApiCrudManager:
             data = self._make_request('PUT', endpoint, product_data)
             
             if 'error' not in data:
-                self.cache.delete(f"product_{store_id}_{product_id}")
+                # Invalida el detalle y solo las páginas del listado que incluyen el producto
+                self.cache.invalidate_tag(f"store:{store_id}:product:{product_id}")
             
             return data
         except Exception as e:
@@ -189,9 +279,103 @@ class ApiCrudManager:
             data = self._make_request('DELETE', endpoint)
             
             if 'error' not in data:
-                self.cache.delete(f"product_{store_id}_{product_id}")
+                self.cache.invalidate_tag(f"store:{store_id}:product:{product_id}")
+                self.cache.invalidate_tag(f"store:{store_id}:products")
             
             return data
         except Exception as e:
             self.logger.error(f"Error al eliminar producto {product_id} de tienda {store_id}: {str(e)}")
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
+    
+    def bulk_update_products(self, store_id: str, changes: List[Dict]) -> Dict:
+        """Actualiza muchos productos en paralelo; cada cambio debe incluir el 'id' del producto"""
+        try:
+            writes = []
+            for change in changes:
+                product_id = change.get('id') if isinstance(change, dict) else None
+                payload = {k: v for k, v in change.items() if k != 'id'} if product_id is not None else None
+                writes.append((product_id, 'PUT', f"store/{store_id}/products/{product_id}", payload))
+            report = self._bulk_write(writes)
+            
+            if report['succeeded']:
+                # Listados de la tienda y solo los detalles de los productos modificados
+                self.cache.invalidate_tag(f"store:{store_id}:products")
+                for result in report['results']:
+                    if result['ok']:
+                        self.cache.invalidate_tag(f"store:{store_id}:product:{result['id']}")
+            
+            return report
+        except Exception as e:
+            self.logger.error(f"Error en la actualización masiva de productos de tienda {store_id}: {str(e)}")
+            return {'error': str(e)}
+    
+    def bulk_create_products(self, store_id: str, products: List[Dict]) -> Dict:
+        """Crea muchos productos en paralelo en una tienda"""
+        try:
+            writes = [(index, 'POST', f"store/{store_id}/products", product if isinstance(product, dict) else None)
+                      for index, product in enumerate(products)]
+            report = self._bulk_write(writes)
+            
+            if report['succeeded']:
+                # Los nuevos productos desplazan la paginación de los listados de la tienda
+                self.cache.invalidate_tag(f"store:{store_id}:products")
+            
+            return report
+        except Exception as e:
+            self.logger.error(f"Error en la creación masiva de productos en tienda {store_id}: {str(e)}")
+            return {'error': str(e)}
+    
+    def _bulk_write(self, writes: List[Tuple[Any, str, str, Optional[Dict]]]) -> Dict:
+        """Ejecuta escrituras con concurrencia acotada y reintenta solo las que fallaron por causas transitorias"""
+        results: List[Dict] = [{} for _ in writes]
+        pending = []
+        for position, (item_id, _, _, payload) in enumerate(writes):
+            if item_id is None or payload is None:
+                results[position] = {'id': item_id, 'ok': False, 'attempts': 0, 'error': 'Elemento inválido'}
+            else:
+                pending.append(position)
+        
+        with ThreadPoolExecutor(max_workers=self.bulk_workers, thread_name_prefix='api-bulk') as executor:
+            outcomes = executor.map(lambda position: self._send_write(*writes[position][1:]), pending)
+            for position, (data, attempts) in zip(pending, outcomes):
+                results[position] = {
+                    'id': writes[position][0],
+                    'ok': 'error' not in data,
+                    'attempts': attempts,
+                    **({'error': data['error']} if 'error' in data else {'data': data})
+                }
+        
+        failed = [result for result in results if not result['ok']]
+        if failed:
+            self.logger.warning(f"Escritura masiva: {len(failed)} de {len(writes)} elementos fallaron")
+        return {
+            'total': len(writes),
+            'succeeded': len(writes) - len(failed),
+            'failed': len(failed),
+            'results': results
+        }
+    
+    def _send_write(self, method: str, endpoint: str, payload: Dict) -> Tuple[Union[Dict, List], int]:
+        """Envía una escritura protegida por el circuito de la API y devuelve el resultado y los intentos hechos
+
+        Los fallos transitorios (429, 5xx, timeouts, límite de tasa local) se reintentan
+        con espera exponencial con jitter y consumen el presupuesto global de reintentos.
+        """
+        attempts = 0
+
+        def send():
+            nonlocal attempts
+            attempts += 1
+            response = self.http.request(method, f"{self.api_url}/{endpoint}", headers=self.headers, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            return self.resilience.call(
+                'tiendanube', send, retries=self.bulk_retries,
+                retry_on=lambda e: is_transient_error(e) or isinstance(e, RateLimitedError)
+            ), attempts
+        except (CircuitOpenError, requests.exceptions.RequestException) as e:
+            return {'error': str(e)}, attempts
+        except ValueError as e:
+            return {'error': f'Respuesta inválida de la API: {str(e)}'}, attempts
@@ -0,0 +1,201 @@
+import atexit
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from .logger_config import LoggerConfig
+from .resilience import get_resilience
+
+_instance: Optional['BrowserPool'] = None
+_instance_lock = threading.Lock()
+
+
+def get_browser_pool() -> 'BrowserPool':
+    """Obtiene el pool de navegadores compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = BrowserPool()
+            atexit.register(_instance.close)
+        return _instance
+
+
+def build_chrome_options():
+    """Opciones de Chrome headless usadas por todos los navegadores del pool"""
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920x1080')
+    return options
+
+
+class _PooledBrowser:
+    """Navegador del pool junto con la cantidad de páginas que ya renderizó"""
+
+    def __init__(self, driver: Any):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """Pool de navegadores headless reutilizables para tiendas que renderizan con JavaScript
+
+    Cada navegador se inicia una sola vez y se recicla tras `max_pages` páginas
+    o cuando su memoria supera `max_memory_mb`; esa medida es solo el heap de
+    JavaScript de la pestaña, no la memoria (RSS) del proceso de Chrome. El
+    tamaño del pool limita la cantidad de páginas renderizadas en simultáneo.
+    Los arranques fallidos abren el circuito 'browser': sin Chrome en el host no
+    se reintenta iniciarlo en cada pedido.
+    """
+
+    def __init__(self, size: Optional[int] = None, max_pages: Optional[int] = None,
+                 max_memory_mb: Optional[int] = None, page_timeout: Optional[int] = None):
+        self.logger = LoggerConfig.get_logger('browser_pool')
+        self.size = size or int(os.getenv('BROWSER_POOL_SIZE', 2))
+        self.max_pages = max_pages or int(os.getenv('BROWSER_MAX_PAGES', 50))
+        self.max_memory_mb = max_memory_mb or int(os.getenv('BROWSER_MAX_MEMORY_MB', 512))
+        self.page_timeout = page_timeout or int(os.getenv('SELENIUM_TIMEOUT', 15))
+        self.resilience = get_resilience()
+        self._idle: 'queue.LifoQueue[_PooledBrowser]' = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._all: List[_PooledBrowser] = []
+        self._closed = False
+        self._stats = {'launched': 0, 'recycled': 0, 'discarded': 0, 'pages': 0}
+
+    def render(self, url: str, wait_css: Optional[str] = None) -> str:
+        """Carga la URL en un navegador del pool y devuelve el HTML ya renderizado"""
+        with self.checkout() as driver:
+            driver.get(url)
+            if wait_css:
+                from selenium.common.exceptions import TimeoutException
+                from selenium.webdriver.common.by import By
+                from selenium.webdriver.support import expected_conditions as EC
+                from selenium.webdriver.support.ui import WebDriverWait
+                try:
+                    WebDriverWait(driver, self.page_timeout).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, wait_css))
+                    )
+                except TimeoutException:
+                    # La página puede no tener el elemento: se devuelve lo que se haya renderizado
+                    pass
+            return driver.page_source
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """Presta un navegador del pool; espera si todos están en uso"""
+        if self._closed:
+            raise RuntimeError('El pool de navegadores está cerrado')
+        with self._slots:
+            browser = self._acquire()
+            healthy = False
+            try:
+                yield browser.driver
+                healthy = True
+            except Exception as e:
+                # Un timeout o error de la página no invalida el navegador: solo se descarta si la sesión murió
+                healthy = self._recover(browser, e)
+                raise
+            finally:
+                browser.pages += 1
+                with self._lock:
+                    self._stats['pages'] += 1
+                self._release(browser, healthy)
+
+    def warm(self, count: Optional[int] = None) -> None:
+        """Inicia navegadores por adelantado para no pagar el arranque en el primer pedido"""
+        for _ in range(min(count or self.size, self.size) - self._idle.qsize()):
+            self._idle.put(self._launch())
+
+    def stats(self) -> Dict[str, int]:
+        """Devuelve navegadores iniciados, reciclados, descartados y páginas renderizadas"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['alive'] = len(self._all)
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+    def close(self) -> None:
+        """Cierra todos los navegadores del pool"""
+        self._closed = True
+        with self._lock:
+            browsers = list(self._all)
+            self._all.clear()
+        for browser in browsers:
+            self._quit(browser)
+
+    def _acquire(self) -> _PooledBrowser:
+        """Toma un navegador ocioso o inicia uno nuevo"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._launch()
+
+    def _release(self, browser: _PooledBrowser, healthy: bool) -> None:
+        """Devuelve el navegador al pool o lo recicla si falló, está gastado o usa demasiada memoria"""
+        if not healthy:
+            self._retire(browser, 'discarded')
+        elif browser.pages >= self.max_pages or self._memory_mb(browser) > self.max_memory_mb:
+            self._retire(browser, 'recycled')
+        elif self._closed:
+            self._retire(browser, 'discarded')
+        else:
+            self._idle.put(browser)
+
+    def _recover(self, browser: _PooledBrowser, error: Exception) -> bool:
+        """Detiene la carga en curso tras un error y verifica que la sesión del navegador siga viva"""
+        from selenium.common.exceptions import InvalidSessionIdException
+        if isinstance(error, InvalidSessionIdException):
+            return False
+        try:
+            browser.driver.execute_script('window.stop()')
+            return browser.driver.execute_script('return 1') == 1
+        except Exception as e:
+            self.logger.debug(f'Navegador sin respuesta tras un error: {str(e)}')
+            return False
+
+    def _launch(self) -> _PooledBrowser:
+        """Inicia un navegador headless nuevo; con el circuito 'browser' abierto falla sin intentarlo"""
+        def start():
+            from selenium import webdriver
+            driver = webdriver.Chrome(options=build_chrome_options())
+            driver.set_page_load_timeout(self.page_timeout)
+            return driver
+
+        # Todo fallo de arranque (Chrome o selenium ausentes, driver incompatible) cuenta para el circuito
+        driver = self.resilience.call('browser', start, retries=0, retry_on=lambda e: True)
+        browser = _PooledBrowser(driver)
+        with self._lock:
+            self._all.append(browser)
+            self._stats['launched'] += 1
+        self.logger.info('Navegador headless iniciado')
+        return browser
+
+    def _retire(self, browser: _PooledBrowser, reason: str) -> None:
+        """Cierra un navegador y lo quita del pool"""
+        with self._lock:
+            if browser in self._all:
+                self._all.remove(browser)
+            self._stats[reason] += 1
+        self._quit(browser)
+
+    def _quit(self, browser: _PooledBrowser) -> None:
+        """Cierra el proceso del navegador ignorando errores"""
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            self.logger.debug(f'Error al cerrar navegador: {str(e)}')
+
+    def _memory_mb(self, browser: _PooledBrowser) -> float:
+        """Memoria del heap de JavaScript de la pestaña en MB, sin contar el RSS del proceso (0 si no se puede medir)"""
+        try:
+            used = browser.driver.execute_script(
+                'return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0'
+            )
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0
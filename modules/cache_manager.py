@@ -1,42 +1,383 @@
-from typing import Dict, Any
-from datetime import datetime, timedelta
+import os
+import sys
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from .disk_cache import DiskCache, get_disk_cache
+
+
+# Separador entre el espacio de nombres y la clave (no aparece en URLs ni claves habituales)
+NAMESPACE_SEPARATOR = '\x1f'
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    stale_at: float
+    expires_at: float
+    size: int
+    seq: int
+    namespace: str = ''
+    tags: FrozenSet[str] = frozenset()
+
+
+# Etiquetas fijas o calculadas a partir del valor cargado
+TagsSpec = Optional[Union[Iterable[str], Callable[[Any], Iterable[str]]]]
+
+
+# Pool compartido para las revalidaciones en segundo plano (stale-while-revalidate)
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('CACHE_REFRESH_WORKERS', 4)),
+    thread_name_prefix='cache-refresh'
+)
+
+
+def _estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Estima el tamaño aproximado en bytes de un objeto y su contenido"""
+    if _seen is None:
+        _seen = set()
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _estimate_size(key, _seen) + _estimate_size(value, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += _estimate_size(item, _seen)
+    return size
+
 
 class CacheManager:
-    def __init__(self, expiration_minutes: int = 60):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, expiration_minutes: int = 60, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, disk_cache: Optional[DiskCache] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._cache: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._in_flight: Dict[str, Future] = {}
+        # Contabilidad por espacio de nombres: orden LRU propio, bytes, cuotas y contadores
+        self._namespace_keys: Dict[str, 'OrderedDict[str, None]'] = defaultdict(OrderedDict)
+        self._namespace_bytes: Dict[str, int] = defaultdict(int)
+        self._quotas: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Índice etiqueta -> claves para invalidar en tiempo proporcional a las entradas etiquetadas
+        self._tag_index: Dict[str, Set[str]] = defaultdict(set)
         self.expiration_minutes = expiration_minutes
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('CACHE_MAX_ENTRIES', 1000))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.getenv('CACHE_MAX_MB', 64)) * 1024 * 1024)
+        # Segundo nivel opcional en disco (CACHE_DISK_PATH) al que caen los fallos en memoria
+        self.disk_cache = disk_cache if disk_cache is not None else get_disk_cache()
+        # Reloj monótono de los vencimientos en memoria (inyectable para controlar el tiempo)
+        self._clock = clock
 
     def get(self, key: str) -> Any:
         """Obtiene un valor del caché si existe y no ha expirado"""
-        if key in self._cache:
-            cache_entry = self._cache[key]
-            if datetime.now() < cache_entry['expiration']:
-                return cache_entry['value']
-            else:
-                del self._cache[key]
-        return None
-
-    def set(self, key: str, value: Any) -> None:
-        """Almacena un valor en el caché con tiempo de expiración"""
-        expiration = datetime.now() + timedelta(minutes=self.expiration_minutes)
-        self._cache[key] = {
-            'value': value,
-            'expiration': expiration
-        }
+        value, _ = self._lookup(key, serve_stale=False)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, stale_ttl: float = 0,
+            tags: Optional[Iterable[str]] = None) -> None:
+        """Almacena un valor en el caché con tiempo de expiración (ttl en segundos)
+
+        Con `stale_ttl` la entrada se conserva ese tiempo adicional después de
+        vencer para que `get_or_compute` pueda servirla mientras se revalida.
+        Las `tags` permiten invalidarla luego junto a otras con `invalidate_tag`.
+        """
+        if ttl is None:
+            ttl = self.expiration_minutes * 60
+        tags = frozenset(tags or ())
+        self._store(key, value, ttl, stale_ttl, tags)
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, value, ttl, stale_ttl, tags)
+
+    def get_or_compute(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None,
+                       should_cache: Optional[Callable[[Any], bool]] = None,
+                       stale_ttl: float = 0, tags: TagsSpec = None) -> Any:
+        """Obtiene un valor del caché o lo calcula una sola vez aunque haya varios pedidos concurrentes
+
+        Los pedidos simultáneos de la misma clave esperan a la única llamada a `loader`
+        y comparten su resultado o su excepción. `should_cache` permite descartar
+        resultados que no deben almacenarse (por ejemplo, respuestas con error).
+        Con `stale_ttl` una entrada vencida se devuelve de inmediato mientras se
+        recarga en segundo plano; solo al superar `ttl + stale_ttl` la carga bloquea.
+        `tags` puede ser una lista fija o una función que las calcula a partir del valor.
+        """
+        value, is_stale = self._lookup(key)
+        if value is not None:
+            if is_stale:
+                self._refresh_in_background(key, loader, ttl, should_cache, stale_ttl, tags)
+            return value
+
+        with self._lock:
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = Future()
+                self._in_flight[key] = flight
+
+        if not is_leader:
+            return flight.result()
+
+        # Otro líder pudo haber completado la carga entre la consulta y el registro
+        value = self.get(key)
+        if value is not None:
+            self._finish_flight(key, flight, value)
+            return value
+        return self._load(key, flight, loader, ttl, should_cache, stale_ttl, tags)
 
     def clear(self) -> None:
         """Limpia todo el caché"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap.clear()
+            self._namespace_keys.clear()
+            self._namespace_bytes.clear()
+            self._tag_index.clear()
+            self._total_bytes = 0
+        if self.disk_cache is not None:
+            self.disk_cache.clear()
 
     def remove(self, key: str) -> None:
         """Elimina una entrada específica del caché"""
-        if key in self._cache:
-            del self._cache[key]
+        with self._lock:
+            if key in self._cache:
+                self._delete_entry(key)
+        if self.disk_cache is not None:
+            self.disk_cache.remove(key)
 
     def cleanup_expired(self) -> None:
         """Elimina todas las entradas expiradas del caché"""
-        now = datetime.now()
-        expired_keys = [key for key, entry in self._cache.items() 
-                       if now >= entry['expiration']]
-        for key in expired_keys:
-            del self._cache[key]
\ No newline at end of file
+        with self._lock:
+            self._purge_expired(self._clock())
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Elimina todas las entradas con la etiqueta indicada y devuelve cuántas había en memoria"""
+        with self._lock:
+            keys = list(self._tag_index.get(tag, ()))
+            for key in keys:
+                self._delete_entry(key)
+        if self.disk_cache is not None:
+            self.disk_cache.remove_tag(tag)
+        return len(keys)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Elimina todas las entradas cuya clave comienza con el prefijo (recorre todas las claves)"""
+        with self._lock:
+            keys = [key for key in self._cache if key.startswith(prefix)]
+            for key in keys:
+                self._delete_entry(key)
+        if self.disk_cache is not None:
+            self.disk_cache.remove_prefix(prefix)
+        return len(keys)
+
+    def set_namespace_quota(self, namespace: str, max_entries: Optional[int] = None,
+                            max_bytes: Optional[int] = None) -> None:
+        """Define los límites de entradas y bytes de un espacio de nombres"""
+        with self._lock:
+            self._quotas[namespace] = (max_entries, max_bytes)
+            self._enforce_limits(namespace)
+
+    def clear_namespace(self, namespace: str) -> None:
+        """Elimina todas las entradas de un espacio de nombres"""
+        with self._lock:
+            for key in list(self._namespace_keys.get(namespace, ())):
+                self._delete_entry(key)
+        if self.disk_cache is not None:
+            self.disk_cache.remove_prefix(f'{namespace}{NAMESPACE_SEPARATOR}')
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Devuelve los contadores de uso por espacio de nombres ('' para claves sin espacio)"""
+        with self._lock:
+            namespaces = set(self._stats) | set(self._namespace_keys)
+            return {
+                namespace: {
+                    'entries': len(self._namespace_keys.get(namespace, ())),
+                    'bytes': self._namespace_bytes.get(namespace, 0),
+                    'hits': self._stats[namespace]['hits'],
+                    'stale_hits': self._stats[namespace]['stale_hits'],
+                    'misses': self._stats[namespace]['misses'],
+                    'evictions': self._stats[namespace]['evictions'],
+                    'expirations': self._stats[namespace]['expirations']
+                }
+                for namespace in namespaces
+            }
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def total_bytes(self) -> int:
+        """Tamaño aproximado en bytes de las entradas almacenadas"""
+        return self._total_bytes
+
+    def _lookup(self, key: str, serve_stale: bool = True) -> Tuple[Any, bool]:
+        """Busca una entrada en memoria y luego en disco; devuelve (valor, está_vencida)
+
+        Con `serve_stale=False` una entrada vencida no se devuelve y cuenta como fallo.
+        """
+        now = self._clock()
+        namespace = self._namespace_of(key)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if now < entry.expires_at:
+                    is_stale = now >= entry.stale_at
+                    if is_stale and not serve_stale:
+                        self._stats[namespace]['misses'] += 1
+                        return None, True
+                    # Marcar como usado recientemente para la política LRU
+                    self._cache.move_to_end(key)
+                    self._namespace_keys[namespace].move_to_end(key)
+                    self._stats[namespace]['stale_hits' if is_stale else 'hits'] += 1
+                    return entry.value, is_stale
+                self._delete_entry(key, 'expirations')
+
+        stored = self.disk_cache.get(key) if self.disk_cache is not None else None
+        if stored is None:
+            with self._lock:
+                self._stats[namespace]['misses'] += 1
+            return None, False
+        value, fresh_remaining, remaining, tags = stored
+        # Promover al nivel en memoria conservando los TTL restantes y las etiquetas
+        self._store(key, value, fresh_remaining, remaining - fresh_remaining, tags)
+        is_stale = fresh_remaining <= 0
+        if is_stale and not serve_stale:
+            with self._lock:
+                self._stats[namespace]['misses'] += 1
+            return None, True
+        with self._lock:
+            self._stats[namespace]['stale_hits' if is_stale else 'hits'] += 1
+        return value, is_stale
+
+    def _load(self, key: str, flight: Future, loader: Callable[[], Any], ttl: Optional[float],
+              should_cache: Optional[Callable[[Any], bool]], stale_ttl: float, tags: TagsSpec) -> Any:
+        """Ejecuta el loader como líder de la carga y publica el resultado a los que esperan"""
+        try:
+            value = loader()
+            if value is not None and (should_cache is None or should_cache(value)):
+                self.set(key, value, ttl, stale_ttl, tags(value) if callable(tags) else tags)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.set_exception(e)
+            raise
+        self._finish_flight(key, flight, value)
+        return value
+
+    def _finish_flight(self, key: str, flight: Future, value: Any) -> None:
+        """Libera el registro de carga en curso y entrega el valor a los que esperan"""
+        with self._lock:
+            self._in_flight.pop(key, None)
+        flight.set_result(value)
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl: Optional[float],
+                               should_cache: Optional[Callable[[Any], bool]], stale_ttl: float,
+                               tags: TagsSpec) -> None:
+        """Programa la recarga de una entrada vencida si no hay otra en curso"""
+        with self._lock:
+            if key in self._in_flight:
+                return
+            flight = Future()
+            self._in_flight[key] = flight
+
+        def refresh():
+            try:
+                self._load(key, flight, loader, ttl, should_cache, stale_ttl, tags)
+            except Exception:
+                # La entrada vencida se sigue sirviendo hasta su expiración definitiva
+                pass
+
+        _refresh_executor.submit(refresh)
+
+    def _store(self, key: str, value: Any, ttl: float, stale_ttl: float = 0,
+               tags: FrozenSet[str] = frozenset()) -> None:
+        """Almacena un valor en memoria con un TTL en segundos"""
+        now = self._clock()
+        stale_at = now + ttl
+        expires_at = stale_at + stale_ttl
+        size = _estimate_size(key) + _estimate_size(value)
+        namespace = self._namespace_of(key)
+
+        with self._lock:
+            if key in self._cache:
+                self._delete_entry(key)
+
+            # Un valor que por sí solo excede el presupuesto no se almacena
+            quota_bytes = self._quotas.get(namespace, (None, None))[1]
+            if size > self.max_bytes or (quota_bytes is not None and size > quota_bytes):
+                return
+
+            seq = next(self._seq)
+            self._cache[key] = _CacheEntry(value=value, stale_at=stale_at, expires_at=expires_at,
+                                           size=size, seq=seq, namespace=namespace, tags=tags)
+            self._namespace_keys[namespace][key] = None
+            for tag in tags:
+                self._tag_index[tag].add(key)
+            self._namespace_bytes[namespace] += size
+            self._total_bytes += size
+            heapq.heappush(self._expiry_heap, (expires_at, seq, key))
+
+            self._purge_expired(now)
+            self._enforce_limits(namespace)
+
+    @staticmethod
+    def _namespace_of(key: str) -> str:
+        """Obtiene el espacio de nombres de una clave ('' si no tiene)"""
+        namespace, separator, _ = key.partition(NAMESPACE_SEPARATOR)
+        return namespace if separator else ''
+
+    def _delete_entry(self, key: str, reason: Optional[str] = None) -> None:
+        """Quita una entrada y descuenta su tamaño (la entrada del heap se descarta al salir)"""
+        entry = self._cache.pop(key)
+        self._total_bytes -= entry.size
+        self._namespace_bytes[entry.namespace] -= entry.size
+        namespace_keys = self._namespace_keys[entry.namespace]
+        namespace_keys.pop(key, None)
+        if not namespace_keys:
+            del self._namespace_keys[entry.namespace]
+            del self._namespace_bytes[entry.namespace]
+        for tag in entry.tags:
+            tagged_keys = self._tag_index.get(tag)
+            if tagged_keys is not None:
+                tagged_keys.discard(key)
+                if not tagged_keys:
+                    del self._tag_index[tag]
+        if reason:
+            self._stats[entry.namespace][reason] += 1
+
+    def _purge_expired(self, now: float) -> None:
+        """Elimina las entradas expiradas en O(log n) por entrada usando el heap de expiración"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            entry = self._cache.get(key)
+            # Las entradas reemplazadas o eliminadas dejan registros obsoletos en el heap
+            if entry is not None and entry.seq == seq:
+                self._delete_entry(key, 'expirations')
+
+        # Reconstruir el heap si acumula demasiados registros obsoletos
+        if len(heap) > 2 * len(self._cache) + 64:
+            self._expiry_heap = [(entry.expires_at, entry.seq, key) for key, entry in self._cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _enforce_limits(self, namespace: str = '') -> None:
+        """Desaloja las entradas menos usadas recientemente hasta cumplir la cuota y el límite global"""
+        max_entries, max_bytes = self._quotas.get(namespace, (None, None))
+        while namespace in self._namespace_keys and (
+                (max_entries is not None and len(self._namespace_keys[namespace]) > max_entries) or
+                (max_bytes is not None and self._namespace_bytes[namespace] > max_bytes)):
+            self._delete_entry(next(iter(self._namespace_keys[namespace])), 'evictions')
+
+        while self._cache and (len(self._cache) > self.max_entries or self._total_bytes > self.max_bytes):
+            self._delete_entry(next(iter(self._cache)), 'evictions')
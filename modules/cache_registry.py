@@ -0,0 +1,133 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from .cache_manager import CacheManager, NAMESPACE_SEPARATOR, TagsSpec
+
+_registry: Optional['CacheRegistry'] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> 'CacheRegistry':
+    """Obtiene el registro de cachés compartido por todo el proceso"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CacheRegistry()
+        return _registry
+
+
+def get_cache(namespace: str, expiration_minutes: Optional[int] = None, max_entries: Optional[int] = None,
+              max_mb: Optional[float] = None) -> 'CacheNamespace':
+    """Obtiene la vista de un espacio de nombres dentro del caché compartido del proceso"""
+    return get_registry().namespace(namespace, expiration_minutes, max_entries, max_mb)
+
+
+class CacheNamespace:
+    """Vista de un espacio de nombres del caché compartido con la misma API que CacheManager"""
+
+    def __init__(self, manager: CacheManager, name: str, expiration_minutes: int):
+        self._manager = manager
+        self.name = name
+        self.expiration_minutes = expiration_minutes
+        self._prefix = f'{name}{NAMESPACE_SEPARATOR}'
+
+    def get(self, key: str) -> Any:
+        """Obtiene un valor del caché si existe y no ha expirado"""
+        return self._manager.get(self._prefix + key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, stale_ttl: float = 0,
+            tags: Optional[Iterable[str]] = None) -> None:
+        """Almacena un valor en el caché con tiempo de expiración (ttl en segundos)"""
+        self._manager.set(self._prefix + key, value, self._ttl(ttl), stale_ttl, self._tags(tags))
+
+    def get_or_compute(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None,
+                       should_cache: Optional[Callable[[Any], bool]] = None,
+                       stale_ttl: float = 0, tags: TagsSpec = None) -> Any:
+        """Obtiene un valor del caché o lo calcula una sola vez aunque haya varios pedidos concurrentes"""
+        if callable(tags):
+            tags_fn = tags
+            tags = lambda value: self._tags(tags_fn(value))
+        else:
+            tags = self._tags(tags)
+        return self._manager.get_or_compute(self._prefix + key, loader, self._ttl(ttl), should_cache,
+                                            stale_ttl, tags)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Elimina todas las entradas de este espacio de nombres con la etiqueta indicada"""
+        return self._manager.invalidate_tag(self._prefix + tag)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Elimina todas las entradas de este espacio de nombres cuya clave comienza con el prefijo"""
+        return self._manager.invalidate_prefix(self._prefix + prefix)
+
+    def remove(self, key: str) -> None:
+        """Elimina una entrada específica del caché"""
+        self._manager.remove(self._prefix + key)
+
+    def clear(self) -> None:
+        """Limpia todas las entradas de este espacio de nombres"""
+        self._manager.clear_namespace(self.name)
+
+    def cleanup_expired(self) -> None:
+        """Elimina todas las entradas expiradas del caché compartido"""
+        self._manager.cleanup_expired()
+
+    def stats(self) -> Dict[str, int]:
+        """Devuelve los contadores de uso de este espacio de nombres"""
+        return self._manager.stats().get(self.name, {})
+
+    def _tags(self, tags: Optional[Iterable[str]]) -> List[str]:
+        """Aísla las etiquetas dentro del espacio de nombres"""
+        return [self._prefix + tag for tag in (tags or ())]
+
+    def _ttl(self, ttl: Optional[float]) -> float:
+        """Usa la expiración propia del espacio de nombres cuando no se indica un TTL"""
+        return ttl if ttl is not None else self.expiration_minutes * 60
+
+
+class CacheRegistry:
+    """Entrega vistas por espacio de nombres de un único caché con presupuesto global de memoria"""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.cache = CacheManager(
+            expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)),
+            max_entries=max_entries,
+            max_bytes=max_bytes
+        )
+        self._namespaces: Dict[str, CacheNamespace] = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str, expiration_minutes: Optional[int] = None, max_entries: Optional[int] = None,
+                  max_mb: Optional[float] = None) -> CacheNamespace:
+        """Obtiene (o crea) la vista de un espacio de nombres y aplica su cuota"""
+        if not name or NAMESPACE_SEPARATOR in name:
+            raise ValueError(f'Nombre de espacio de caché inválido: {name!r}')
+
+        with self._lock:
+            view = self._namespaces.get(name)
+            if view is None:
+                view = CacheNamespace(self.cache, name, expiration_minutes or self.cache.expiration_minutes)
+                self._namespaces[name] = view
+            elif expiration_minutes is not None:
+                view.expiration_minutes = expiration_minutes
+
+        if max_mb is None and os.getenv('CACHE_NAMESPACE_MAX_MB'):
+            max_mb = float(os.getenv('CACHE_NAMESPACE_MAX_MB'))
+        if max_entries is not None or max_mb is not None:
+            self.cache.set_namespace_quota(
+                name,
+                max_entries=max_entries,
+                max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else None
+            )
+        return view
+
+    def export_stats(self) -> Dict[str, Any]:
+        """Exporta los contadores globales y por espacio de nombres para monitoreo"""
+        namespaces = self.cache.stats()
+        return {
+            'total_entries': len(self.cache),
+            'total_bytes': self.cache.total_bytes,
+            'max_entries': self.cache.max_entries,
+            'max_bytes': self.cache.max_bytes,
+            'namespaces': namespaces
+        }
@@ -1,8 +1,4 @@
 from typing import Dict
-from PIL import Image, ImageDraw, ImageFont
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 import base64
 import json
@@ -1,24 +1,36 @@
 import json
-import re
 import os
-from typing import Dict, List
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 import requests
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from fake_useragent import UserAgent
-from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
-from .cache_manager import CacheManager
+from .cache_registry import get_cache
+from .negative_cache import get_negative_cache
+from .http_client import get_http_client
+from .conditional_fetcher import get_conditional_fetcher
+from .storefront_extractor import extract_store_features
+from .resilience import CircuitOpenError, dependency_for, get_resilience
+from .browser_pool import get_browser_pool
+from .price_index import DEFAULT_CATEGORY, get_price_index
+from .competitor_discovery import get_competitor_discovery
 from .metrics_analyzer import MetricsAnalyzer
 from .logger_config import LoggerConfig
 
 # Cargar variables de entorno
 load_dotenv()
 
+# Redes sociales evaluadas en la presencia social de una tienda
+SOCIAL_PLATFORMS = ('facebook', 'instagram', 'twitter', 'tiktok')
+
+# Categorías de la puntuación competitiva, en el orden en que se informan
+SCORE_CATEGORIES = ('product_variety', 'pricing_strategy', 'social_presence', 'customer_service')
+
+# Marca del resultado estático guardado cuando falló el renderizado con navegador
+RENDER_PENDING = '_renderizado_pendiente'
+
 class CompetitorAnalyzer:
     def __init__(self):
         try:
@@ -26,32 +38,64 @@ class CompetitorAnalyzer:
             self.logger = LoggerConfig.get_logger('competitor_analyzer')
             self.logger.info('Inicializando CompetitorAnalyzer')
             
-            # Configurar servicios y opciones
-            self.ua = UserAgent()
-            self.chrome_options = Options()
-            self.chrome_options.add_argument('--headless')
-            self.chrome_options.add_argument('--no-sandbox')
-            self.chrome_options.add_argument('--disable-dev-shm-usage')
-            self.chrome_options.add_argument('--disable-gpu')
-            self.chrome_options.add_argument('--window-size=1920x1080')
-            
-            # Configurar cliente y parámetros
-            self.client = InferenceClient(token=os.getenv('HUGGINGFACE_API_KEY'))
+            # Servicios pesados (User-Agent, Hugging Face) se cargan al primer uso
+            self._ua = None
+            self._client = None
+            # Navegadores headless solo para tiendas que renderizan los productos con JavaScript
+            self.browser_fallback = os.getenv('BROWSER_FALLBACK_ENABLED', 'false').lower() == 'true'
+            self.browser_pool = get_browser_pool()
+            
+            # Configurar parámetros
             self.max_retries = int(os.getenv('MAX_RETRIES', 3))
             self.request_timeout = int(os.getenv('SELENIUM_TIMEOUT', 15))
-            self.cache = CacheManager(expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            self.cache = get_cache('competitor_analyzer', expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            self.stale_seconds = int(os.getenv('CACHE_STALE_MINUTES', 30)) * 60
+            self.negative_cache = get_negative_cache()
+            
+            # Descarga concurrente de competidores: hilos, límite por host y plazo total
+            self.fetch_workers = int(os.getenv('COMPETITOR_FETCH_WORKERS', 6))
+            self.per_host_limit = int(os.getenv('COMPETITOR_PER_HOST_LIMIT', 2))
+            self.fetch_deadline = float(os.getenv('COMPETITOR_FETCH_DEADLINE', 45))
+            self._fetch_executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix='competitor-fetch')
+            self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+            self._host_semaphores_lock = threading.Lock()
             self.metrics_analyzer = MetricsAnalyzer()
             
             # Configurar API de Tiendanube
             self.tiendanube_api_url = os.getenv('TIENDANUBE_API_URL')
             self.tiendanube_app_id = os.getenv('TIENDANUBE_APP_ID')
             self.tiendanube_client_secret = os.getenv('TIENDANUBE_CLIENT_SECRET')
+            # Cliente HTTP con conexiones keep-alive compartidas
+            self.http = get_http_client()
+            # Descargas de tiendas con revalidación por ETag / Last-Modified
+            self.fetcher = get_conditional_fetcher()
+            self.resilience = get_resilience()
+            self.price_index = get_price_index()
+            # Competidores conocidos por nicho y cantidad máxima a analizar
+            self.discovery = get_competitor_discovery()
+            self.max_competitors = int(os.getenv('COMPETITOR_MAX_ANALYZED', 20))
             
             self.logger.info('CompetitorAnalyzer inicializado correctamente')
         except Exception as e:
             self.logger.error(f"Error al inicializar CompetitorAnalyzer: {str(e)}")
             raise Exception(f"Error al inicializar CompetitorAnalyzer: {str(e)}")
 
+    @property
+    def ua(self):
+        """Generador de User-Agent aleatorios, cargado al primer uso"""
+        if self._ua is None:
+            from fake_useragent import UserAgent
+            self._ua = UserAgent()
+        return self._ua
+
+    @property
+    def client(self):
+        """Cliente de Hugging Face, creado al primer uso"""
+        if self._client is None:
+            from huggingface_hub import InferenceClient
+            self._client = InferenceClient(token=os.getenv('HUGGINGFACE_API_KEY'))
+        return self._client
+
     def _get_tiendanube_store_info(self, store_id: str) -> Dict:
         """Obtiene información detallada de una tienda usando la API de Tiendanube"""
         try:
@@ -62,12 +106,12 @@ class CompetitorAnalyzer:
             
             # Obtener información básica de la tienda
             store_url = f"{self.tiendanube_api_url}/store/{store_id}"
-            response = requests.get(store_url, headers=headers)
+            response = self.http.get(store_url, headers=headers)
             store_data = response.json()
             
             # Obtener productos y precios históricos
             products_url = f"{self.tiendanube_api_url}/store/{store_id}/products"
-            products_response = requests.get(products_url, headers=headers)
+            products_response = self.http.get(products_url, headers=headers)
             products_data = products_response.json()
             
             # Analizar tendencias de precios
@@ -101,13 +145,23 @@ class CompetitorAnalyzer:
                 price_data['current_avg'] = sum(prices) / len(prices)
                 price_data['price_volatility'] = self._calculate_price_volatility(prices)
                 
-                # Analizar tendencia histórica (últimos 30 días)
-                historical_prices = self._get_historical_prices(products_data)
-                price_data['historical_trend'] = historical_prices
+                # Analizar tendencia histórica (últimos 30 días) sobre columnas
+                try:
+                    history = self._price_history_frame(products_data)
+                except Exception as e:
+                    self.logger.error(f"Error al obtener historial de precios: {str(e)}")
+                    history = None
+                price_data['historical_trend'] = history.to_dict('records') if history is not None else []
                 
                 # Generar predicción simple para próximos 7 días
-                if len(historical_prices) >= 7:
-                    price_data['price_prediction'] = self._predict_future_prices(historical_prices)
+                if history is not None and len(history) >= 7:
+                    try:
+                        price_data['price_prediction'] = self._predict_price_series(
+                            history['price'].to_numpy(), history['date'].iat[-1]
+                        )
+                    except Exception as e:
+                        self.logger.error(f"Error al predecir precios futuros: {str(e)}")
+                        price_data['price_prediction'] = []
             
             return price_data
         except Exception as e:
@@ -160,37 +214,215 @@ class CompetitorAnalyzer:
             self.logger.error(f"Error al calcular puntuación competitiva: {str(e)}")
             return {'overall_score': 0, 'categories': {}, 'strengths': [], 'weaknesses': []}
 
-    def _calculate_price_volatility(self, prices: List[float]) -> float:
+    def score_stores(self, stores: List[Dict]) -> List[Dict]:
+        """Calcula la puntuación competitiva de muchas tiendas a la vez con operaciones vectorizadas
+
+        Cada elemento de `stores` lleva 'store_info' y 'products', los mismos datos que
+        recibe _calculate_competitive_score, y el resultado es idéntico al de ese cálculo.
+        Las filas con datos malformados se puntúan con el cálculo por tienda.
+        """
+        import numpy as np
+
+        rows = self._store_score_matrix(stores)
+        valid = rows['index']
+        results: List[Dict] = [None] * len(stores)
+        for i in rows['fallback']:
+            store = stores[i] if isinstance(stores[i], dict) else {}
+            results[i] = self._calculate_competitive_score(store.get('store_info'), store.get('products'))
+        if not valid:
+            return results
+
+        n = len(valid)
+        product_count = np.asarray(rows['product_count'], dtype=float)
+
+        # Variedad de productos
+        product_variety = np.minimum(product_count / 100, 1) * 100
+
+        # Estrategia de precios: estadísticas por tienda y por (tienda, categoría) con bincount
+        prices = np.asarray(rows['prices'], dtype=float)
+        store_of_price = np.asarray(rows['store_of_price'], dtype=np.intp)
+        group_of_price = np.asarray(rows['group_of_price'], dtype=np.intp)
+        store_of_group = np.asarray(rows['store_of_group'], dtype=np.intp)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            store_mean, store_std = self._grouped_mean_std(prices, store_of_price, n)
+            volatility = np.where(product_count < 2, 0, store_std / store_mean * 100)
+            discount_ratio = np.asarray(rows['discounts'], dtype=float) / product_count
+
+            group_count = np.bincount(group_of_price, minlength=len(store_of_group))
+            group_mean, group_std = self._grouped_mean_std(prices, group_of_price, len(store_of_group))
+            consistent = (group_count > 1) & (group_std / group_mean * 100 < 15)
+            category_consistency = np.bincount(store_of_group, weights=consistent, minlength=n)
+            category_total = np.bincount(store_of_group, minlength=n)
+
+            pricing = (
+                25 * (volatility < 20)
+                + 25 * ((100 <= store_mean) & (store_mean <= 1000))
+                + 25 * ((0.1 <= discount_ratio) & (discount_ratio <= 0.3))
+                + 25 * ((category_total > 0) & (category_consistency / category_total >= 0.7))
+            )
+        pricing = np.where(product_count > 0, pricing, 0)
+
+        # Presencia social: matriz tienda x red social
+        present = np.asarray(rows['social_present'], dtype=bool).reshape(n, len(SOCIAL_PLATFORMS))
+        followers = np.asarray(rows['followers'], dtype=float).reshape(present.shape)
+        posts = np.asarray(rows['posts'], dtype=float).reshape(present.shape)
+        social = np.minimum((present * (15 + 5 * (followers > 1000) + 5 * (posts > 4))).sum(axis=1), 100)
+
+        # Servicio al cliente
+        response_time = np.asarray(rows['response_time'], dtype=float)
+        rating = np.asarray(rows['rating'], dtype=float)
+        channels = np.asarray(rows['channels'], dtype=float)
+        service = (
+            np.select([response_time <= 1, response_time <= 4], [25, 15], 0)
+            + np.select([rating >= 4.5, rating >= 4.0], [25, 15], 0)
+            + np.select([channels >= 3, channels >= 2], [25, 15], 0)
+            + 25 * np.asarray(rows['return_policy'], dtype=bool)
+        )
+
+        matrix = np.column_stack([product_variety, pricing, social, service])
+        overall = (((matrix[:, 0] + matrix[:, 1]) + matrix[:, 2]) + matrix[:, 3]) / len(SCORE_CATEGORIES)
+        strengths = matrix >= 75
+        weaknesses = ~strengths & (matrix <= 40)
+
+        # Convertir una sola vez a listas de Python: indexar arrays fila a fila es más lento
+        rows_out = zip(valid, overall.tolist(), matrix.tolist(), strengths.tolist(), weaknesses.tolist())
+        for i, score, (variety, pricing_score, social_score, service_score), strong, weak in rows_out:
+            results[i] = {
+                'overall_score': score,
+                'categories': {
+                    'product_variety': variety,
+                    'pricing_strategy': int(pricing_score),
+                    'social_presence': int(social_score),
+                    'customer_service': int(service_score)
+                },
+                'strengths': [category for category, flag in zip(SCORE_CATEGORIES, strong) if flag],
+                'weaknesses': [category for category, flag in zip(SCORE_CATEGORIES, weak) if flag]
+            }
+        return results
+
+    def _store_score_matrix(self, stores: List[Dict]) -> Dict[str, List]:
+        """Aplana las tiendas en columnas para score_stores y separa las filas que no se pueden vectorizar"""
+        numeric = (int, float)
+        rows = {key: [] for key in (
+            'index', 'fallback', 'product_count', 'prices', 'store_of_price', 'group_of_price',
+            'store_of_group', 'discounts', 'social_present', 'followers', 'posts',
+            'response_time', 'rating', 'channels', 'return_policy'
+        )}
+        for i, store in enumerate(stores):
+            try:
+                store_data = store['store_info']
+                products = store['products']
+                social_networks = store_data.get('social_networks', {})
+                service_data = store_data.get('customer_service', {})
+                if not isinstance(products, list) or not isinstance(social_networks, dict) \
+                        or not isinstance(service_data, dict):
+                    raise TypeError('datos de tienda malformados')
+
+                prices = [float(product['price']) for product in products]
+                categories = [product.get('category', 'other') for product in products]
+                if not all(isinstance(category, (str, int)) for category in categories):
+                    raise TypeError('categoría no agrupable')
+                discounts = sum(1 for product in products if product.get('discount_price'))
+
+                social = []
+                for platform in SOCIAL_PLATFORMS:
+                    if platform in social_networks:
+                        network = social_networks[platform]
+                        followers = network.get('followers', 0)
+                        posts = network.get('posts_last_month', 0)
+                        if not isinstance(followers, numeric) or not isinstance(posts, numeric):
+                            raise TypeError('métricas sociales no numéricas')
+                        social.append((True, followers, posts))
+                    else:
+                        social.append((False, 0, 0))
+
+                response_time = service_data.get('avg_response_time', 0)
+                rating = service_data.get('customer_rating', 0)
+                channels = service_data.get('support_channels', [])
+                if not isinstance(response_time, numeric) or not isinstance(rating, numeric) \
+                        or not isinstance(channels, (list, tuple)):
+                    raise TypeError('datos de atención malformados')
+                return_policy = bool(service_data.get('has_return_policy', False))
+            except Exception:
+                rows['fallback'].append(i)
+                continue
+
+            row = len(rows['index'])
+            rows['index'].append(i)
+            rows['product_count'].append(len(products))
+            rows['prices'].extend(prices)
+            rows['store_of_price'].extend([row] * len(prices))
+            groups = {}
+            for category in categories:
+                if category not in groups:
+                    groups[category] = len(rows['store_of_group'])
+                    rows['store_of_group'].append(row)
+                rows['group_of_price'].append(groups[category])
+            rows['discounts'].append(discounts)
+            for present, followers, posts in social:
+                rows['social_present'].append(present)
+                rows['followers'].append(followers)
+                rows['posts'].append(posts)
+            rows['response_time'].append(response_time)
+            rows['rating'].append(rating)
+            rows['channels'].append(len(channels))
+            rows['return_policy'].append(return_policy)
+        return rows
+
+    @staticmethod
+    def _grouped_mean_std(values, groups, size: int):
+        """Media y desviación estándar poblacional (como np.std) de los valores de cada grupo"""
+        import numpy as np
+        count = np.bincount(groups, minlength=size)
+        mean = np.bincount(groups, weights=values, minlength=size) / count
+        deviation = values - mean[groups]
+        std = np.sqrt(np.bincount(groups, weights=deviation * deviation, minlength=size) / count)
+        return mean, std
+
+    def _calculate_price_volatility(self, prices) -> float:
         """Calcula la volatilidad de precios usando desviación estándar"""
         try:
             if len(prices) < 2:
                 return 0
                 
             import numpy as np
-            return float(np.std(prices) / np.mean(prices) * 100)
+            mean = np.mean(prices)
+            if mean == 0:
+                # Con todos los precios en cero la volatilidad no está definida y no cuenta como estable
+                return float('nan')
+            return float(np.std(prices) / mean * 100)
         except Exception as e:
             self.logger.error(f"Error al calcular volatilidad de precios: {str(e)}")
             return 0
     
+    def _price_history_frame(self, products_data: List[Dict]):
+        """Arma el historial de precios de los últimos 30 días como DataFrame columnar ordenado por fecha"""
+        import pandas as pd
+        from datetime import datetime, timedelta
+        
+        dates = []
+        prices = []
+        for product in products_data:
+            history = product.get('price_history')
+            if history:
+                dates.extend(history.keys())
+                prices.extend(history.values())
+        
+        frame = pd.DataFrame({'date': pd.Series(dates, dtype=object), 'price': pd.Series(prices, dtype=float)})
+        if frame.empty:
+            return frame
+        
+        # Conversión de fechas en bloque y filtro de 30 días sin recorrer fila por fila
+        parsed = pd.to_datetime(frame['date'], format='%Y-%m-%d')
+        cutoff_date = datetime.now() - timedelta(days=30)
+        frame = frame[(parsed >= cutoff_date).to_numpy()]
+        return frame.sort_values('date', kind='stable').reset_index(drop=True)
+    
     def _get_historical_prices(self, products_data: List[Dict]) -> List[Dict]:
         """Obtiene el historial de precios de los últimos 30 días"""
         try:
-            historical_prices = []
-            for product in products_data:
-                if 'price_history' in product:
-                    for date, price in product['price_history'].items():
-                        historical_prices.append({
-                            'date': date,
-                            'price': float(price)
-                        })
-            
-            # Ordenar por fecha y limitar a 30 días
-            from datetime import datetime, timedelta
-            cutoff_date = datetime.now() - timedelta(days=30)
-            return sorted(
-                [p for p in historical_prices if datetime.strptime(p['date'], '%Y-%m-%d') >= cutoff_date],
-                key=lambda x: x['date']
-            )
+            return self._price_history_frame(products_data).to_dict('records')
         except Exception as e:
             self.logger.error(f"Error al obtener historial de precios: {str(e)}")
             return []
@@ -198,34 +430,36 @@ class CompetitorAnalyzer:
     def _predict_future_prices(self, historical_prices: List[Dict]) -> List[Dict]:
         """Predice precios futuros usando regresión lineal simple"""
         try:
-            from sklearn.linear_model import LinearRegression
             import numpy as np
-            from datetime import datetime, timedelta
-            
-            # Preparar datos para la regresión
-            X = np.array(range(len(historical_prices))).reshape(-1, 1)
-            y = np.array([p['price'] for p in historical_prices])
-            
-            # Entrenar modelo
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Predecir próximos 7 días
-            future_dates = []
-            last_date = datetime.strptime(historical_prices[-1]['date'], '%Y-%m-%d')
-            for i in range(1, 8):
-                future_date = last_date + timedelta(days=i)
-                prediction = model.predict([[len(historical_prices) + i - 1]])[0]
-                future_dates.append({
-                    'date': future_date.strftime('%Y-%m-%d'),
-                    'predicted_price': max(0, float(prediction))
-                })
-            
-            return future_dates
+            
+            prices = np.fromiter((p['price'] for p in historical_prices), dtype=float, count=len(historical_prices))
+            return self._predict_price_series(prices, historical_prices[-1]['date'])
         except Exception as e:
             self.logger.error(f"Error al predecir precios futuros: {str(e)}")
             return []
     
+    def _predict_price_series(self, prices, last_date: str, horizon: int = 7) -> List[Dict]:
+        """Ajusta la regresión sobre la serie de precios y predice todos los días futuros en una sola llamada"""
+        from sklearn.linear_model import LinearRegression
+        import numpy as np
+        import pandas as pd
+        
+        # Preparar datos para la regresión
+        n = len(prices)
+        X = np.arange(n).reshape(-1, 1)
+        
+        # Entrenar modelo
+        model = LinearRegression()
+        model.fit(X, prices)
+        
+        # Predecir los próximos días de una vez
+        predictions = np.maximum(model.predict(np.arange(n, n + horizon).reshape(-1, 1)), 0)
+        future_dates = pd.date_range(pd.Timestamp(last_date) + pd.Timedelta(days=1), periods=horizon, freq='D')
+        return [
+            {'date': date, 'predicted_price': float(price)}
+            for date, price in zip(future_dates.strftime('%Y-%m-%d'), predictions)
+        ]
+    
     def _evaluate_pricing_strategy(self, products_data: List[Dict]) -> float:
         """Evalúa la estrategia de precios considerando múltiples factores"""
         try:
@@ -282,8 +516,7 @@ class CompetitorAnalyzer:
             social_networks = store_data.get('social_networks', {})
             
             # Evaluar presencia en cada red social principal
-            platforms = ['facebook', 'instagram', 'twitter', 'tiktok']
-            for platform in platforms:
+            for platform in SOCIAL_PLATFORMS:
                 if platform in social_networks:
                     score += 15  # Puntos base por presencia
                     
@@ -334,6 +567,46 @@ class CompetitorAnalyzer:
             self.logger.error(f"Error al evaluar servicio al cliente: {str(e)}")
             return 0
     
+    def _parse_store_info(self, html: str, url: str = None) -> Dict:
+        """Extrae las características de una tienda a partir de su HTML en un único recorrido"""
+        try:
+            prices = []
+            features = extract_store_features(html, prices)
+            if url:
+                # Los precios individuales alimentan el índice de precios por nicho
+                self.price_index.observe_store(url, prices)
+            return features
+        except Exception as e:
+            return {'error': f'Error al procesar el HTML: {str(e)}'}
+
+    def _collect_store_infos(self, futures: Dict, deadline: float) -> Dict[str, Dict]:
+        """Espera los análisis hasta el plazo y devuelve un resultado (o error) por URL"""
+        done, _ = wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+        results = {}
+        for url, future in futures.items():
+            if future not in done:
+                # El análisis sigue en segundo plano y su resultado quedará en caché
+                self.logger.warning(f'Plazo excedido al analizar {url}')
+                results[url] = {'error': 'Tiempo de espera agotado al analizar la tienda'}
+                continue
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                self.logger.error(f'Error al analizar {url}: {str(e)}')
+                results[url] = {'error': str(e)}
+        return results
+
+    def _get_store_info_limited(self, url: str) -> Dict:
+        """Obtiene la información de una tienda respetando el límite de pedidos simultáneos por host"""
+        host = urlsplit(url).netloc.lower() if isinstance(url, str) else ''
+        with self._host_semaphores_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+        with semaphore:
+            return self._get_store_info(url)
+
     def _get_store_info(self, url: str) -> Dict:
         """Obtiene información básica de una tienda"""
         if not url or not isinstance(url, str):
@@ -342,119 +615,106 @@ class CompetitorAnalyzer:
         if not url.startswith(('http://', 'https://')):
             return {'error': 'URL debe comenzar con http:// o https://'}
 
-        # Intentar obtener del caché primero
-        cached_info = self.cache.get(url)
-        if cached_info:
-            return cached_info
-            
-        for attempt in range(self.max_retries):
-            try:
-                headers = {'User-Agent': self.ua.random}
-                response = requests.get(url, headers=headers, timeout=self.request_timeout)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                try:
-                    info = {
-                        'nombre': soup.find('meta', property='og:site_name')['content'] if soup.find('meta', property='og:site_name') else '',
-                        'descripcion': soup.find('meta', property='og:description')['content'] if soup.find('meta', property='og:description') else '',
-                        'productos': len(soup.find_all('div', class_='item-product')) if soup.find_all('div', class_='item-product') else 0,
-                        'categorias': len(soup.find_all('a', class_='item-category')) if soup.find_all('a', class_='item-category') else 0,
-                        'redes_sociales': self._get_social_links(soup),
-                        'medios_pago': self._get_payment_methods(soup),
-                        'envios': self._get_shipping_methods(soup),
-                        'envio_gratis': bool(soup.find(text=lambda t: 'envío gratis' in t.lower() if t else False)),
-                        'rango_precios': self._get_price_range(soup),
-                        'tiene_descuentos': bool(soup.find(text=lambda t: 'descuento' in t.lower() if t else False)),
-                        'tiene_chat': bool(soup.find(text=lambda t: 'chat' in t.lower() if t else False)),
-                        'tiene_blog': bool(soup.find('a', href=lambda h: 'blog' in h.lower() if h else False)),
-                        'tiene_wishlist': bool(soup.find(text=lambda t: 'wishlist' in t.lower() or 'favoritos' in t.lower() if t else False)),
-                        'tiene_reviews': bool(soup.find(text=lambda t: 'review' in t.lower() or 'opiniones' in t.lower() if t else False)),
-                        'tiene_meta_desc': bool(soup.find('meta', {'name': 'description'})),
-                        'tiene_alt_imgs': bool(soup.find('img', alt=True))
-                    }
-                    # Almacenar en caché antes de retornar
-                    self.cache.set(url, info)
-                    return info
-                except Exception as e:
-                    return {'error': f'Error al procesar el HTML: {str(e)}'}
-            except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    return {'error': f'Error al obtener información de la tienda: {str(e)}'}
-                time.sleep(2 ** attempt)  # Backoff exponencial
-        return {'error': 'Máximo número de intentos alcanzado'}
-
-    def _get_social_links(self, soup: BeautifulSoup) -> List[str]:
-        """Extrae enlaces a redes sociales"""
-        social_patterns = {
-            'facebook': r'facebook\.com',
-            'instagram': r'instagram\.com',
-            'twitter': r'twitter\.com',
-            'tiktok': r'tiktok\.com'
-        }
-        
-        social_links = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            for platform, pattern in social_patterns.items():
-                if re.search(pattern, href, re.I):
-                    social_links.append(platform)
-        return list(set(social_links))
-
-    def _get_payment_methods(self, soup: BeautifulSoup) -> List[str]:
-        """Extrae métodos de pago disponibles"""
-        payment_methods = []
-        payment_section = soup.find('div', class_=re.compile(r'payment-methods|medios-pago'))
-        if payment_section:
-            payment_methods = [img['alt'] for img in payment_section.find_all('img', alt=True)]
-        return payment_methods
-
-    def _get_price_range(self, soup) -> Dict:
-        """Obtiene el rango de precios de los productos"""
-        prices = []
-        price_elements = soup.find_all('span', {'class': 'price'})
-        for price in price_elements:
-            try:
-                # Limpia y convierte el precio a número
-                price_text = price.text.strip().replace('$', '').replace('.', '').replace(',', '.')
-                prices.append(float(price_text))
-            except ValueError:
-                continue
-        
-        if prices:
-            return {
-                'min': min(prices),
-                'max': max(prices),
-                'avg': sum(prices) / len(prices)
-            }
-        return {'min': 0, 'max': 0, 'avg': 0}
-
-    def _get_shipping_methods(self, soup: BeautifulSoup) -> List[str]:
-        """Extrae métodos de envío disponibles"""
-        shipping_methods = []
-        shipping_section = soup.find('div', class_=re.compile(r'shipping-methods|metodos-envio'))
-        if shipping_section:
-            shipping_methods = [method.text.strip() for method in shipping_section.find_all(['span', 'p'])]
-        return shipping_methods
-
-    def _find_competitors(self, nicho: str) -> List[str]:
-        """Encuentra URLs de tiendas competidoras en Tiendanube"""
+        def load() -> Dict:
+            # El caché negativo solo se consulta ante un fallo del caché: un fallo reciente
+            # no oculta una versión válida (ni vencida) de la tienda
+            failure = self.negative_cache.check('store_info', url)
+            if failure:
+                return {'error': f'Error al obtener información de la tienda: {failure["error"]}'}
+            return self._fetch_store_info(url)
+
+        # Los pedidos concurrentes de la misma URL comparten un único scraping y,
+        # pasado el TTL, se sirve la versión anterior mientras se revalida
+        return self.cache.get_or_compute(
+            url,
+            load,
+            should_cache=lambda info: 'error' not in info,
+            stale_ttl=self.stale_seconds
+        )
+
+    def refresh_store_info(self, url: str) -> Dict:
+        """Obtiene la información actual de una tienda sin servir el caché y la deja cacheada
+
+        La descarga revalida con ETag / Last-Modified, así que si la página no cambió
+        solo cuesta una respuesta 304.
+        """
+        if not url or not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            return self._get_store_info(url)
+        info = self._fetch_store_info(url)
+        if 'error' not in info:
+            self.cache.set(url, info, stale_ttl=self.stale_seconds)
+        return info
+
+    def _fetch_store_info(self, url: str) -> Dict:
+        """Descarga y procesa la página de una tienda con reintentos"""
+        headers = {'User-Agent': self.ua.random}
+        parsed = []
+
+        def parse(html: str) -> Dict:
+            parsed.append(True)
+            info = self._parse_store_info(html, url)
+            if 'error' not in info and not info.get('productos') and self.browser_fallback:
+                rendered = self._render_store_info(url)
+                if rendered is None:
+                    # Se guarda el resultado estático con sus validadores, marcado para renderizar más tarde
+                    return dict(info, **{RENDER_PENDING: True})
+                return rendered
+            return info
+
+        try:
+            # El resultado guardado con los validadores ya incluye el renderizado: si la página
+            # no cambió no se vuelve a abrir el navegador. Los errores del cliente (404, 410...)
+            # no se reintentan
+            info = self.resilience.call(
+                dependency_for(url),
+                lambda: self.fetcher.fetch('store_info', url, parse, headers=headers, timeout=self.request_timeout),
+                retries=self.max_retries - 1
+            )
+            if info.get(RENDER_PENDING):
+                info = {key: value for key, value in info.items() if key != RENDER_PENDING}
+                if not parsed and self.browser_fallback:
+                    # La página no cambió desde el renderizado fallido: se reintenta con el HTML ya validado
+                    rendered = self._render_store_info(url)
+                    if rendered is not None:
+                        self.fetcher.update_result('store_info', url, rendered)
+                        return rendered
+            return info
+        except CircuitOpenError as e:
+            return {'error': f'Error al obtener información de la tienda: {str(e)}'}
+        except requests.exceptions.RequestException as e:
+            self.negative_cache.record('store_info', url, e)
+            return {'error': f'Error al obtener información de la tienda: {str(e)}'}
+
+    def _render_store_info(self, url: str) -> Optional[Dict]:
+        """Renderiza la tienda en un navegador del pool cuando el HTML estático no muestra productos
+
+        Devuelve None si no se pudo renderizar.
+        """
+        try:
+            html = self.browser_pool.render(url, wait_css='div.item-product')
+            rendered = self._parse_store_info(html, url)
+            return None if 'error' in rendered else rendered
+        except Exception as e:
+            self.logger.warning(f'No se pudo renderizar {url} con el navegador: {str(e)}')
+            return None
+
+    def _find_competitors(self, nicho: str, deadline: float) -> List[str]:
+        """Devuelve las URLs de tiendas competidoras conocidas del nicho en Tiendanube sin pasar del plazo"""
         try:
-            search_url = f"https://www.tiendanube.com/tiendas/{nicho}"
-            headers = {'User-Agent': self.ua.random}
-            response = requests.get(search_url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            competitor_urls = []
-            for store in soup.find_all('div', class_='store-card')[:5]:  # Limitamos a 5 competidores
-                if link := store.find('a', href=True):
-                    competitor_urls.append(link['href'])
-            return competitor_urls
-        except Exception:
+            # El conjunto se mantiene actualizado en segundo plano por el crawler de descubrimiento
+            return self.discovery.competitors(
+                nicho, self.max_competitors, timeout=max(0, deadline - time.monotonic())
+            )
+        except Exception as e:
+            self.logger.error(f"Error al buscar competidores de {nicho}: {str(e)}")
             return []
 
-    def analyze_competition(self, tienda_url: str, nicho: str) -> Dict:
-        """Analiza la competencia y genera recomendaciones"""
+    def analyze_competition(self, tienda_url: str, nicho: str, categoria: str = DEFAULT_CATEGORY) -> Dict:
+        """Analiza la competencia y genera recomendaciones
+
+        `categoria` agrupa en el índice de precios todos los productos de las tiendas
+        analizadas: la vitrina no informa la categoría de cada producto.
+        """
         try:
             # Validar parámetros de entrada
             if not tienda_url or not isinstance(tienda_url, str):
@@ -462,21 +722,31 @@ class CompetitorAnalyzer:
             if not nicho or not isinstance(nicho, str):
                 return {'error': 'Nicho inválido'}
 
-            # Analizar tienda propia
-            own_features = self._get_store_info(tienda_url)
+            # Analizar tienda propia mientras se buscan los competidores
+            deadline = time.monotonic() + self.fetch_deadline
+            own_future = self._fetch_executor.submit(self._get_store_info_limited, tienda_url)
+            competitor_urls = self._find_competitors(nicho, deadline)
+
+            own_features = self._collect_store_infos({tienda_url: own_future}, deadline)[tienda_url]
             if 'error' in own_features:
                 return {'error': f'No se pudo analizar tu tienda: {own_features["error"]}'}
 
-            # Encontrar y analizar competidores
-            competitor_urls = self._find_competitors(nicho)
             if not competitor_urls:
                 return {'error': 'No se encontraron competidores para analizar'}
 
+            # Analizar competidores en paralelo; los que fallan o exceden el plazo se informan aparte
+            futures = {url: self._fetch_executor.submit(self._get_store_info_limited, url) for url in competitor_urls}
+            results = self._collect_store_infos(futures, deadline)
+
             competitor_features = []
+            failed_competitors = []
             for url in competitor_urls:
-                info = self._get_store_info(url)
-                if 'error' not in info:
+                info = results[url]
+                if 'error' in info:
+                    failed_competitors.append({'url': url, 'error': info['error']})
+                else:
                     competitor_features.append(info)
+                    self.price_index.add_store(nicho, url, categoria)
 
             if not competitor_features:
                 return {'error': 'No se pudo obtener información de los competidores'}
@@ -486,9 +756,15 @@ class CompetitorAnalyzer:
             if isinstance(recommendations, dict) and 'error' in recommendations:
                 return recommendations
 
+            # Ubicar el precio promedio propio entre todos los precios acumulados del nicho
+            own_avg = own_features.get('rango_precios', {}).get('avg')
+            price_position = self.price_index.position(nicho, own_avg, categoria) if own_avg else {'count': 0}
+
             return {
                 'own_features': own_features,
                 'competitor_features': competitor_features,
+                'failed_competitors': failed_competitors,
+                'price_position': price_position,
                 'recommendations': recommendations
             }
         except Exception as e:
@@ -0,0 +1,302 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urljoin, urlsplit
+from .http_client import get_http_client
+from .logger_config import LoggerConfig
+from .resilience import dependency_for, get_resilience
+
+# Listado de tiendas de Tiendanube por nicho
+LISTING_URL = 'https://www.tiendanube.com/tiendas/{niche}'
+
+_instances: Dict[str, 'CompetitorDiscovery'] = {}
+_instances_lock = threading.Lock()
+
+
+def get_competitor_discovery(path: Optional[str] = None) -> 'CompetitorDiscovery':
+    """Obtiene el descubridor de competidores compartido para una ruta (o la de COMPETITOR_DISCOVERY_PATH)"""
+    path = path or os.getenv('COMPETITOR_DISCOVERY_PATH', 'data/competitor_discovery.sqlite3')
+    if path != ':memory:':
+        path = os.path.abspath(path)
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = CompetitorDiscovery(path)
+        return _instances[path]
+
+
+def normalize_domain(url: str) -> str:
+    """Dominio de una tienda sin esquema, puerto por defecto ni prefijo www."""
+    netloc = urlsplit(url).netloc.lower()
+    host, _, port = netloc.partition(':')
+    if port in ('80', '443'):
+        netloc = host
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+class ListingParser(HTMLParser):
+    """Extrae de una página del listado los enlaces de cada store-card y el enlace a la página siguiente"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.store_links: List[str] = []
+        self.next_page: Optional[str] = None
+        self._stack: List[Tuple[str, bool]] = []
+        self._card_has_link = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {name: value or '' for name, value in attrs}
+        classes = attributes.get('class', '').split()
+        in_card = any(is_card for _, is_card in self._stack)
+        if tag == 'div' and 'store-card' in classes and not in_card:
+            self._card_has_link = False
+            self._stack.append((tag, True))
+            return
+
+        href = attributes.get('href')
+        if tag == 'a' and href and in_card and not self._card_has_link:
+            # Solo el primer enlace de cada tarjeta, como hacía la búsqueda anterior
+            self.store_links.append(href)
+            self._card_has_link = True
+        elif tag in ('a', 'link') and href and self.next_page is None:
+            if 'next' in attributes.get('rel', '').split() or 'next' in classes:
+                self.next_page = href
+        if tag not in ('link', 'img', 'br', 'input', 'meta', 'hr'):
+            self._stack.append((tag, False))
+
+    def handle_endtag(self, tag: str) -> None:
+        # Cerrar hasta la última etiqueta abierta con el mismo nombre
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                del self._stack[index:]
+                return
+
+
+class CompetitorDiscovery:
+    """Crawler de listados que mantiene el conjunto de competidores conocidos de cada nicho
+
+    Recorre las páginas del listado con una frontera de URLs, deduplica las
+    tiendas por dominio normalizado y guarda el resultado en SQLite. Los
+    nichos conocidos se devuelven al instante y se actualizan en segundo plano
+    cuando vence el intervalo de refresco. Las tiendas que no aparecen en el
+    listado durante COMPETITOR_DISCOVERY_MAX_AGE_DAYS dejan de devolverse.
+    """
+
+    def __init__(self, path: str):
+        self.logger = LoggerConfig.get_logger('competitor_discovery')
+        self.path = path
+        self.max_pages = int(os.getenv('COMPETITOR_DISCOVERY_MAX_PAGES', 10))
+        self.stale_pages = int(os.getenv('COMPETITOR_DISCOVERY_STALE_PAGES', 2))
+        self.refresh_interval = int(os.getenv('COMPETITOR_DISCOVERY_REFRESH_MINUTES', 360)) * 60
+        self.first_crawl_timeout = float(os.getenv('COMPETITOR_DISCOVERY_FIRST_CRAWL_TIMEOUT', 20))
+        self.max_age = float(os.getenv('COMPETITOR_DISCOVERY_MAX_AGE_DAYS', 30)) * 86400
+        self.request_timeout = float(os.getenv('HTTP_TIMEOUT', 30))
+        self.http = get_http_client()
+        self.resilience = get_resilience()
+        self._ua = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('COMPETITOR_DISCOVERY_WORKERS', 2)), thread_name_prefix='competitor-discovery'
+        )
+        self._refreshing: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path) if path != ':memory:' else ''
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS known_competitors ('
+            'niche TEXT NOT NULL, domain TEXT NOT NULL, url TEXT NOT NULL, '
+            'first_seen REAL NOT NULL, last_seen REAL NOT NULL, PRIMARY KEY (niche, domain))'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS discovery_runs ('
+            'niche TEXT PRIMARY KEY, refreshed_at REAL NOT NULL, pages INTEGER NOT NULL, found INTEGER NOT NULL)'
+        )
+
+    @property
+    def ua(self):
+        """Generador de User-Agent aleatorios, cargado al primer uso"""
+        if self._ua is None:
+            from fake_useragent import UserAgent
+            self._ua = UserAgent()
+        return self._ua
+
+    def competitors(self, niche: str, limit: Optional[int] = None, timeout: Optional[float] = None) -> List[str]:
+        """Devuelve las URLs de competidores conocidos del nicho, programando un refresco si están vencidos
+
+        La primera vez que se consulta un nicho se espera el recorrido inicial como
+        mucho `timeout` segundos (o COMPETITOR_DISCOVERY_FIRST_CRAWL_TIMEOUT); si no
+        termina a tiempo se devuelve lo guardado hasta entonces y el recorrido sigue
+        en segundo plano. Después la lista se sirve desde la base mientras se actualiza.
+        """
+        niche = self._niche_key(niche)
+        known = self._known(niche, limit)
+        if not known:
+            future = self.refresh_async(niche)
+            wait_for = self.first_crawl_timeout if timeout is None else min(timeout, self.first_crawl_timeout)
+            try:
+                future.result(timeout=max(0, wait_for))
+            except FutureTimeoutError:
+                self.logger.warning(
+                    f'El descubrimiento inicial de {niche} excedió {wait_for:.1f} s; se usan los encontrados'
+                )
+            except Exception as e:
+                self.logger.error(f'Error al descubrir competidores de {niche}: {str(e)}')
+            return self._known(niche, limit)
+        if self._is_stale(niche):
+            self.refresh_async(niche)
+        return known
+
+    def refresh_async(self, niche: str) -> Future:
+        """Programa el recorrido del listado del nicho; si ya hay uno en curso devuelve ese"""
+        niche = self._niche_key(niche)
+        with self._lock:
+            future = self._refreshing.get(niche)
+            if future is None or future.done():
+                future = self._executor.submit(self.refresh, niche)
+                self._refreshing[niche] = future
+            return future
+
+    def refresh(self, niche: str) -> int:
+        """Recorre las páginas del listado del nicho y guarda los competidores nuevos; devuelve cuántos encontró"""
+        niche = self._niche_key(niche)
+        already_known = self._known_domains(niche)
+        # Cerca del vencimiento de alguna tienda se recorre el listado completo para volver a marcarlas
+        oldest = self._oldest_seen(niche)
+        incremental = bool(already_known) and time.time() - oldest < self.max_age / 2
+        frontier = deque([LISTING_URL.format(niche=quote(niche))])
+        visited = set()
+        found = 0
+        pages = 0
+        pages_without_news = 0
+
+        while frontier and pages < self.max_pages:
+            page_url = frontier.popleft()
+            if page_url in visited:
+                continue
+            visited.add(page_url)
+
+            try:
+                links, next_page = self._fetch_listing(page_url)
+            except Exception as e:
+                self.logger.warning(f'No se pudo leer el listado {page_url}: {str(e)}')
+                break
+            pages += 1
+
+            listing_domain = normalize_domain(page_url)
+            new_stores = {}
+            for href in links:
+                url = urljoin(page_url, href)
+                domain = normalize_domain(url)
+                if not domain or domain == listing_domain or domain in already_known or domain in new_stores:
+                    continue
+                new_stores[domain] = url
+            self._save(niche, new_stores, links, page_url)
+            already_known.update(new_stores)
+            found += len(new_stores)
+
+            # En nichos ya conocidos se corta tras varias páginas sin tiendas nuevas
+            pages_without_news = 0 if new_stores else pages_without_news + 1
+            if incremental and pages_without_news >= self.stale_pages:
+                break
+            if next_page:
+                frontier.append(urljoin(page_url, next_page))
+
+        if not pages:
+            # Sin ninguna página leída no se registra el recorrido: se reintenta en la próxima consulta
+            return 0
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO discovery_runs (niche, refreshed_at, pages, found) VALUES (?, ?, ?, ?)',
+                (niche, time.time(), pages, found)
+            )
+            # Las tiendas que no volvieron a aparecer en el listado se dan por cerradas
+            self._conn.execute(
+                'DELETE FROM known_competitors WHERE niche = ? AND last_seen < ?', (niche, time.time() - self.max_age)
+            )
+        self.logger.info(f'Descubrimiento de {niche}: {pages} páginas, {found} competidores nuevos')
+        return found
+
+    def close(self) -> None:
+        """Detiene los refrescos pendientes y cierra la base"""
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            self._conn.close()
+
+    def _fetch_listing(self, page_url: str) -> Tuple[List[str], Optional[str]]:
+        """Descarga una página del listado respetando el límite de tasa y el circuito del host"""
+        headers = {'User-Agent': self.ua.random}
+
+        def fetch():
+            response = self.http.get(page_url, headers=headers, timeout=self.request_timeout)
+            response.raise_for_status()
+            return response.text
+
+        parser = ListingParser()
+        parser.feed(self.resilience.call(dependency_for(page_url), fetch))
+        parser.close()
+        return parser.store_links, parser.next_page
+
+    def _save(self, niche: str, new_stores: Dict[str, str], links: List[str], page_url: str) -> None:
+        """Guarda las tiendas nuevas y marca como vistas las que ya se conocían"""
+        now = time.time()
+        seen = {normalize_domain(urljoin(page_url, href)) for href in links}
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO known_competitors (niche, domain, url, first_seen, last_seen) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(niche, domain, url, now, now) for domain, url in new_stores.items()]
+                )
+                self._conn.executemany(
+                    'UPDATE known_competitors SET last_seen = ? WHERE niche = ? AND domain = ?',
+                    [(now, niche, domain) for domain in seen]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _known(self, niche: str, limit: Optional[int]) -> List[str]:
+        """URLs de los competidores vistos dentro del plazo de vigencia, primero los más recientes"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT url FROM known_competitors WHERE niche = ? AND last_seen >= ? '
+                'ORDER BY last_seen DESC, first_seen LIMIT ?',
+                (niche, time.time() - self.max_age, limit if limit else -1)
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def _known_domains(self, niche: str) -> set:
+        """Dominios ya registrados para el nicho"""
+        with self._lock:
+            rows = self._conn.execute('SELECT domain FROM known_competitors WHERE niche = ?', (niche,)).fetchall()
+        return {domain for (domain,) in rows}
+
+    def _oldest_seen(self, niche: str) -> float:
+        """Última vez que se vio la tienda menos reciente del nicho (0 si no hay ninguna)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MIN(last_seen) FROM known_competitors WHERE niche = ?', (niche,)
+            ).fetchone()
+        return row[0] or 0
+
+    def _is_stale(self, niche: str) -> bool:
+        """Indica si pasó el intervalo de refresco desde el último recorrido del nicho"""
+        with self._lock:
+            row = self._conn.execute('SELECT refreshed_at FROM discovery_runs WHERE niche = ?', (niche,)).fetchone()
+        return row is None or time.time() - row[0] >= self.refresh_interval
+
+    @staticmethod
+    def _niche_key(niche: str) -> str:
+        """Clave del nicho usada en la base y en la URL del listado"""
+        return niche.strip().lower()
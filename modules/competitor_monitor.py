@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .logger_config import LoggerConfig
+
+# Campos que se comparan como conjuntos: el orden en la página no es un cambio
+SET_FIELDS = ('redes_sociales', 'medios_pago', 'envios')
+
+_instances: Dict[str, 'CompetitorMonitor'] = {}
+_instances_lock = threading.Lock()
+
+
+def get_competitor_monitor(path: Optional[str] = None) -> 'CompetitorMonitor':
+    """Obtiene el monitor de competidores compartido para una ruta (o la de COMPETITOR_SNAPSHOT_PATH)"""
+    path = path or os.getenv('COMPETITOR_SNAPSHOT_PATH', 'data/competitor_snapshots.sqlite3')
+    if path != ':memory:':
+        path = os.path.abspath(path)
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = CompetitorMonitor(path)
+        return _instances[path]
+
+
+def diff_features(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Calcula las diferencias estructurales entre dos conjuntos de características"""
+    changes = {}
+    for field in sorted(set(before) | set(after)):
+        old, new = before.get(field), after.get(field)
+        if field in SET_FIELDS and isinstance(old or [], list) and isinstance(new or [], list):
+            added = sorted(set(new or []) - set(old or []))
+            removed = sorted(set(old or []) - set(new or []))
+            if added or removed:
+                changes[field] = {'added': added, 'removed': removed}
+        elif isinstance(old, dict) and isinstance(new, dict):
+            nested = diff_features(old, new)
+            if nested:
+                changes[field] = nested
+        elif old != new:
+            changes[field] = _value_change(old, new)
+    return changes
+
+
+def _value_change(old: Any, new: Any) -> Dict[str, Any]:
+    """Describe el cambio de un valor escalar, con delta y porcentaje si es numérico"""
+    change = {'before': old, 'after': new}
+    numeric = (int, float)
+    if isinstance(old, numeric) and isinstance(new, numeric) and not isinstance(old, bool) and not isinstance(new, bool):
+        change['delta'] = new - old
+        change['pct'] = round((new - old) / abs(old) * 100, 2) if old else None
+    return change
+
+
+class CompetitorMonitor:
+    """Guarda snapshots de las características de cada competidor y detecta cambios reales entre ellos"""
+
+    def __init__(self, path: str):
+        self.logger = LoggerConfig.get_logger('competitor_monitor')
+        self.path = path
+        self.check_interval = int(os.getenv('COMPETITOR_MONITOR_INTERVAL_MINUTES', 60)) * 60
+        self.retention = int(os.getenv('COMPETITOR_SNAPSHOT_RETENTION', 50))
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path) if path != ':memory:' else ''
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS competitor_snapshots ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, captured_at REAL NOT NULL, '
+            'fingerprint TEXT NOT NULL, features TEXT NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_snapshots_url ON competitor_snapshots(url, captured_at)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS monitored_stores ('
+            'url TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, last_checked_at REAL NOT NULL, '
+            'last_changed_at REAL NOT NULL)'
+        )
+
+    def is_due(self, url: str) -> bool:
+        """Indica si pasó el intervalo de monitoreo desde la última revisión de la tienda"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT last_checked_at FROM monitored_stores WHERE url = ?', (url,)
+                ).fetchone()
+            return row is None or time.time() - row[0] >= self.check_interval
+        except Exception as e:
+            self.logger.error(f'Error al consultar el monitoreo de {url}: {str(e)}')
+            return True
+
+    def record(self, url: str, features: Dict[str, Any]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Registra un snapshot y devuelve las diferencias con el anterior
+
+        Devuelve None para el primer snapshot de una tienda (no hay con qué comparar)
+        y un diccionario vacío si nada cambió, sin guardar un snapshot duplicado.
+        """
+        now = time.time()
+        fingerprint = self._fingerprint(features)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT fingerprint FROM monitored_stores WHERE url = ?', (url,)
+                ).fetchone()
+                if row is not None and row[0] == fingerprint:
+                    self._conn.execute(
+                        'UPDATE monitored_stores SET last_checked_at = ? WHERE url = ?', (now, url)
+                    )
+                    return {}
+
+                previous = self._conn.execute(
+                    'SELECT features FROM competitor_snapshots WHERE url = ? ORDER BY captured_at DESC, id DESC LIMIT 1',
+                    (url,)
+                ).fetchone()
+                self._conn.execute('BEGIN')
+                try:
+                    self._conn.execute(
+                        'INSERT INTO competitor_snapshots (url, captured_at, fingerprint, features) VALUES (?, ?, ?, ?)',
+                        (url, now, fingerprint, json.dumps(features, sort_keys=True, ensure_ascii=False))
+                    )
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO monitored_stores (url, fingerprint, last_checked_at, last_changed_at) '
+                        'VALUES (?, ?, ?, ?)', (url, fingerprint, now, now)
+                    )
+                    # Conservar solo los snapshots más recientes de cada tienda
+                    self._conn.execute(
+                        'DELETE FROM competitor_snapshots WHERE url = ? AND id NOT IN ('
+                        'SELECT id FROM competitor_snapshots WHERE url = ? ORDER BY captured_at DESC, id DESC LIMIT ?)',
+                        (url, url, self.retention)
+                    )
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    raise
+
+            if previous is None:
+                return None
+            return diff_features(json.loads(previous[0]), features)
+        except Exception as e:
+            self.logger.error(f'Error al registrar el snapshot de {url}: {str(e)}')
+            return None
+
+    def latest(self, url: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el último snapshot de una tienda con su fecha de captura"""
+        history = self.history(url, limit=1)
+        return history[0] if history else None
+
+    def history(self, url: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Devuelve los snapshots más recientes de una tienda, del más nuevo al más viejo"""
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT captured_at, features FROM competitor_snapshots WHERE url = ? '
+                    'ORDER BY captured_at DESC, id DESC LIMIT ?', (url, limit)
+                ).fetchall()
+            return [{'captured_at': captured_at, 'features': json.loads(features)} for captured_at, features in rows]
+        except Exception as e:
+            self.logger.error(f'Error al leer el historial de {url}: {str(e)}')
+            return []
+
+    def close(self) -> None:
+        """Cierra la conexión con la base de snapshots"""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _fingerprint(features: Dict[str, Any]) -> str:
+        """Huella del contenido que ignora el orden de los campos tipo conjunto"""
+        normalized = dict(features)
+        for field in SET_FIELDS:
+            if isinstance(normalized.get(field), list):
+                normalized[field] = sorted(normalized[field])
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+from .cache_registry import get_cache
+from .http_client import get_http_client
+from .logger_config import LoggerConfig
+
+_instance: Optional['ConditionalFetcher'] = None
+_instance_lock = threading.Lock()
+
+
+def get_conditional_fetcher() -> 'ConditionalFetcher':
+    """Obtiene el descargador condicional compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = ConditionalFetcher()
+        return _instance
+
+
+class ConditionalFetcher:
+    """Descarga páginas con GET condicional y evita volver a procesarlas si no cambiaron
+
+    Junto al resultado de la extracción se guardan los validadores de la respuesta
+    (ETag, Last-Modified y un hash del cuerpo). Un 304 o un cuerpo idéntico
+    devuelven el resultado anterior sin volver a parsear el HTML.
+    """
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('conditional_fetcher')
+        self.http = get_http_client()
+        # Los validadores sobreviven a la expiración del resultado para poder revalidarlo
+        self.validators = get_cache(
+            'http_validators',
+            expiration_minutes=int(os.getenv('CONDITIONAL_VALIDATORS_TTL_HOURS', 24)) * 60
+        )
+        self._lock = threading.Lock()
+        self._outcomes: Dict[str, int] = defaultdict(int)
+        self._bytes_received = 0
+
+    def fetch(self, scope: str, url: str, parse: Callable[[str], Dict], headers: Optional[Dict[str, str]] = None,
+              timeout: Optional[float] = None) -> Dict:
+        """Descarga la URL y devuelve el resultado de `parse`, reutilizando el anterior si la página no cambió
+
+        Los errores de red se propagan para que el llamador decida si reintentar.
+        """
+        key = f'{scope}:{url}'
+        record = self.validators.get(key)
+
+        request_headers = dict(headers or {})
+        if record:
+            if record.get('etag'):
+                request_headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                request_headers['If-Modified-Since'] = record['last_modified']
+
+        kwargs: Dict[str, Any] = {'headers': request_headers}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        response = self.http.get(url, **kwargs)
+
+        if response.status_code == 304 and record:
+            record = self._refresh_validators(record, response)
+            self.validators.set(key, record)
+            self._count('not_modified', 0)
+            return record['result']
+
+        response.raise_for_status()
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if record and record.get('body_hash') == body_hash:
+            record = self._refresh_validators(record, response)
+            self.validators.set(key, record)
+            self._count('unchanged', len(response.content))
+            return record['result']
+
+        result = parse(response.text)
+        self._count('parsed', len(response.content))
+        if isinstance(result, dict) and 'error' not in result:
+            self.validators.set(key, self._refresh_validators(
+                {'body_hash': body_hash, 'result': result}, response
+            ))
+        return result
+
+    def update_result(self, scope: str, url: str, result: Dict) -> None:
+        """Reemplaza el resultado guardado para una URL conservando sus validadores"""
+        key = f'{scope}:{url}'
+        record = self.validators.get(key)
+        if record:
+            self.validators.set(key, dict(record, result=result))
+
+    def forget(self, scope: str, url: str) -> None:
+        """Elimina los validadores guardados para una URL"""
+        self.validators.remove(f'{scope}:{url}')
+
+    def stats(self) -> Dict[str, int]:
+        """Devuelve cuántas descargas se parsearon, cuántas se evitaron y los bytes recibidos"""
+        with self._lock:
+            stats = dict(self._outcomes)
+            stats['bytes_received'] = self._bytes_received
+        return stats
+
+    @staticmethod
+    def _refresh_validators(record: Dict, response: Any) -> Dict:
+        """Actualiza ETag y Last-Modified con los que envió el servidor, si los hay"""
+        record = dict(record)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag:
+            record['etag'] = etag
+        if last_modified:
+            record['last_modified'] = last_modified
+        return record
+
+    def _count(self, outcome: str, received: int) -> None:
+        """Registra el resultado de una descarga"""
+        with self._lock:
+            self._outcomes[outcome] += 1
+            self._bytes_received += received
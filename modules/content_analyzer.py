@@ -1,5 +1,4 @@
 from typing import Dict, List, Optional
-from textblob import TextBlob
 from collections import Counter
 import re
 from datetime import datetime
@@ -17,6 +16,9 @@ class ContentAnalyzer:
     def analyze_post(self, content: str, metrics: Dict) -> Dict:
         """Analiza el contenido de un post y sus métricas"""
         try:
+            # TextBlob se importa al primer análisis para no demorar el arranque
+            from textblob import TextBlob
+            
             # Análisis de sentimiento
             blob = TextBlob(content)
             sentiment = blob.sentiment.polarity
@@ -76,6 +78,8 @@ class ContentAnalyzer:
 
     def _analyze_structure(self, content: str) -> Dict:
         """Analiza la estructura del contenido"""
+        from textblob import TextBlob
+        
         words = len(content.split())
         sentences = len(TextBlob(content).sentences)
         chars = len(content)
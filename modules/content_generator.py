@@ -1,15 +1,26 @@
 import os
+from datetime import datetime
 from typing import List, Dict
-from huggingface_hub import InferenceClient
 from bs4 import BeautifulSoup
 import requests
 import time
 import re
 from dotenv import load_dotenv
 from .content_analyzer import ContentAnalyzer
-from modules.cache_manager import CacheManager
+from modules.cache_registry import get_cache
+from modules.negative_cache import get_negative_cache
+from modules.conditional_fetcher import get_conditional_fetcher
+from modules.resilience import CircuitOpenError, dependency_for, get_resilience, jittered_backoff
 from modules.logger_config import LoggerConfig
 
+# Campo del producto -> (etiqueta, clase CSS) donde aparece en la página de Tiendanube
+PRODUCT_FIELDS = {
+    'nombre': ('h1', 'product-name'),
+    'precio': ('span', 'price'),
+    'descripcion': ('div', 'product-description')
+}
+PRODUCT_TAG_NAMES = sorted({name for name, _ in PRODUCT_FIELDS.values()})
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -20,11 +31,14 @@ class ContentGenerator:
             self.logger = LoggerConfig.get_logger('content_generator')
             self.logger.info('Inicializando ContentGenerator')
             
-            # Configurar cliente y servicios
-            self.client = InferenceClient(token=os.getenv('HUGGINGFACE_API_KEY'))
+            # Configurar servicios (el cliente de Hugging Face se crea al primer uso)
+            self._client = None
             self.content_analyzer = ContentAnalyzer()
             self.valid_platforms = ['Instagram', 'TikTok', 'Facebook']
-            self.cache_manager = CacheManager(expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            self.cache_manager = get_cache('content_generator', expiration_minutes=int(os.getenv('CACHE_EXPIRATION_MINUTES', 120)))
+            self.negative_cache = get_negative_cache()
+            self.fetcher = get_conditional_fetcher()
+            self.resilience = get_resilience()
             self.max_retries = int(os.getenv('MAX_RETRIES', 3))
             self.timeout = int(os.getenv('REQUEST_TIMEOUT', 10))
             self.model_name = os.getenv('MODEL_NAME', 'meta-llama/Llama-2-7b-chat-hf')
@@ -46,67 +60,77 @@ class ContentGenerator:
         except Exception as e:
             raise Exception(f"Error al inicializar ContentGenerator: {str(e)}")
 
+    @property
+    def client(self):
+        """Cliente de Hugging Face, creado al primer uso"""
+        if self._client is None:
+            from huggingface_hub import InferenceClient
+            self._client = InferenceClient(token=os.getenv('HUGGINGFACE_API_KEY'))
+        return self._client
+
     def _get_product_info(self, tienda_url: str) -> Dict:
         """Obtiene información del producto desde la URL de Tiendanube"""
-        if not tienda_url or not tienda_url.startswith('http'):
+        if not tienda_url or not isinstance(tienda_url, str) or not tienda_url.startswith(('http://', 'https://')):
             return {'error': 'URL inválida'}
 
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.get(tienda_url, timeout=self.timeout)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                product_info = {
-                    'nombre': soup.find('h1', {'class': 'product-name'}).text.strip() if soup.find('h1', {'class': 'product-name'}) else '',
-                    'precio': soup.find('span', {'class': 'price'}).text.strip() if soup.find('span', {'class': 'price'}) else '',
-                    'descripcion': soup.find('div', {'class': 'product-description'}).text.strip() if soup.find('div', {'class': 'product-description'}) else ''
-                }
+        # Evitar reintentar URLs que fallaron recientemente
+        if self.negative_cache.check('product_page', tienda_url):
+            return {'error': 'URL no accesible: verifica que la URL sea correcta y esté disponible'}
 
-                if not product_info['nombre'] or not product_info['precio']:
-                    return {'error': 'Información del producto incompleta'}
-
-                return product_info
-            except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    return {'error': f'Error de conexión: {str(e)}'}
-                time.sleep(2 ** attempt)  # Backoff exponencial
-            except Exception as e:
-                return {'error': f'Error al procesar la información: {str(e)}'}
-
-    def _validate_url(self, url: str) -> bool:
-        """Valida si una URL es accesible y tiene el formato correcto"""
-        if not url or not isinstance(url, str):
-            return False
-            
-        if not url.startswith(('http://', 'https://')):
-            return False
-            
-        for attempt in range(self.max_retries):
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-                response = requests.get(url, headers=headers, timeout=self.timeout, allow_redirects=True)
-                response.raise_for_status()
-                return True
-            except requests.exceptions.ConnectionError:
-                if attempt == self.max_retries - 1:
-                    return False
-                time.sleep(2 ** attempt)
-            except requests.exceptions.Timeout:
-                if attempt == self.max_retries - 1:
-                    return False
-                time.sleep(2 ** attempt)
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    return False
-                if attempt == self.max_retries - 1:
-                    return False
-                time.sleep(2 ** attempt)
-            except Exception:
-                if attempt == self.max_retries - 1:
-                    return False
-                time.sleep(2 ** attempt)
-        return False
+        # Una sola descarga por URL: todos los generadores comparten el producto parseado
+        return self.cache_manager.get_or_compute(
+            f'product:{tienda_url}',
+            lambda: self._fetch_product_info(tienda_url),
+            should_cache=lambda info: 'error' not in info
+        )
+
+    def _fetch_product_info(self, tienda_url: str) -> Dict:
+        """Descarga la página del producto una vez, validando la URL con la misma respuesta"""
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        try:
+            # Si la página no cambió desde la última descarga se reutiliza la extracción anterior;
+            # solo los errores transitorios se reintentan y el circuito del host corta si está caído
+            return self.resilience.call(
+                dependency_for(tienda_url),
+                lambda: self.fetcher.fetch('product_info', tienda_url, self._parse_product_info,
+                                           headers=headers, timeout=self.timeout),
+                retries=self.max_retries - 1
+            )
+        except CircuitOpenError as e:
+            return {'error': f'Servicio no disponible temporalmente: {str(e)}'}
+        except requests.RequestException as e:
+            self.negative_cache.record('product_page', tienda_url, e)
+            self.logger.error(f'Error de conexión con {tienda_url}: {str(e)}')
+            return {'error': 'URL no accesible: verifica que la URL sea correcta y esté disponible'}
+        except Exception as e:
+            return {'error': f'Error al procesar la información: {str(e)}'}
+
+    def _generate(self, prompt: str, **kwargs):
+        """Genera texto con Hugging Face protegido por el circuit breaker del servicio"""
+        return self.resilience.call(
+            'huggingface',
+            lambda: self.client.text_generation(prompt, **kwargs),
+            retries=1
+        )
+
+    def _parse_product_info(self, html: str) -> Dict:
+        """Extrae nombre, precio y descripción del HTML de un producto en un único recorrido"""
+        soup = BeautifulSoup(html, 'html.parser')
+        product_info = {field: '' for field in PRODUCT_FIELDS}
+        pending = dict(PRODUCT_FIELDS)
+        for tag in soup.find_all(PRODUCT_TAG_NAMES):
+            classes = tag.get('class') or ()
+            for field, (name, css_class) in list(pending.items()):
+                if tag.name == name and css_class in classes:
+                    product_info[field] = tag.text.strip()
+                    del pending[field]
+            if not pending:
+                break
+
+        if not product_info['nombre'] or not product_info['precio']:
+            return {'error': 'Información del producto incompleta'}
+
+        return product_info
 
     def _analyze_keywords(self, text: str) -> List[str]:
         """Extrae y analiza palabras clave relevantes del texto"""
@@ -144,10 +168,7 @@ class ContentGenerator:
         if platform not in self.valid_platforms:
             return {'error': f'Plataforma no soportada. Plataformas válidas: {", ".join(self.valid_platforms)}'}
 
-        # Validar URL y obtener información del producto
-        if not self._validate_url(tienda_url):
-            return {'error': 'URL no accesible: verifica que la URL sea correcta y esté disponible'}
-
+        # Descargar la página una sola vez: valida la URL y extrae el producto
         product_info = self._get_product_info(tienda_url)
         if 'error' in product_info:
             return product_info
@@ -200,7 +221,7 @@ class ContentGenerator:
             for attempt in range(max_attempts):
                 try:
                     # Generar contenido base con configuración optimizada
-                    response = self.client.text_generation(
+                    response = self._generate(
                         prompts[platform],
                         model=self.model_name,
                         **self.generation_config
@@ -216,7 +237,7 @@ class ContentGenerator:
                     
                     # Mejorar el contenido según el análisis
                     if initial_analysis['sentiment']['classification'] != 'Positivo':
-                        response = self.client.text_generation(
+                        response = self._generate(
                             f"{self.sentiment_boost_prompts['positive']} {content}",
                             model=self.model_name,
                             **self.generation_config
@@ -225,7 +246,7 @@ class ContentGenerator:
                     
                     # Adaptar a tendencias si es necesario
                     if platform in ['TikTok', 'Instagram']:
-                        response = self.client.text_generation(
+                        response = self._generate(
                             f"{self.sentiment_boost_prompts['trending']} {content}",
                             model=self.model_name,
                             **self.generation_config
@@ -251,7 +272,7 @@ class ContentGenerator:
                     
                     # Optimizar contenido según métricas y análisis
                     if analysis['engagement']['score'] < 70:
-                        response = self.client.text_generation(
+                        response = self._generate(
                             f"{self.sentiment_boost_prompts['engaging']} {content}",
                             model=self.model_name,
                             **self.generation_config
@@ -265,7 +286,7 @@ class ContentGenerator:
                             continue
                         
                         # Último intento: mejorar el contenido existente
-                        response = self.client.text_generation(
+                        response = self._generate(
                             f"Mejora este contenido para hacerlo más positivo y engaging, manteniendo el mensaje principal: {content}",
                             model=self.model_name,
                             **self.generation_config
@@ -278,9 +299,10 @@ class ContentGenerator:
                     break
 
                 except Exception as e:
-                    if attempt == max_attempts - 1:
+                    # Con el circuito abierto no tiene sentido seguir intentando
+                    if isinstance(e, CircuitOpenError) or attempt == max_attempts - 1:
                         raise e
-                    time.sleep(2 ** attempt)  # Backoff exponencial
+                    time.sleep(jittered_backoff(attempt))
 
             if not content or not analysis:
                 return {'error': 'No se pudo generar contenido después de múltiples intentos'}
@@ -304,7 +326,7 @@ class ContentGenerator:
 
         # Analizar palabras clave
         keywords = self._analyze_keywords(product_info['descripcion'])
-        self.keywords_cache[tienda_url] = keywords
+        self.cache_manager.set(f'keywords:{tienda_url}', keywords)
 
         prompt = f"""Genera una meta-descripción SEO y título optimizado para este producto:
         Producto: {product_info['nombre']}
@@ -318,7 +340,7 @@ class ContentGenerator:
         4. Optimizar para CTR con call-to-action"""
 
         try:
-            response = self.client.text_generation(
+            response = self._generate(
                 prompt,
                 model="meta-llama/Llama-2-7b-chat-hf",
                 max_new_tokens=200
@@ -351,7 +373,7 @@ class ContentGenerator:
         6. Efectos visuales recomendados"""
 
         try:
-            response = self.client.text_generation(
+            response = self._generate(
                 prompt,
                 model="meta-llama/Llama-2-7b-chat-hf",
                 max_new_tokens=200
@@ -363,6 +385,8 @@ class ContentGenerator:
     def _predict_engagement_metrics(self, content: str, platform: str) -> Dict:
         """Predice métricas de engagement basadas en análisis de contenido y plataforma"""
         try:
+            from textblob import TextBlob
+            
             # Análisis inicial del contenido
             sentiment_score = TextBlob(content).sentiment.polarity
             word_count = len(content.split())
@@ -445,7 +469,7 @@ class ContentGenerator:
             return {'error': 'No se pudo obtener la información del producto'}
 
         # Usar palabras clave almacenadas o generar nuevas
-        keywords = self.keywords_cache.get(tienda_url) or self._analyze_keywords(product_info['descripcion'])
+        keywords = self.cache_manager.get(f'keywords:{tienda_url}') or self._analyze_keywords(product_info['descripcion'])
 
         prompt = f"""Genera un artículo de blog completo sobre este producto:
         Producto: {product_info['nombre']}
@@ -468,7 +492,7 @@ class ContentGenerator:
         - Incluir sugerencias de imágenes"""
 
         try:
-            response = self.client.text_generation(
+            response = self._generate(
                 prompt,
                 model="meta-llama/Llama-2-7b-chat-hf",
                 max_new_tokens=1000
@@ -2,7 +2,7 @@ import os
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from .logger_config import LoggerConfig
-from .api_crud_manager import ApiCrudManager
+from .api_crud_manager import ApiCrudManager, PageIterator
 
 # Cargar variables de entorno
 load_dotenv()
@@ -71,6 +71,15 @@ class DashboardManager:
             self.logger.error(f"Error al eliminar tienda {store_id}: {str(e)}")
             return {'error': str(e)}
     
+    def iter_store_products(self, store_id: str, per_page: int = 50,
+                            cursor: Optional[Dict[str, int]] = None) -> PageIterator:
+        """Recorre el catálogo completo de una tienda página por página, retomable desde un cursor"""
+        return self.api_crud.iter_products(store_id, per_page, cursor)
+    
+    def iter_all_stores(self, per_page: int = 50, cursor: Optional[Dict[str, int]] = None) -> PageIterator:
+        """Recorre todas las tiendas página por página, retomable desde un cursor"""
+        return self.api_crud.iter_stores(per_page, cursor)
+    
     def get_store_products(self, store_id: str, page: int = 1, limit: int = 10) -> Dict:
         """Obtiene la lista de productos de una tienda"""
         try:
@@ -0,0 +1,170 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+from .logger_config import LoggerConfig
+
+_instances: Dict[str, 'DiskCache'] = {}
+_instances_lock = threading.Lock()
+
+
+def get_disk_cache(path: Optional[str] = None) -> Optional['DiskCache']:
+    """Obtiene la instancia compartida del caché en disco para una ruta (o la de CACHE_DISK_PATH)"""
+    path = path or os.getenv('CACHE_DISK_PATH')
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = DiskCache(path)
+        return _instances[path]
+
+
+class DiskCache:
+    """Segundo nivel de caché persistente en SQLite, compartible entre procesos del mismo host"""
+
+    def __init__(self, path: str, compaction_interval: Optional[int] = None):
+        self.logger = LoggerConfig.get_logger('disk_cache')
+        self.path = path
+        self.compaction_interval = compaction_interval or int(os.getenv('CACHE_DISK_COMPACTION_SECONDS', 600))
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        # auto_vacuum debe configurarse antes de crear las tablas
+        self._conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_entries ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, stale_at REAL NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries(expires_at)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags(key)')
+
+        self._stop_event = threading.Event()
+        self._compaction_thread = threading.Thread(
+            target=self._compaction_loop, name='disk-cache-compaction', daemon=True
+        )
+        self._compaction_thread.start()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, float, FrozenSet[str]]]:
+        """Devuelve (valor, segundos hasta vencer, segundos hasta expirar, etiquetas) si la entrada no ha expirado"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT value, stale_at, expires_at FROM cache_entries WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None or row[2] <= now:
+                    return None
+                tags = frozenset(tag for (tag,) in self._conn.execute(
+                    'SELECT tag FROM cache_tags WHERE key = ?', (key,)
+                ))
+            return pickle.loads(zlib.decompress(row[0])), row[1] - now, row[2] - now, tags
+        except Exception as e:
+            self.logger.error(f'Error al leer {key} del caché en disco: {str(e)}')
+            return None
+
+    def set(self, key: str, value: Any, ttl: float, stale_ttl: float = 0, tags: Iterable[str] = ()) -> None:
+        """Almacena un valor serializado con un TTL en segundos y un margen opcional de vencimiento"""
+        try:
+            blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            # Valores no serializables quedan solo en memoria
+            self.logger.debug(f'Valor no serializable para {key}: {str(e)}')
+            return
+        try:
+            with self._lock:
+                stale_at = time.time() + ttl
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO cache_entries (key, value, stale_at, expires_at) VALUES (?, ?, ?, ?)',
+                    (key, sqlite3.Binary(blob), stale_at, stale_at + stale_ttl)
+                )
+                self._conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags]
+                )
+        except Exception as e:
+            self.logger.error(f'Error al escribir {key} en el caché en disco: {str(e)}')
+
+    def remove(self, key: str) -> None:
+        """Elimina una entrada del caché en disco"""
+        try:
+            with self._lock:
+                self._conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+                self._conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+        except Exception as e:
+            self.logger.error(f'Error al eliminar {key} del caché en disco: {str(e)}')
+
+    def remove_tag(self, tag: str) -> None:
+        """Elimina todas las entradas con la etiqueta indicada"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)', (tag,)
+                )
+                self._conn.execute(
+                    'DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)', (tag,)
+                )
+        except Exception as e:
+            self.logger.error(f'Error al invalidar la etiqueta {tag} del caché en disco: {str(e)}')
+
+    def remove_prefix(self, prefix: str) -> None:
+        """Elimina todas las entradas cuya clave comienza con el prefijo"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+                )
+                self._conn.execute(
+                    'DELETE FROM cache_tags WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)
+                )
+        except Exception as e:
+            self.logger.error(f'Error al eliminar el prefijo {prefix!r} del caché en disco: {str(e)}')
+
+    def clear(self) -> None:
+        """Elimina todas las entradas del caché en disco"""
+        try:
+            with self._lock:
+                self._conn.execute('DELETE FROM cache_entries')
+                self._conn.execute('DELETE FROM cache_tags')
+        except Exception as e:
+            self.logger.error(f'Error al limpiar el caché en disco: {str(e)}')
+
+    def compact(self) -> int:
+        """Elimina las entradas expiradas y libera las páginas vacías del archivo"""
+        try:
+            with self._lock:
+                deleted = self._conn.execute(
+                    'DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),)
+                ).rowcount
+                self._conn.execute('DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)')
+                self._conn.execute('PRAGMA incremental_vacuum')
+                self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            if deleted:
+                self.logger.info(f'Compactación del caché en disco: {deleted} entradas expiradas eliminadas')
+            return deleted
+        except Exception as e:
+            self.logger.error(f'Error al compactar el caché en disco: {str(e)}')
+            return 0
+
+    def close(self) -> None:
+        """Detiene la compactación en segundo plano y cierra la conexión"""
+        self._stop_event.set()
+        with self._lock:
+            self._conn.close()
+
+    def _compaction_loop(self) -> None:
+        """Ejecuta la compactación periódicamente hasta que se cierre el caché"""
+        while not self._stop_event.wait(self.compaction_interval):
+            self.compact()
@@ -0,0 +1,126 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .logger_config import LoggerConfig
+from .rate_limiter import get_rate_limiter
+
+_instance: Optional['HttpClient'] = None
+_instance_lock = threading.Lock()
+
+
+def get_http_client() -> 'HttpClient':
+    """Obtiene el cliente HTTP compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = HttpClient()
+        return _instance
+
+
+class RateLimitedError(requests.exceptions.RequestException):
+    """El host está limitado por más tiempo del que se permite esperar"""
+
+
+class HttpClient:
+    """Cliente HTTP con una sesión keep-alive y un pool de conexiones por host"""
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+        self.logger = LoggerConfig.get_logger('http_client')
+        self.pool_connections = pool_connections or int(os.getenv('HTTP_POOL_CONNECTIONS', 10))
+        self.pool_maxsize = pool_maxsize or int(os.getenv('HTTP_POOL_MAXSIZE', 20))
+        self.timeout: Tuple[float, float] = (
+            connect_timeout or float(os.getenv('HTTP_CONNECT_TIMEOUT', 5)),
+            read_timeout or float(os.getenv('HTTP_TIMEOUT', 30))
+        )
+        self.rate_limiter = get_rate_limiter()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """Envía un pedido reutilizando la sesión del host, respetando su límite de tasa y el timeout por defecto"""
+        host = self._host_of(url)
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._session_for(host)
+        if not self.rate_limiter.acquire(url):
+            raise RateLimitedError(f'Límite de tasa alcanzado para {host}')
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+        response = session.request(method, url, **kwargs)
+        self.rate_limiter.feedback(url, response.status_code, response.headers.get('Retry-After'))
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Envía un pedido GET"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """Envía un pedido POST"""
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Devuelve, por host, los pedidos enviados, las conexiones abiertas y la tasa de reutilización"""
+        with self._lock:
+            sessions = dict(self._sessions)
+            requests_by_host = dict(self._requests)
+
+        stats = {}
+        for host, session in sessions.items():
+            opened = 0
+            for adapter in set(session.adapters.values()):
+                opened += self._opened_connections(adapter)
+            sent = requests_by_host.get(host, 0)
+            stats[host] = {
+                'requests': sent,
+                'connections_opened': opened,
+                'reuse_ratio': round(1 - opened / sent, 3) if sent else 0.0
+            }
+        return stats
+
+    def close(self) -> None:
+        """Cierra todas las sesiones y sus conexiones"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _session_for(self, host: str) -> requests.Session:
+        """Obtiene (o crea) la sesión keep-alive de un host"""
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive'
+                })
+                self._sessions[host] = session
+                self.logger.info(f'Sesión HTTP creada para {host}')
+            return session
+
+    def _opened_connections(self, adapter: HTTPAdapter) -> int:
+        """Cuenta las conexiones que abrieron los pools de un adaptador"""
+        try:
+            pools = adapter.poolmanager.pools
+            return sum(pools[key].num_connections for key in pools.keys())
+        except Exception as e:
+            self.logger.debug(f'No se pudieron leer las métricas del pool: {str(e)}')
+            return 0
+
+    @staticmethod
+    def _host_of(url: str) -> str:
+        """Extrae esquema y host de una URL para agrupar las conexiones"""
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'.lower()
@@ -1,58 +1,90 @@
-from typing import Dict, List, Optional
+import os
+from typing import Dict, List, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
 import json
 import re
 from datetime import datetime, timedelta
 from functools import lru_cache
-import time
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from requests.exceptions import RequestException
+from .http_client import RateLimitedError
 from .metrics_analyzer import MetricsAnalyzer, EngagementMetrics
+from .cache_registry import get_cache
+from .negative_cache import get_negative_cache
+from .rate_limiter import get_rate_limiter
+from .resilience import get_resilience, is_transient_error
 
 class InfluencerFinder:
     def __init__(self):
-        self.ua = UserAgent()
+        self._ua = None
         self.base_url = "https://www.instagram.com"
         self.api_url = "https://www.instagram.com/graphql/query"
-        self.request_delay = 3  # Aumentado para evitar rate limiting
-        self.last_request_time = 0
+        # Límite de pedidos por host compartido con el resto de los servicios
+        self.rate_limiter = get_rate_limiter()
+        self.resilience = get_resilience()
         self.max_retries = 4
+        # Hilos para descargar hashtags y para enriquecer perfiles en paralelo
+        self.hashtag_workers = int(os.getenv('INFLUENCER_HASHTAG_WORKERS', 3))
+        self.profile_workers = int(os.getenv('INFLUENCER_PROFILE_WORKERS', 4))
         self.metrics_analyzer = MetricsAnalyzer()
-        self.cache_manager = CacheManager(expiration_minutes=180)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': self.ua.random,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        })
+        self.cache_manager = get_cache('influencer_finder', expiration_minutes=180)
+        self.negative_cache = get_negative_cache()
+        # La sesión de Instagram se abre en la primera búsqueda, no al construir el servicio
+        self._session = None
+        self._session_lock = threading.Lock()
         self.engagement_thresholds = {
             'min_followers': 1000,
             'max_followers': 100000,
             'min_engagement': 2.5,
             'min_quality_score': 60
         }
-        self._init_session()
 
-    def _rate_limit_delay(self):
-        """Implementa un delay entre requests para evitar rate limiting"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.request_delay:
-            time.sleep(self.request_delay - time_since_last_request)
-        self.last_request_time = time.time()
+    @property
+    def ua(self):
+        """Generador de User-Agent aleatorios, cargado al primer uso"""
+        if self._ua is None:
+            from fake_useragent import UserAgent
+            self._ua = UserAgent()
+        return self._ua
 
-    def _init_session(self):
+    @property
+    def session(self) -> requests.Session:
+        """Sesión de Instagram, inicializada con sus cookies al primer uso"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.headers.update({
+                        'User-Agent': self.ua.random,
+                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                        'Accept-Language': 'en-US,en;q=0.5',
+                        'Accept-Encoding': 'gzip, deflate, br',
+                        'Connection': 'keep-alive',
+                        'Upgrade-Insecure-Requests': '1',
+                        'Cache-Control': 'no-cache',
+                        'Pragma': 'no-cache'
+                    })
+                    self._init_session(session)
+                    self._session = session
+        return self._session
+
+    def _rate_limited_get(self, url: str, **kwargs) -> requests.Response:
+        """Realiza un GET respetando el límite de tasa del host e informándole la respuesta"""
+        if not self.rate_limiter.acquire(url):
+            raise RateLimitedError(f'Límite de tasa alcanzado para {url}')
+        response = self.session.get(url, **kwargs)
+        self.rate_limiter.feedback(url, response.status_code, response.headers.get('Retry-After'))
+        return response
+
+    def _init_session(self, session: requests.Session):
         """Inicializa la sesión de Instagram obteniendo cookies necesarias"""
         try:
-            response = self.session.get(self.base_url)
+            response = session.get(self.base_url, timeout=10)
             response.raise_for_status()
-            self.session.cookies.update(response.cookies)
+            session.cookies.update(response.cookies)
         except Exception as e:
             print(f"Error al inicializar sesión: {str(e)}")
 
@@ -61,36 +93,28 @@ class InfluencerFinder:
         if max_retries is None:
             max_retries = self.max_retries
 
-        for attempt in range(max_retries):
-            try:
-                self._rate_limit_delay()
-                response = self.session.get(
-                    url,
-                    timeout=10,
-                    allow_redirects=True,
-                    headers={'X-Requested-With': 'XMLHttpRequest'}
-                )
-                
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', 30))
-                    time.sleep(retry_after)
-                    continue
-                    
-                response.raise_for_status()
-                return response.json()
-            except RequestException as e:
-                if 'Too Many Requests' in str(e):
-                    time.sleep(30)
-                    continue
-                if attempt == max_retries - 1:
-                    raise e
-                time.sleep(2 ** attempt)  # Exponential backoff
-            except ValueError as e:
-                if attempt == max_retries - 1:
-                    print(f"Error al procesar respuesta JSON: {str(e)}")
-                    return None
-                time.sleep(2 ** attempt)
-        return None
+        def fetch() -> Dict:
+            response = self._rate_limited_get(
+                url,
+                timeout=10,
+                allow_redirects=True,
+                headers={'X-Requested-With': 'XMLHttpRequest'}
+            )
+            # Un 429 ya bloqueó el host en el limitador según Retry-After; el reintento espera su turno
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            # Las respuestas JSON inválidas (páginas de login o de bloqueo) también se reintentan
+            return self.resilience.call(
+                'instagram',
+                fetch,
+                retries=max_retries - 1,
+                retry_on=lambda e: is_transient_error(e) or isinstance(e, ValueError)
+            )
+        except ValueError as e:
+            print(f"Error al procesar respuesta JSON: {str(e)}")
+            return None
 
     @lru_cache(maxsize=100)
     def _get_location_id(self, ubicacion: str) -> str:
@@ -199,13 +223,26 @@ class InfluencerFinder:
         """Determina si un perfil califica como micro-influencer"""
         return 1000 <= followers <= 100000 and engagement_rate >= 2.0
 
-    @lru_cache(maxsize=50)
     def _get_profile_metrics(self, username: str) -> Dict:
         """Obtiene métricas avanzadas de un perfil de Instagram"""
+        # Caché con TTL compartido entre hilos; los errores (429, timeouts...) no se guardan
+        return self.cache_manager.get_or_compute(
+            f'profile:{username}',
+            lambda: self._fetch_profile_metrics(username),
+            should_cache=lambda metrics: 'error' not in metrics
+        )
+
+    def _fetch_profile_metrics(self, username: str) -> Dict:
+        """Descarga y analiza el perfil de Instagram"""
+        profile_url = f"{self.base_url}/{username}/"
+        # Evitar pedir perfiles que fallaron recientemente (404, timeouts...)
+        failure = self.negative_cache.check('profile_metrics', profile_url)
+        if failure:
+            return {'error': f"Error de red: {failure['error']}"}
+
         try:
-            self._rate_limit_delay()
             headers = {'User-Agent': self.ua.random}
-            response = requests.get(f"{self.base_url}/{username}/", headers=headers, timeout=10)
+            response = self._rate_limited_get(profile_url, headers=headers, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'html.parser')
             
@@ -294,6 +331,7 @@ class InfluencerFinder:
             }
         except RequestException as e:
             print(f"Error de red al obtener métricas de {username}: {str(e)}")
+            self.negative_cache.record('profile_metrics', profile_url, e)
             return {'error': f"Error de red: {str(e)}"}
         except Exception as e:
             print(f"Error inesperado al obtener métricas de {username}: {str(e)}")
@@ -312,7 +350,82 @@ class InfluencerFinder:
         engagement_rate = 0.05  # 5% promedio
         return int(followers * engagement_rate)
 
-    def find_influencers(self, nicho: str, ubicacion: str) -> Dict:
+    def _fetch_hashtag_owners(self, hashtag: str) -> Tuple[List[str], Optional[str]]:
+        """Obtiene los autores de los posts recientes de un hashtag y, si falla, el motivo"""
+        try:
+            hashtag_id = self._get_hashtag_id(hashtag)
+            if not hashtag_id:
+                return [], None
+
+            # Búsqueda de posts con el hashtag
+            search_url = f"{self.api_url}?query_hash=9b498c08113f1e09617a1703c22b2f32&variables={{\"tag_name\":\"{hashtag}\",\"first\":50}}"
+            data = self._make_request(search_url)
+            if not data:
+                return [], f"No se pudieron obtener datos para el hashtag {hashtag}"
+
+            posts = data.get('data', {}).get('hashtag', {}).get('edge_hashtag_to_media', {}).get('edges', [])
+            usernames = []
+            for post in posts:
+                username = post.get('node', {}).get('owner', {}).get('username')
+                if username:
+                    usernames.append(username)
+            return usernames, None
+        except Exception as e:
+            return [], f"Error al procesar el hashtag {hashtag}: {str(e)}"
+
+    def _evaluate_candidate(self, username: str) -> Optional[Dict]:
+        """Enriquece un perfil y devuelve sus datos si califica como micro-influencer"""
+        try:
+            metrics = self._get_profile_metrics(username)
+            if 'error' in metrics:
+                return {'error': f"Error al obtener métricas para {username}: {metrics['error']}"}
+
+            avg_likes = metrics.get('engagement_metrics', {}).get('likes', 0)
+            engagement_rate = self._calculate_engagement(
+                metrics['followers'],
+                avg_likes,
+                metrics['posts']
+            )
+
+            if not self._is_micro_influencer(metrics['followers'], engagement_rate):
+                return None
+
+            return {
+                'username': username,
+                'followers': metrics['followers'],
+                'posts': metrics['posts'],
+                'avg_likes': avg_likes,
+                'engagement_rate': round(engagement_rate, 2),
+                'bio': metrics['bio'],
+                'last_updated': metrics.get('last_updated', datetime.now().isoformat())
+            }
+        except Exception as e:
+            return {'error': f"Error al procesar el perfil de {username}: {str(e)}"}
+
+    def _enrich_candidates(self, candidates: queue.Queue, stop: threading.Event, state: Dict,
+                           lock: threading.Lock, max_results: int) -> None:
+        """Toma perfiles de la cola y los enriquece hasta vaciarla o alcanzar la cantidad buscada"""
+        while not stop.is_set():
+            try:
+                username = candidates.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if username is None:
+                return
+
+            result = self._evaluate_candidate(username)
+            if result is None:
+                continue
+            with lock:
+                if 'error' in result:
+                    state['errors'].append(result['error'])
+                elif len(state['influencers']) < max_results:
+                    state['influencers'].append(result)
+                    if len(state['influencers']) >= max_results:
+                        # Cantidad alcanzada: se cancela el trabajo pendiente
+                        stop.set()
+
+    def find_influencers(self, nicho: str, ubicacion: str, max_results: int = 10) -> Dict:
         """Busca micro-influencers relevantes para el nicho y ubicación"""
         try:
             # Validar parámetros de entrada
@@ -325,68 +438,47 @@ class InfluencerFinder:
                 return {'error': 'No se encontraron hashtags para el nicho especificado'}
 
             location_id = self._get_location_id(ubicacion)
-            influencers = []
-            processed_usernames = set()
-            errors = []
+            state = {'influencers': [], 'errors': []}
+            lock = threading.Lock()
+            stop = threading.Event()
+            candidates: queue.Queue = queue.Queue()
+            seen_usernames = set()
 
-            # Buscar por hashtags
-            for hashtag in hashtags:
-                try:
-                    hashtag_id = self._get_hashtag_id(hashtag)
-                    if not hashtag_id:
-                        continue
-
-                    # Búsqueda de posts con el hashtag
-                    search_url = f"{self.api_url}?query_hash=9b498c08113f1e09617a1703c22b2f32&variables={{\"tag_name\":\"{hashtag}\",\"first\":50}}"
-                    data = self._make_request(search_url)
-                    
-                    if not data:
-                        errors.append(f"No se pudieron obtener datos para el hashtag {hashtag}")
-                        continue
-
-                    posts = data.get('data', {}).get('hashtag', {}).get('edge_hashtag_to_media', {}).get('edges', [])
-                    
-                    for post in posts:
-                        try:
-                            username = post['node']['owner']['username']
-                            if username in processed_usernames:
-                                continue
-
-                            metrics = self._get_profile_metrics(username)
-                            if 'error' in metrics:
-                                errors.append(f"Error al obtener métricas para {username}: {metrics['error']}")
-                                continue
-
-                            engagement_rate = self._calculate_engagement(
-                                metrics['followers'],
-                                metrics['avg_likes'],
-                                metrics['posts']
-                            )
-
-                            if self._is_micro_influencer(metrics['followers'], engagement_rate):
-                                influencer_data = {
-                                    'username': username,
-                                    'followers': metrics['followers'],
-                                    'posts': metrics['posts'],
-                                    'avg_likes': metrics['avg_likes'],
-                                    'engagement_rate': round(engagement_rate, 2),
-                                    'bio': metrics['bio'],
-                                    'last_updated': metrics.get('last_updated', datetime.now().isoformat())
-                                }
-                                influencers.append(influencer_data)
-                                processed_usernames.add(username)
-
-                            if len(influencers) >= 10:
-                                break
-                        except Exception as e:
-                            errors.append(f"Error al procesar el post de {username}: {str(e)}")
-                            continue
-
-                    if len(influencers) >= 10:
+            # Etapas: hashtags en paralelo -> cola de perfiles sin duplicados -> enriquecimiento
+            # en paralelo. El limitador de tasa mantiene el total dentro del presupuesto del host
+            hashtag_pool = ThreadPoolExecutor(max_workers=self.hashtag_workers, thread_name_prefix='influencer-hashtags')
+            profile_pool = ThreadPoolExecutor(max_workers=self.profile_workers, thread_name_prefix='influencer-profiles')
+            try:
+                hashtag_futures = [hashtag_pool.submit(self._fetch_hashtag_owners, hashtag) for hashtag in hashtags]
+                workers = [
+                    profile_pool.submit(self._enrich_candidates, candidates, stop, state, lock, max_results)
+                    for _ in range(self.profile_workers)
+                ]
+
+                for future in as_completed(hashtag_futures):
+                    if stop.is_set():
                         break
-                except Exception as e:
-                    errors.append(f"Error al procesar el hashtag {hashtag}: {str(e)}")
-                    continue
+                    usernames, error = future.result()
+                    if error:
+                        with lock:
+                            state['errors'].append(error)
+                    for username in usernames:
+                        if username not in seen_usernames:
+                            seen_usernames.add(username)
+                            candidates.put(username)
+
+                # Un marcador de fin por trabajador: terminan al vaciar la cola
+                for _ in workers:
+                    candidates.put(None)
+                wait(workers)
+            finally:
+                stop.set()
+                hashtag_pool.shutdown(wait=False, cancel_futures=True)
+                profile_pool.shutdown(wait=False, cancel_futures=True)
+
+            with lock:
+                influencers = list(state['influencers'])
+                errors = list(state['errors'])
 
             result = {
                 'total_found': len(influencers),
@@ -400,4 +492,4 @@ class InfluencerFinder:
 
         except Exception as e:
             print(f"Error general en find_influencers: {str(e)}")
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+import requests
+from .cache_registry import get_cache
+from .http_client import RateLimitedError
+from .logger_config import LoggerConfig
+
+# TTL en segundos por clase de error: los errores permanentes se recuerdan más tiempo
+DEFAULT_NEGATIVE_TTLS = {
+    'not_found': 3600,
+    'client_error': 900,
+    'rate_limited': 120,
+    'server_error': 300,
+    'timeout': 60,
+    'connection': 120,
+    'invalid_content': 600,
+    'unknown': 60
+}
+
+_instance: Optional['NegativeCache'] = None
+_instance_lock = threading.Lock()
+
+
+def get_negative_cache() -> 'NegativeCache':
+    """Obtiene el caché de resultados negativos compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = NegativeCache()
+        return _instance
+
+
+def classify_error(error: Exception) -> str:
+    """Clasifica una excepción de red en una clase de error con TTL propio"""
+    if isinstance(error, RateLimitedError):
+        return 'rate_limited'
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in (404, 410):
+            return 'not_found'
+        if status == 429:
+            return 'rate_limited'
+        if 400 <= status < 500:
+            return 'client_error'
+        return 'server_error'
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'connection'
+    if isinstance(error, ValueError):
+        return 'invalid_content'
+    return 'unknown'
+
+
+class NegativeCache:
+    """Recuerda fallos recientes de scraping y APIs para no repetir pedidos condenados a fallar"""
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('negative_cache')
+        self.cache = get_cache('negative_results')
+        self.ttls = {
+            kind: int(os.getenv(f'NEGATIVE_CACHE_TTL_{kind.upper()}', ttl))
+            for kind, ttl in DEFAULT_NEGATIVE_TTLS.items()
+        }
+        self._lock = threading.Lock()
+        self._avoided: Dict[str, int] = defaultdict(int)
+        self._recorded: Dict[str, int] = defaultdict(int)
+
+    def check(self, scope: str, url: str) -> Optional[Dict]:
+        """Devuelve el fallo registrado para la URL, si sigue vigente, y lo contabiliza como evitado"""
+        failure = self.cache.get(f'{scope}:{url}')
+        if failure is not None:
+            with self._lock:
+                self._avoided[failure['kind']] += 1
+        return failure
+
+    def record(self, scope: str, url: str, error: Exception, kind: Optional[str] = None) -> str:
+        """Registra un fallo con el TTL de su clase de error y devuelve la clase"""
+        kind = kind or classify_error(error)
+        self.cache.set(
+            f'{scope}:{url}',
+            {'kind': kind, 'error': str(error)},
+            ttl=self.ttls.get(kind, self.ttls['unknown'])
+        )
+        with self._lock:
+            self._recorded[kind] += 1
+        self.logger.info(f'Resultado negativo registrado para {url} ({kind})')
+        return kind
+
+    def forget(self, scope: str, url: str) -> None:
+        """Elimina el fallo registrado para una URL"""
+        self.cache.remove(f'{scope}:{url}')
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Devuelve cuántos fallos se registraron y cuántos pedidos se evitaron por clase de error"""
+        with self._lock:
+            return {
+                'recorded': dict(self._recorded),
+                'avoided': dict(self._avoided),
+                'total_avoided': sum(self._avoided.values())
+            }
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
 import json
 from dotenv import load_dotenv
@@ -7,16 +7,21 @@ from .logger_config import LoggerConfig
 from .metrics_analyzer import MetricsAnalyzer
 from .competitor_analyzer import CompetitorAnalyzer
 from .trend_analyzer import TrendAnalyzer
+from .competitor_monitor import get_competitor_monitor
 
 # Cargar variables de entorno
 load_dotenv()
 
 class NotificationManager:
-    def __init__(self):
+    def __init__(self, competitor_analyzer: Optional[CompetitorAnalyzer] = None,
+                 trend_analyzer: Optional[TrendAnalyzer] = None):
         self.logger = LoggerConfig.get_logger('notification_manager')
         self.metrics_analyzer = MetricsAnalyzer()
-        self.competitor_analyzer = CompetitorAnalyzer()
-        self.trend_analyzer = TrendAnalyzer()
+        # Reutilizar los analizadores compartidos cuando se proveen
+        self.competitor_analyzer = competitor_analyzer or CompetitorAnalyzer()
+        self.trend_analyzer = trend_analyzer or TrendAnalyzer()
+        # Snapshots de competidores para alertar solo sobre cambios reales
+        self.competitor_monitor = get_competitor_monitor()
         self.notification_types = {
             'metric_alert': 'Alerta de Métrica',
             'competitor_alert': 'Alerta de Competidor',
@@ -78,18 +83,25 @@ class NotificationManager:
         """Verifica alertas relacionadas con actividades de competidores"""
         try:
             alerts = []
-            competitor_data = self.competitor_analyzer._get_store_info(tienda_url)
+            # No volver a analizar la tienda en cada visita: solo al vencer el intervalo de monitoreo
+            if not self.competitor_monitor.is_due(tienda_url):
+                return alerts
             
-            # Verificar cambios en competidores
-            if 'error' not in competitor_data:
-                for key, value in competitor_data.items():
-                    if self._is_significant_change(key, value):
-                        alerts.append({
-                            'type': 'competitor_alert',
-                            'change_type': key,
-                            'details': value,
-                            'timestamp': datetime.now().isoformat()
-                        })
+            # Datos frescos: la copia en caché puede ser anterior a la última revisión
+            competitor_data = self.competitor_analyzer.refresh_store_info(tienda_url)
+            if 'error' in competitor_data:
+                return alerts
+            
+            # Comparar con el snapshot anterior; el primero solo establece la línea base
+            changes = self.competitor_monitor.record(tienda_url, competitor_data)
+            for key, change in (changes or {}).items():
+                if self._is_significant_change(key, change):
+                    alerts.append({
+                        'type': 'competitor_alert',
+                        'change_type': key,
+                        'details': self._describe_change(change),
+                        'timestamp': datetime.now().isoformat()
+                    })
             
             return alerts
         except Exception as e:
@@ -166,14 +178,38 @@ class NotificationManager:
         }
         return thresholds.get(metric, 0)
     
-    def _is_significant_change(self, key: str, value: any) -> bool:
-        """Determina si un cambio en una métrica es significativo"""
-        significant_changes = {
-            'precio': 10,  # cambio de precio > 10%
-            'stock': 50,   # cambio de stock > 50 unidades
-            'rating': 0.5  # cambio en calificación > 0.5 puntos
-        }
-        return abs(float(value)) > significant_changes.get(key, 0) if isinstance(value, (int, float)) else False
+    def _is_significant_change(self, key: str, change: Dict) -> bool:
+        """Determina si la diferencia entre dos snapshots de un competidor es significativa"""
+        if key == 'rango_precios':
+            # Cambio de precio promedio > 10% (o precios que aparecen donde no había)
+            avg_change = change.get('avg')
+            if not avg_change:
+                return False
+            return avg_change.get('pct') is None or abs(avg_change['pct']) > 10
+        if key in ('productos', 'categorias'):
+            # Catálogo: más de 10% o al menos 5 elementos de diferencia
+            return abs(change.get('pct') or 0) > 10 or abs(change.get('delta', 0)) >= 5
+        if 'added' in change or 'removed' in change:
+            # Nuevas redes, medios de pago o métodos de envío
+            return True
+        if isinstance(change.get('after'), bool):
+            # Se activó o desactivó una funcionalidad (envío gratis, descuentos, chat...)
+            return True
+        return False
+    
+    def _describe_change(self, change: Dict) -> str:
+        """Resume una diferencia entre snapshots en un texto legible"""
+        if 'added' in change or 'removed' in change:
+            parts = []
+            if change.get('added'):
+                parts.append(f"nuevos: {', '.join(map(str, change['added']))}")
+            if change.get('removed'):
+                parts.append(f"eliminados: {', '.join(map(str, change['removed']))}")
+            return '; '.join(parts)
+        if 'before' in change:
+            pct = f" ({change['pct']:+.1f}%)" if change.get('pct') is not None else ''
+            return f"{change['before']} → {change['after']}{pct}"
+        return '; '.join(f"{key}: {self._describe_change(value)}" for key, value in change.items())
     
     def _format_alerts(self, alerts: List[Dict]) -> List[Dict]:
         """Formatea las alertas para su presentación"""
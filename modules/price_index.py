@@ -0,0 +1,384 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from .logger_config import LoggerConfig
+
+# Categoría usada cuando los productos de la tienda no están clasificados
+DEFAULT_CATEGORY = 'general'
+
+_instances: Dict[str, 'PriceIndex'] = {}
+_instances_lock = threading.Lock()
+
+
+def get_price_index(path: Optional[str] = None) -> 'PriceIndex':
+    """Obtiene el índice de precios compartido para una ruta (o la de PRICE_INDEX_PATH)"""
+    path = path or os.getenv('PRICE_INDEX_PATH', 'data/price_index.sqlite3')
+    if path != ':memory:':
+        path = os.path.abspath(path)
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = PriceIndex(path)
+        return _instances[path]
+
+
+class QuantileSketch:
+    """Sketch de cuantiles con error relativo acotado (estilo DDSketch) sobre un arreglo de contadores
+
+    Cada precio cae en el bucket logarítmico ceil(log_gamma(precio)), así que
+    cualquier cuantil se estima con error relativo menor a `relative_accuracy`.
+    La memoria queda acotada a `max_buckets` contadores: si se superan, los
+    buckets más bajos se fusionan (los cuantiles altos conservan su precisión).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.counts = array('Q')
+        self.offset = 0
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        """Agrega un precio al sketch"""
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        key = self._key(value)
+        if not self.counts:
+            self.offset = key
+            self.counts.append(0)
+        elif key < self.offset:
+            self.counts[0:0] = array('Q', bytes(8 * (self.offset - key)))
+            self.offset = key
+        elif key >= self.offset + len(self.counts):
+            self.counts.extend(array('Q', bytes(8 * (key - self.offset - len(self.counts) + 1))))
+        self.counts[key - self.offset] += 1
+        if len(self.counts) > self.max_buckets:
+            self._collapse()
+
+    def update(self, values: Iterable[float]) -> None:
+        """Agrega varios precios al sketch"""
+        for value in values:
+            self.add(value)
+
+    def remove(self, values: Iterable[float]) -> None:
+        """Descuenta precios agregados antes; los extremos los recalcula quien conoce el resto de los precios"""
+        for value in values:
+            self.count -= 1
+            self.total -= value
+            if value <= 0:
+                self.zero_count -= 1
+                continue
+            if not self.counts:
+                continue
+            # Los precios de buckets ya fusionados se descuentan del primero
+            position = min(max(self._key(value) - self.offset, 0), len(self.counts) - 1)
+            if self.counts[position]:
+                self.counts[position] -= 1
+        if not self.count:
+            self.total = 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estima el cuantil q (entre 0 y 1) de los precios agregados"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.min, 0.0)
+        seen = self.zero_count
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen > rank:
+                return min(self.max, max(self.min, self._value(self.offset + index)))
+        return self.max
+
+    def rank(self, value: float) -> Optional[float]:
+        """Porcentaje de precios agregados menores o iguales al valor indicado"""
+        if not self.count:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 100.0
+        below = self.zero_count
+        if value > 0:
+            # Los buckets completos por debajo del valor y la mitad del bucket que lo contiene
+            position = self._key(value) - self.offset
+            below += sum(self.counts[:max(0, min(position, len(self.counts)))])
+            if 0 <= position < len(self.counts):
+                below += self.counts[position] / 2
+        return below / self.count * 100
+
+    def to_row(self) -> Tuple:
+        """Serializa el sketch para guardarlo en SQLite"""
+        return (self.relative_accuracy, self.offset, self.counts.tobytes(), self.zero_count,
+                self.count, self.total, self.min, self.max)
+
+    @classmethod
+    def from_row(cls, row: Tuple, max_buckets: int) -> 'QuantileSketch':
+        """Reconstruye un sketch guardado con to_row"""
+        relative_accuracy, offset, counts, zero_count, count, total, minimum, maximum = row
+        sketch = cls(relative_accuracy, max_buckets)
+        sketch.offset = offset
+        sketch.counts.frombytes(counts)
+        sketch.zero_count = zero_count
+        sketch.count = count
+        sketch.total = total
+        sketch.min = minimum if count else math.inf
+        sketch.max = maximum if count else -math.inf
+        return sketch
+
+    def _collapse(self) -> None:
+        """Fusiona los buckets más bajos para volver al máximo permitido"""
+        excess = len(self.counts) - self.max_buckets
+        merged = sum(self.counts[:excess + 1])
+        del self.counts[:excess]
+        self.counts[0] = merged
+        self.offset += excess
+
+    def _key(self, value: float) -> int:
+        """Bucket logarítmico de un valor positivo (los buckets fusionados caen en el primero)"""
+        key = math.ceil(math.log(value) / self._log_gamma)
+        if len(self.counts) >= self.max_buckets and key < self.offset:
+            return self.offset
+        return key
+
+    def _value(self, key: int) -> float:
+        """Valor representativo de un bucket, con error relativo acotado"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+class PriceIndex:
+    """Índice persistente de precios de la competencia por nicho y categoría
+
+    Los precios de cada tienda se guardan al extraerlos; al analizar un nicho se
+    suman a su sketch de cuantiles una sola vez por versión de la tienda, de modo
+    que la posición de un precio (percentil, mediana, IQR) se consulta sin volver
+    a procesar los listados.
+
+    La categoría la indica quien indexa y abarca todos los precios de la tienda:
+    las tarjetas de producto de la vitrina no traen la categoría de cada producto,
+    así que no se separan precios de una misma tienda entre categorías.
+    """
+
+    def __init__(self, path: str):
+        self.logger = LoggerConfig.get_logger('price_index')
+        self.path = path
+        self.relative_accuracy = float(os.getenv('PRICE_INDEX_ACCURACY', 0.01))
+        self.max_buckets = int(os.getenv('PRICE_INDEX_MAX_BUCKETS', 2048))
+        self._sketches: Dict[Tuple[str, str], QuantileSketch] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path) if path != ':memory:' else ''
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS store_prices ('
+            'url TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, prices BLOB NOT NULL, updated_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS price_sketches ('
+            'niche TEXT NOT NULL, category TEXT NOT NULL, relative_accuracy REAL NOT NULL, '
+            'key_offset INTEGER NOT NULL, counts BLOB NOT NULL, zero_count INTEGER NOT NULL, '
+            'count INTEGER NOT NULL, total REAL NOT NULL, min_price REAL, max_price REAL, '
+            'updated_at REAL NOT NULL, PRIMARY KEY (niche, category))'
+        )
+        # Junto a cada tienda indexada se guardan los precios sumados y sus extremos para poder
+        # descontarlos del sketch cuando cambian
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS indexed_stores ('
+            'niche TEXT NOT NULL, category TEXT NOT NULL, url TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+            'prices BLOB, min_price REAL, max_price REAL, PRIMARY KEY (niche, category, url))'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(indexed_stores)')}
+        for column, kind in (('prices', 'BLOB'), ('min_price', 'REAL'), ('max_price', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE indexed_stores ADD COLUMN {column} {kind}')
+
+    def observe_store(self, url: str, prices: List[float]) -> None:
+        """Guarda los precios extraídos de una tienda en un arreglo compacto"""
+        try:
+            packed = array('d', prices).tobytes()
+            fingerprint = hashlib.sha256(packed).hexdigest()
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO store_prices (url, fingerprint, prices, updated_at) VALUES (?, ?, ?, ?)',
+                    (url, fingerprint, packed, time.time())
+                )
+        except Exception as e:
+            self.logger.error(f'Error al guardar los precios de {url}: {str(e)}')
+
+    def add_store(self, niche: str, url: str, category: str = DEFAULT_CATEGORY) -> bool:
+        """Suma todos los precios de una tienda a una categoría del nicho; devuelve False si ya estaban incluidos
+
+        Si la tienda ya estaba indexada con otros precios, se descuentan del sketch los
+        que se habían sumado antes de agregar los actuales, para no contarla dos veces.
+        El costo depende solo de los precios de esa tienda, no de los del nicho.
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT fingerprint, prices FROM store_prices WHERE url = ?', (url,)
+                ).fetchone()
+                if row is None:
+                    return False
+                fingerprint, packed = row
+                indexed = self._conn.execute(
+                    'SELECT fingerprint, prices FROM indexed_stores WHERE niche = ? AND category = ? AND url = ?',
+                    (niche, category, url)
+                ).fetchone()
+                if indexed is not None and indexed[0] == fingerprint:
+                    return False
+
+                prices = self._unpack(packed)
+                sketch = self._sketch(niche, category)
+                if indexed is not None and indexed[1] is not None:
+                    sketch.remove(self._unpack(indexed[1]))
+                sketch.update(prices)
+                self._conn.execute('BEGIN')
+                try:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO indexed_stores (niche, category, url, fingerprint, prices, '
+                        'min_price, max_price) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (niche, category, url, fingerprint, packed,
+                         min(prices) if prices else None, max(prices) if prices else None)
+                    )
+                    if indexed is not None and indexed[1] is None:
+                        # Tienda indexada antes de guardar sus precios: no se sabe qué descontar
+                        sketch = self._rebuild(niche, category)
+                    elif indexed is not None:
+                        self._refresh_extremes(sketch, niche, category)
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO price_sketches (niche, category, relative_accuracy, key_offset, '
+                        'counts, zero_count, count, total, min_price, max_price, updated_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (niche, category) + self._finite(sketch.to_row()) + (time.time(),)
+                    )
+                    self._conn.execute('COMMIT')
+                except Exception:
+                    self._conn.execute('ROLLBACK')
+                    # El sketch en memoria ya incluye los precios: se descarta para releerlo de la base
+                    self._sketches.pop((niche, category), None)
+                    raise
+                return True
+        except Exception as e:
+            self.logger.error(f'Error al indexar los precios de {url} en {niche}/{category}: {str(e)}')
+            return False
+
+    def quantile(self, niche: str, q: float, category: str = DEFAULT_CATEGORY) -> Optional[float]:
+        """Estima el cuantil q (entre 0 y 1) de los precios de la competencia"""
+        try:
+            with self._lock:
+                return self._sketch(niche, category).quantile(q)
+        except Exception as e:
+            self.logger.error(f'Error al consultar el índice de {niche}/{category}: {str(e)}')
+            return None
+
+    def summary(self, niche: str, category: str = DEFAULT_CATEGORY) -> Dict:
+        """Devuelve cantidad, extremos, promedio, cuartiles, mediana e IQR de los precios de la competencia"""
+        try:
+            with self._lock:
+                sketch = self._sketch(niche, category)
+                if not sketch.count:
+                    return {'count': 0}
+                p25, median, p75 = (sketch.quantile(q) for q in (0.25, 0.5, 0.75))
+                return {
+                    'count': sketch.count,
+                    'min': sketch.min,
+                    'max': sketch.max,
+                    'avg': sketch.total / sketch.count,
+                    'p25': p25,
+                    'median': median,
+                    'p75': p75,
+                    'iqr': p75 - p25
+                }
+        except Exception as e:
+            self.logger.error(f'Error al consultar el índice de {niche}/{category}: {str(e)}')
+            return {'count': 0}
+
+    def position(self, niche: str, price: float, category: str = DEFAULT_CATEGORY) -> Dict:
+        """Ubica un precio entre los de la competencia: percentil y resumen de la categoría"""
+        summary = self.summary(niche, category)
+        if not summary['count']:
+            return summary
+        try:
+            with self._lock:
+                summary['percentile'] = round(self._sketch(niche, category).rank(price), 1)
+        except Exception as e:
+            self.logger.error(f'Error al ubicar el precio en {niche}/{category}: {str(e)}')
+        summary['price'] = price
+        return summary
+
+    def close(self) -> None:
+        """Cierra la conexión con la base del índice"""
+        with self._lock:
+            self._conn.close()
+
+    def _sketch(self, niche: str, category: str) -> QuantileSketch:
+        """Obtiene el sketch de un nicho y categoría, leyéndolo de la base la primera vez"""
+        key = (niche, category)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            row = self._conn.execute(
+                'SELECT relative_accuracy, key_offset, counts, zero_count, count, total, min_price, max_price '
+                'FROM price_sketches WHERE niche = ? AND category = ?', key
+            ).fetchone()
+            if row is None:
+                sketch = QuantileSketch(self.relative_accuracy, self.max_buckets)
+            else:
+                sketch = QuantileSketch.from_row(row, self.max_buckets)
+            self._sketches[key] = sketch
+        return sketch
+
+    def _refresh_extremes(self, sketch: QuantileSketch, niche: str, category: str) -> None:
+        """Recalcula mínimo y máximo del sketch con los extremos guardados de cada tienda indexada"""
+        minimum, maximum = self._conn.execute(
+            'SELECT MIN(min_price), MAX(max_price) FROM indexed_stores WHERE niche = ? AND category = ?',
+            (niche, category)
+        ).fetchone()
+        sketch.min = minimum if minimum is not None else math.inf
+        sketch.max = maximum if maximum is not None else -math.inf
+
+    def _rebuild(self, niche: str, category: str) -> QuantileSketch:
+        """Arma de nuevo el sketch de un nicho recorriendo los precios indexados de sus tiendas de a una fila"""
+        sketch = QuantileSketch(self.relative_accuracy, self.max_buckets)
+        cursor = self._conn.execute(
+            'SELECT COALESCE(indexed_stores.prices, store_prices.prices) FROM indexed_stores '
+            'LEFT JOIN store_prices ON store_prices.url = indexed_stores.url '
+            'WHERE indexed_stores.niche = ? AND indexed_stores.category = ?', (niche, category)
+        )
+        for (packed,) in cursor:
+            if packed is not None:
+                sketch.update(self._unpack(packed))
+        self._sketches[(niche, category)] = sketch
+        return sketch
+
+    @staticmethod
+    def _unpack(packed: bytes) -> array:
+        """Arreglo de precios guardado con observe_store"""
+        prices = array('d')
+        prices.frombytes(packed)
+        return prices
+
+    @staticmethod
+    def _finite(row: Tuple) -> Tuple:
+        """Reemplaza los extremos infinitos de un sketch vacío por NULL"""
+        return tuple(None if isinstance(value, float) and math.isinf(value) else value for value in row)
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from .logger_config import LoggerConfig
+
+# Límites por defecto (pedidos por segundo, ráfaga) de hosts que sabemos sensibles
+DEFAULT_HOST_LIMITS: Dict[str, Tuple[float, int]] = {
+    'www.instagram.com': (0.34, 2)
+}
+
+_instance: Optional['RateLimiter'] = None
+_instance_lock = threading.Lock()
+
+
+def get_rate_limiter() -> 'RateLimiter':
+    """Obtiene el limitador de tasa compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = RateLimiter()
+        return _instance
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convierte un encabezado Retry-After (segundos o fecha HTTP) en segundos de espera"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket de un host con ráfaga y reducción adaptativa de la tasa ante rechazos"""
+
+    def __init__(self, rate: float, burst: int, max_backoff: float = 300):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_backoff = max_backoff
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.granted = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Reserva un token y devuelve cuántos segundos esperar antes de usarlo (None si supera max_wait)"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+
+            # El token se descuenta ya: los pedidos siguientes esperan su turno detrás de este
+            self.tokens -= 1
+            self.granted += 1
+            self.waited += wait
+            return wait
+
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """Bloquea el host tras un rechazo y reduce la tasa a la mitad; devuelve la pausa aplicada"""
+        with self._lock:
+            self.strikes += 1
+            self.throttled += 1
+            pause = retry_after if retry_after is not None else min(self.max_backoff, 2 ** self.strikes)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            self.rate = max(self.base_rate * 0.1, self.rate * 0.5)
+            self.tokens = min(self.tokens, 0.0)
+            return pause
+
+    def reward(self) -> None:
+        """Recupera gradualmente la tasa configurada tras una respuesta aceptada"""
+        with self._lock:
+            self.strikes = 0
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+
+class RateLimiter:
+    """Limitador de tasa por host, seguro entre hilos y utilizable desde asyncio"""
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('rate_limiter')
+        self.default_rate = float(os.getenv('RATE_LIMIT_DEFAULT_RPS', 2))
+        self.default_burst = int(os.getenv('RATE_LIMIT_DEFAULT_BURST', 5))
+        self.max_wait = float(os.getenv('RATE_LIMIT_MAX_WAIT', 60))
+        self.host_limits = dict(DEFAULT_HOST_LIMITS)
+        self.host_limits.update(self._parse_host_limits(os.getenv('RATE_LIMIT_HOSTS', '')))
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url: str, max_wait: Optional[float] = None) -> bool:
+        """Espera el turno del host de la URL; devuelve False si la espera superaría max_wait"""
+        wait = self.bucket(url).reserve(self._max_wait(max_wait))
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, url: str, max_wait: Optional[float] = None) -> bool:
+        """Versión para asyncio de acquire: cede el bucle de eventos mientras espera"""
+        wait = self.bucket(url).reserve(self._max_wait(max_wait))
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def feedback(self, url: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        """Ajusta el límite del host según la respuesta: 429/503 bloquean y reducen la tasa"""
+        bucket = self.bucket(url)
+        if status_code in (429, 503):
+            pause = bucket.penalize(parse_retry_after(retry_after))
+            self.logger.warning(f'{self._host_of(url)} respondió {status_code}: pausa de {pause:.1f} s')
+        elif status_code < 400:
+            bucket.reward()
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Obtiene (o crea) el token bucket del host de una URL"""
+        host = self._host_of(url)
+        bucket = self._buckets.get(host)
+        if bucket is not None:
+            return bucket
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.host_limits.get(host, (self.default_rate, self.default_burst))
+                bucket = TokenBucket(rate, burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Devuelve por host la tasa actual, los pedidos concedidos, los rechazos y la espera acumulada"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            host: {
+                'rate': round(bucket.rate, 3),
+                'base_rate': bucket.base_rate,
+                'granted': bucket.granted,
+                'throttled': bucket.throttled,
+                'waited_seconds': round(bucket.waited, 1)
+            }
+            for host, bucket in buckets.items()
+        }
+
+    def _max_wait(self, max_wait: Optional[float]) -> float:
+        """Usa la espera máxima configurada cuando no se indica otra"""
+        return max_wait if max_wait is not None else self.max_wait
+
+    def _parse_host_limits(self, spec: str) -> Dict[str, Tuple[float, int]]:
+        """Interpreta RATE_LIMIT_HOSTS con el formato host=pedidos_por_segundo:ráfaga,..."""
+        limits = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            try:
+                host, limit = item.split('=', 1)
+                rate, _, burst = limit.partition(':')
+                limits[host.strip().lower()] = (float(rate), int(burst or 1))
+            except ValueError:
+                self.logger.warning(f'Límite de tasa inválido en RATE_LIMIT_HOSTS: {item}')
+        return limits
+
+    @staticmethod
+    def _host_of(url: str) -> str:
+        """Extrae el host de una URL (o devuelve el host si ya se pasó uno)"""
+        return (urlsplit(url).netloc or url).lower()
@@ -0,0 +1,224 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+import requests
+from .logger_config import LoggerConfig
+
+T = TypeVar('T')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_instance: Optional['Resilience'] = None
+_instance_lock = threading.Lock()
+
+
+def get_resilience() -> 'Resilience':
+    """Obtiene la capa de resiliencia compartida por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = Resilience()
+        return _instance
+
+
+def jittered_backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Espera exponencial con jitter completo: un valor aleatorio entre 0 y base * 2^intento"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Indica si un error puede resolverse reintentando (timeouts, caídas, 429 y 5xx)"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+def dependency_for(url: str) -> str:
+    """Nombre de la dependencia (host) al que pertenece una URL"""
+    return f'host:{urlsplit(url).netloc.lower()}'
+
+
+class CircuitOpenError(Exception):
+    """La dependencia está fallando y sus pedidos se rechazan sin intentarlos"""
+
+
+class CircuitBreaker:
+    """Circuit breaker de una dependencia: se abre tras fallos consecutivos y prueba recuperarse luego"""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica si se permite un pedido; en semiabierto deja pasar uno de prueba a la vez"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Cierra el circuito tras un pedido exitoso"""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_neutral(self) -> None:
+        """Libera el pedido de prueba sin cambiar el estado ni los fallos (errores propios del pedido)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Cuenta un fallo y abre el circuito al superar el umbral o si falla la prueba"""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Devuelve el estado actual del circuito"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+
+class RetryBudget:
+    """Presupuesto global de reintentos: cada pedido aporta una fracción y cada reintento consume uno
+
+    Así los reintentos nunca superan un porcentaje del tráfico, más un mínimo por
+    segundo para que los servicios con poco tráfico puedan reintentar.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, max_tokens: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.granted = 0
+        self.denied = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Registra un pedido original"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """Intenta tomar un reintento del presupuesto"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def _refill(self) -> None:
+        """Suma el mínimo garantizado por el tiempo transcurrido"""
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+
+class Resilience:
+    """Circuit breakers por dependencia, reintentos con jitter y presupuesto global de reintentos"""
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('resilience')
+        self.failure_threshold = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+        self.recovery_timeout = float(os.getenv('CIRCUIT_RECOVERY_SECONDS', 30))
+        self.budget = RetryBudget(
+            ratio=float(os.getenv('RETRY_BUDGET_RATIO', 0.2)),
+            min_per_second=float(os.getenv('RETRY_BUDGET_MIN_PER_SECOND', 1)),
+            max_tokens=float(os.getenv('RETRY_BUDGET_MAX', 20))
+        )
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, dependency: str) -> CircuitBreaker:
+        """Obtiene (o crea) el circuit breaker de una dependencia"""
+        breaker = self._breakers.get(dependency)
+        if breaker is not None:
+            return breaker
+        with self._lock:
+            breaker = self._breakers.get(dependency)
+            if breaker is None:
+                breaker = CircuitBreaker(dependency, self.failure_threshold, self.recovery_timeout)
+                self._breakers[dependency] = breaker
+            return breaker
+
+    def call(self, dependency: str, func: Callable[[], T], retries: int = 2,
+             retry_on: Callable[[Exception], bool] = is_transient_error) -> T:
+        """Ejecuta func protegida por el circuito de la dependencia, reintentando los errores transitorios
+
+        Lanza CircuitOpenError sin ejecutar nada si el circuito está abierto. Los
+        errores no transitorios se propagan de inmediato y no cuentan como fallo
+        de la dependencia.
+        """
+        breaker = self.breaker(dependency)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f'{dependency} no está disponible temporalmente')
+            try:
+                result = func()
+            except Exception as e:
+                if not retry_on(e):
+                    breaker.record_neutral()
+                    raise
+                breaker.record_failure()
+                if attempt >= retries or not self.budget.withdraw():
+                    raise
+                delay = jittered_backoff(attempt)
+                self.logger.info(f'Reintento {attempt + 1} para {dependency} en {delay:.1f} s: {str(e)}')
+                time.sleep(delay)
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve el estado de cada circuito y del presupuesto de reintentos"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'breakers': {name: breaker.snapshot() for name, breaker in breakers.items()},
+            'retry_budget': {
+                'available': round(self.budget.tokens, 2),
+                'granted': self.budget.granted,
+                'denied': self.budget.denied
+            }
+        }
@@ -0,0 +1,61 @@
+import importlib
+import threading
+from typing import Any, Callable, Dict, Tuple
+from .logger_config import LoggerConfig
+from .startup_profiler import get_startup_profiler
+
+# Servicio -> (módulo, clase). Los módulos se importan recién al pedir el servicio
+SERVICE_CLASSES: Dict[str, Tuple[str, str]] = {
+    'content_generator': ('modules.content_generator', 'ContentGenerator'),
+    'campaign_manager': ('modules.campaign_manager', 'CampaignManager'),
+    'competitor_analyzer': ('modules.competitor_analyzer', 'CompetitorAnalyzer'),
+    'influencer_finder': ('modules.influencer_finder', 'InfluencerFinder'),
+    'user_manager': ('modules.user_manager', 'UserManager'),
+    'dashboard_manager': ('modules.dashboard_manager', 'DashboardManager'),
+    'trend_analyzer': ('modules.trend_analyzer', 'TrendAnalyzer'),
+    'notification_manager': ('modules.notification_manager', 'NotificationManager')
+}
+
+
+class ServiceContainer:
+    """Construye cada servicio una sola vez por proceso y lo comparte entre sesiones
+
+    Los servicios no guardan estado por usuario; ese estado vive en
+    `st.session_state`. La importación y la construcción son perezosas y
+    seguras entre hilos, y su duración queda registrada en el perfilador de arranque.
+    """
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('service_container')
+        self.profiler = get_startup_profiler()
+        # Dependencias compartidas que algunos servicios reciben al construirse
+        self._dependencies: Dict[str, Callable[[], Dict[str, Any]]] = {
+            'notification_manager': lambda: {
+                'competitor_analyzer': self.get('competitor_analyzer'),
+                'trend_analyzer': self.get('trend_analyzer')
+            }
+        }
+        self._services: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in SERVICE_CLASSES}
+
+    def get(self, name: str) -> Any:
+        """Obtiene un servicio, importándolo y construyéndolo la primera vez que se solicita"""
+        service = self._services.get(name)
+        if service is not None:
+            return service
+
+        if name not in SERVICE_CLASSES:
+            raise KeyError(f'Servicio desconocido: {name}')
+
+        with self._locks[name]:
+            service = self._services.get(name)
+            if service is None:
+                module_name, class_name = SERVICE_CLASSES[name]
+                with self.profiler.measure('import', module_name):
+                    service_class = getattr(importlib.import_module(module_name), class_name)
+
+                kwargs = self._dependencies[name]() if name in self._dependencies else {}
+                with self.profiler.measure('init', name):
+                    service = service_class(**kwargs)
+                self._services[name] = service
+            return service
@@ -0,0 +1,60 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from .logger_config import LoggerConfig
+
+_instance: Optional['StartupProfiler'] = None
+_instance_lock = threading.Lock()
+
+
+def get_startup_profiler() -> 'StartupProfiler':
+    """Obtiene el perfilador de arranque compartido por el proceso"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = StartupProfiler()
+        return _instance
+
+
+class StartupProfiler:
+    """Registra el tiempo de importación e inicialización de cada módulo y servicio"""
+
+    def __init__(self):
+        self.logger = LoggerConfig.get_logger('startup_profiler')
+        self.process_start = time.perf_counter()
+        self._timings: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, phase: str, name: str) -> Iterator[None]:
+        """Mide la duración de una fase ('import' o 'init') de un módulo o servicio"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._timings.append({
+                    'phase': phase,
+                    'name': name,
+                    'ms': round(elapsed_ms, 1),
+                    'since_start_ms': round((start - self.process_start) * 1000, 1)
+                })
+            self.logger.info(f'Arranque - {phase} {name}: {elapsed_ms:.1f} ms')
+
+    def report(self) -> Dict:
+        """Devuelve el desglose de tiempos de arranque ordenado de mayor a menor"""
+        with self._lock:
+            timings = sorted(self._timings, key=lambda t: t['ms'], reverse=True)
+        totals: Dict[str, float] = {}
+        for timing in timings:
+            totals[timing['phase']] = round(totals.get(timing['phase'], 0) + timing['ms'], 1)
+        return {'totals_ms': totals, 'timings': timings}
+
+    def format_report(self) -> str:
+        """Formatea el desglose como tabla de texto para los logs"""
+        report = self.report()
+        lines = [f"{t['phase']:<7} {t['name']:<40} {t['ms']:>9.1f} ms" for t in report['timings']]
+        lines += [f"total {phase:<41} {ms:>9.1f} ms" for phase, ms in report['totals_ms'].items()]
+        return '\n'.join(lines)
@@ -0,0 +1,238 @@
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+# Elementos sin etiqueta de cierre: nunca quedan abiertos en la pila
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'
+})
+
+SOCIAL_PATTERN = re.compile(r'(facebook|instagram|twitter|tiktok)\.com', re.I)
+PAYMENT_SECTION_PATTERN = re.compile(r'payment-methods|medios-pago')
+SHIPPING_SECTION_PATTERN = re.compile(r'shipping-methods|metodos-envio')
+
+# Indicador -> términos buscados en los textos de la página (en minúsculas)
+TEXT_FLAGS = {
+    'envio_gratis': ('envío gratis',),
+    'tiene_descuentos': ('descuento',),
+    'tiene_chat': ('chat',),
+    'tiene_wishlist': ('wishlist', 'favoritos'),
+    'tiene_reviews': ('review', 'opiniones')
+}
+
+
+def extract_store_features(html: str, prices: Optional[List[float]] = None) -> Dict:
+    """Extrae todas las características de una tienda recorriendo su HTML una sola vez
+
+    Si se pasa `prices`, se le agregan los precios individuales encontrados en el mismo recorrido.
+    """
+    extractor = StorefrontExtractor()
+    extractor.feed(html)
+    extractor.close()
+    features = extractor.features()
+    if prices is not None:
+        prices.extend(price for price in extractor.prices if price is not None)
+    return features
+
+
+def parse_price(text: str) -> Optional[float]:
+    """Convierte un precio con formato local ($1.234,56) a número"""
+    try:
+        return float(text.strip().replace('$', '').replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+class StorefrontExtractor(HTMLParser):
+    """Tokenizador incremental que completa el diccionario de características en un único recorrido
+
+    Reproduce las búsquedas que antes se hacían sobre el árbol de BeautifulSoup
+    (html.parser): cierre de etiquetas hasta la última abierta con el mismo nombre,
+    coincidencia de clases por valor individual o por el atributo completo, y
+    textos de nodos individuales para los indicadores.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.site_name: Optional[str] = None
+        self.description: Optional[str] = None
+        self.product_count = 0
+        self.category_count = 0
+        self.social_links = set()
+        self.payment_methods: List[str] = []
+        self.shipping_methods: List[str] = []
+        self.prices: List[Optional[float]] = []
+        self.flags = {flag: False for flag in TEXT_FLAGS}
+        self.has_blog = False
+        self.has_meta_desc = False
+        self.has_alt_imgs = False
+        self._missing_content: Optional[str] = None
+
+        # Pila de etiquetas abiertas y secciones / textos que se están capturando
+        self._stack: List[str] = []
+        self._captures: List[Tuple[int, List, int, List[str]]] = []
+        self._payment_depth: Optional[int] = None
+        self._shipping_depth: Optional[int] = None
+        self._payment_seen = False
+        self._shipping_seen = False
+
+    def features(self) -> Dict:
+        """Devuelve las características con el mismo formato que el análisis anterior"""
+        if self._missing_content:
+            # Mismo error que producía acceder a ['content'] de un meta sin ese atributo
+            raise KeyError('content')
+        prices = [price for price in self.prices if price is not None]
+        return {
+            'nombre': self.site_name or '',
+            'descripcion': self.description or '',
+            'productos': self.product_count,
+            'categorias': self.category_count,
+            'redes_sociales': list(self.social_links),
+            'medios_pago': self.payment_methods,
+            'envios': self.shipping_methods,
+            'envio_gratis': self.flags['envio_gratis'],
+            'rango_precios': {
+                'min': min(prices),
+                'max': max(prices),
+                'avg': sum(prices) / len(prices)
+            } if prices else {'min': 0, 'max': 0, 'avg': 0},
+            'tiene_descuentos': self.flags['tiene_descuentos'],
+            'tiene_chat': self.flags['tiene_chat'],
+            'tiene_blog': self.has_blog,
+            'tiene_wishlist': self.flags['tiene_wishlist'],
+            'tiene_reviews': self.flags['tiene_reviews'],
+            'tiene_meta_desc': self.has_meta_desc,
+            'tiene_alt_imgs': self.has_alt_imgs
+        }
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        """Procesa una etiqueta de apertura"""
+        attributes = {name: value if value is not None else '' for name, value in attrs}
+        self._inspect(tag, attributes)
+        if tag not in VOID_ELEMENTS:
+            self._stack.append(tag)
+            self._open_section(tag, attributes)
+
+    def handle_endtag(self, tag: str) -> None:
+        """Cierra la etiqueta abierta más reciente con ese nombre y todas las que contiene"""
+        if tag not in self._stack:
+            return
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            self._close_depth(depth)
+            if closed == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        """Acumula el texto en las capturas abiertas y evalúa los indicadores"""
+        for _, _, _, parts in self._captures:
+            parts.append(data)
+        self._check_flags(data)
+
+    def handle_comment(self, data: str) -> None:
+        """Los comentarios también son nodos de texto para las búsquedas de indicadores"""
+        self._check_flags(data)
+
+    def close(self) -> None:
+        """Termina el análisis y cierra las etiquetas que quedaron abiertas"""
+        super().close()
+        while self._stack:
+            depth = len(self._stack)
+            self._stack.pop()
+            self._close_depth(depth)
+
+    def _inspect(self, tag: str, attributes: Dict[str, str]) -> None:
+        """Evalúa los selectores que dependen solo de la etiqueta y sus atributos"""
+        if tag == 'meta':
+            prop = attributes.get('property')
+            if prop == 'og:site_name' and self.site_name is None:
+                self.site_name = self._meta_content(attributes)
+            elif prop == 'og:description' and self.description is None:
+                self.description = self._meta_content(attributes)
+            if attributes.get('name') == 'description':
+                self.has_meta_desc = True
+        elif tag == 'a':
+            classes = attributes.get('class')
+            if classes is not None and self._has_class(classes, 'item-category'):
+                self.category_count += 1
+            href = attributes.get('href')
+            if href is not None:
+                for match in SOCIAL_PATTERN.finditer(href):
+                    self.social_links.add(match.group(1).lower())
+                if 'blog' in href.lower():
+                    self.has_blog = True
+        elif tag == 'img':
+            if 'alt' in attributes:
+                self.has_alt_imgs = True
+                if self._payment_depth is not None:
+                    self.payment_methods.append(attributes['alt'])
+        elif tag == 'div':
+            classes = attributes.get('class')
+            if classes is not None and self._has_class(classes, 'item-product'):
+                self.product_count += 1
+
+    def _open_section(self, tag: str, attributes: Dict[str, str]) -> None:
+        """Abre las capturas de texto y las secciones de pago / envío"""
+        depth = len(self._stack)
+        if tag in ('span', 'p') and self._shipping_depth is not None:
+            self._capture(depth, self.shipping_methods)
+        if tag == 'span':
+            classes = attributes.get('class')
+            if classes is not None and self._has_class(classes, 'price'):
+                self._capture(depth, self.prices)
+        if tag == 'div':
+            classes = attributes.get('class')
+            if classes is None:
+                return
+            if not self._payment_seen and self._matches_class(classes, PAYMENT_SECTION_PATTERN):
+                self._payment_seen = True
+                self._payment_depth = depth
+            if not self._shipping_seen and self._matches_class(classes, SHIPPING_SECTION_PATTERN):
+                self._shipping_seen = True
+                self._shipping_depth = depth
+
+    def _close_depth(self, depth: int) -> None:
+        """Finaliza las capturas y secciones abiertas en la profundidad indicada"""
+        while self._captures and self._captures[-1][0] == depth:
+            _, target, index, parts = self._captures.pop()
+            text = ''.join(parts)
+            target[index] = parse_price(text) if target is self.prices else text.strip()
+        if self._payment_depth == depth:
+            self._payment_depth = None
+        if self._shipping_depth == depth:
+            self._shipping_depth = None
+
+    def _capture(self, depth: int, target: List) -> None:
+        """Reserva el lugar del elemento en orden de documento y empieza a capturar su texto"""
+        target.append(None)
+        self._captures.append((depth, target, len(target) - 1, []))
+
+    def _check_flags(self, text: str) -> None:
+        """Marca los indicadores cuyos términos aparecen en el texto"""
+        lowered = None
+        for flag, terms in TEXT_FLAGS.items():
+            if self.flags[flag]:
+                continue
+            if lowered is None:
+                lowered = text.lower()
+            if any(term in lowered for term in terms):
+                self.flags[flag] = True
+
+    def _meta_content(self, attributes: Dict[str, str]) -> str:
+        """Obtiene el atributo content de un meta, registrando si falta"""
+        if 'content' not in attributes:
+            self._missing_content = 'content'
+            return ''
+        return attributes['content']
+
+    @staticmethod
+    def _has_class(classes: str, name: str) -> bool:
+        """Indica si el atributo class contiene la clase o es exactamente igual a ella"""
+        return name in classes.split() or classes == name
+
+    @staticmethod
+    def _matches_class(classes: str, pattern: re.Pattern) -> bool:
+        """Indica si alguna clase (o el atributo completo) coincide con la expresión"""
+        return any(pattern.search(value) for value in classes.split()) or bool(pattern.search(classes))
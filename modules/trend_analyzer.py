@@ -1,14 +1,14 @@
 import os
-from typing import Dict, List
-import pandas as pd
+from typing import Dict, List, TYPE_CHECKING
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from .logger_config import LoggerConfig
 from .metrics_analyzer import MetricsAnalyzer
-from .cache_manager import CacheManager
+from .cache_registry import get_cache
+
+if TYPE_CHECKING:
+    from sklearn.ensemble import RandomForestRegressor
 
 # Cargar variables de entorno
 load_dotenv()
@@ -17,9 +17,7 @@ class TrendAnalyzer:
     def __init__(self):
         self.logger = LoggerConfig.get_logger('trend_analyzer')
         self.metrics_analyzer = MetricsAnalyzer()
-        self.cache = CacheManager()
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+        self.cache = get_cache('trend_analyzer', expiration_minutes=60)
         
     def analyze_trends(self, tienda_url: str, historico_data: Dict = None) -> Dict:
         """Analiza tendencias y predice métricas futuras"""
@@ -31,12 +29,17 @@ class TrendAnalyzer:
             # Preparar datos para el modelo
             X, y = self._prepare_data(historico_data)
             
-            # Entrenar modelo
-            X_scaled = self.scaler.fit_transform(X)
-            self.model.fit(X_scaled, y)
+            # scikit-learn se importa recién cuando se analizan tendencias
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.preprocessing import StandardScaler
+            
+            # Entrenar modelo (propio de cada llamada: la instancia se comparte entre sesiones)
+            model = RandomForestRegressor(n_estimators=100, random_state=42)
+            X_scaled = StandardScaler().fit_transform(X)
+            model.fit(X_scaled, y)
             
             # Generar predicciones
-            predictions = self._generate_predictions(X_scaled)
+            predictions = self._generate_predictions(model, X_scaled)
             
             # Identificar tendencias emergentes
             trends = self._identify_trends(historico_data, predictions)
@@ -53,34 +56,29 @@ class TrendAnalyzer:
     def _get_historical_data(self, tienda_url: str) -> Dict:
         """Obtiene datos históricos de la tienda"""
         try:
-            # Intentar obtener del caché primero
+            # Los pedidos concurrentes de la misma tienda comparten una única carga
             cache_key = f'historical_data_{tienda_url}'
-            cached_data = self.cache.get(cache_key)
-            if cached_data:
-                return cached_data
-            
-            # Si no está en caché, obtener métricas históricas
-            metrics = self.metrics_analyzer.get_metrics(tienda_url)
-            
-            # Procesar y estructurar datos
-            historical_data = {
-                'ventas': metrics.get('ventas_historicas', []),
-                'visitas': metrics.get('visitas_historicas', []),
-                'conversion': metrics.get('tasa_conversion_historica', []),
-                'tendencias_busqueda': metrics.get('tendencias_busqueda', [])
-            }
-            
-            # Guardar en caché
-            self.cache.set(cache_key, historical_data)
-            
-            return historical_data
+            return self.cache.get_or_compute(cache_key, lambda: self._load_historical_data(tienda_url))
         except Exception as e:
             self.logger.error(f'Error obteniendo datos históricos: {str(e)}')
             return {}
     
+    def _load_historical_data(self, tienda_url: str) -> Dict:
+        """Obtiene y estructura las métricas históricas de la tienda"""
+        metrics = self.metrics_analyzer.get_metrics(tienda_url)
+        
+        return {
+            'ventas': metrics.get('ventas_historicas', []),
+            'visitas': metrics.get('visitas_historicas', []),
+            'conversion': metrics.get('tasa_conversion_historica', []),
+            'tendencias_busqueda': metrics.get('tendencias_busqueda', [])
+        }
+    
     def _prepare_data(self, historico_data: Dict) -> tuple:
         """Prepara los datos para el modelo predictivo"""
         try:
+            import pandas as pd
+            
             # Convertir datos a DataFrame
             df = pd.DataFrame(historico_data)
             
@@ -93,11 +91,11 @@ class TrendAnalyzer:
             self.logger.error(f'Error preparando datos: {str(e)}')
             return np.array([]), np.array([])
     
-    def _generate_predictions(self, X_scaled: np.ndarray) -> Dict:
+    def _generate_predictions(self, model: 'RandomForestRegressor', X_scaled: np.ndarray) -> Dict:
         """Genera predicciones para las próximas semanas"""
         try:
             # Predecir próximas 4 semanas
-            future_predictions = self.model.predict(X_scaled[-4:])
+            future_predictions = model.predict(X_scaled[-4:])
             
             # Estructurar predicciones
             dates = [(datetime.now() + timedelta(weeks=i)).strftime('%Y-%m-%d') 
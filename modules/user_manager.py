@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime
 import bcrypt
@@ -24,6 +25,8 @@ class UserProfile:
 class UserManager:
     def __init__(self):
         self.users: Dict[str, UserProfile] = {}
+        # La instancia se comparte entre sesiones: las altas deben ser atómicas
+        self._lock = threading.Lock()
         self._init_default_admin()
 
     def _init_default_admin(self) -> None:
@@ -43,24 +46,25 @@ class UserManager:
     def create_user(self, user_data: Dict) -> Dict:
         """Crea un nuevo usuario"""
         try:
-            if user_data['email'] in [u.email for u in self.users.values()]:
-                return {'error': 'El email ya está registrado'}
-
-            user_id = str(len(self.users) + 1)
-            new_user = UserProfile(
-                user_id=user_id,
-                username=user_data['username'],
-                email=user_data['email'],
-                full_name=user_data['full_name'],
-                role='user',
-                created_at=datetime.now(),
-                store_url=user_data.get('store_url'),
-                preferences={'theme': 'light', 'language': 'es'},
-                notification_settings={'email': True, 'push': True},
-                social_links={},
-                analytics={}
-            )
-            self.users[user_id] = new_user
+            with self._lock:
+                if user_data['email'] in [u.email for u in self.users.values()]:
+                    return {'error': 'El email ya está registrado'}
+
+                user_id = str(len(self.users) + 1)
+                new_user = UserProfile(
+                    user_id=user_id,
+                    username=user_data['username'],
+                    email=user_data['email'],
+                    full_name=user_data['full_name'],
+                    role='user',
+                    created_at=datetime.now(),
+                    store_url=user_data.get('store_url'),
+                    preferences={'theme': 'light', 'language': 'es'},
+                    notification_settings={'email': True, 'push': True},
+                    social_links={},
+                    analytics={}
+                )
+                self.users[user_id] = new_user
             return {'success': True, 'user_id': user_id}
         except Exception as e:
             return {'error': f'Error al crear usuario: {str(e)}'}
@@ -0,0 +1,30 @@
+import os
+import sys
+
+from dotenv import load_dotenv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Configuración de pruebas: bases SQLite en memoria y valores de .env.test
+load_dotenv(os.path.join(ROOT, '.env.test'), override=True)
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+
+def pytest_addoption(parser):
+    parser.addoption('--runslow', action='store_true', default=False, help='ejecuta los benchmarks lentos')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'slow: benchmark lento, solo se ejecuta con --runslow')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--runslow'):
+        return
+    import pytest
+    skip_slow = pytest.mark.skip(reason='benchmark lento: usar --runslow')
+    for item in items:
+        if 'slow' in item.keywords:
+            item.add_marker(skip_slow)
@@ -0,0 +1,86 @@
+"""Implementaciones por fila de CompetitorAnalyzer previas a la vectorización, usadas como referencia en las pruebas"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+
+def price_volatility(prices):
+    if len(prices) < 2:
+        return 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.std(prices) / np.mean(prices) * 100)
+
+
+def get_historical_prices(products_data):
+    historical_prices = []
+    for product in products_data:
+        if 'price_history' in product:
+            for date, price in product['price_history'].items():
+                historical_prices.append({'date': date, 'price': float(price)})
+    cutoff_date = datetime.now() - timedelta(days=30)
+    return sorted(
+        [p for p in historical_prices if datetime.strptime(p['date'], '%Y-%m-%d') >= cutoff_date],
+        key=lambda x: x['date']
+    )
+
+
+def predict_future_prices(historical_prices):
+    X = np.array(range(len(historical_prices))).reshape(-1, 1)
+    y = np.array([p['price'] for p in historical_prices])
+    model = LinearRegression()
+    model.fit(X, y)
+    future_dates = []
+    last_date = datetime.strptime(historical_prices[-1]['date'], '%Y-%m-%d')
+    for i in range(1, 8):
+        future_date = last_date + timedelta(days=i)
+        prediction = model.predict([[len(historical_prices) + i - 1]])[0]
+        future_dates.append({
+            'date': future_date.strftime('%Y-%m-%d'),
+            'predicted_price': max(0, float(prediction))
+        })
+    return future_dates
+
+
+def analyze_price_trends(products_data):
+    price_data = {'current_avg': 0, 'historical_trend': [], 'price_prediction': None, 'price_volatility': 0}
+    if not products_data:
+        return price_data
+    prices = [float(p['price']) for p in products_data if 'price' in p]
+    if prices:
+        price_data['current_avg'] = sum(prices) / len(prices)
+        price_data['price_volatility'] = price_volatility(prices)
+        historical_prices = get_historical_prices(products_data)
+        price_data['historical_trend'] = historical_prices
+        if len(historical_prices) >= 7:
+            price_data['price_prediction'] = predict_future_prices(historical_prices)
+    return price_data
+
+
+def evaluate_pricing_strategy(products_data):
+    try:
+        if not products_data:
+            return 0
+        score = 0
+        prices = [float(p['price']) for p in products_data if 'price' in p]
+        if price_volatility(prices) < 20:
+            score += 25
+        if prices:
+            avg_price = sum(prices) / len(prices)
+            if 100 <= avg_price <= 1000:
+                score += 25
+        discount_count = sum(1 for p in products_data if p.get('discount_price'))
+        if 0.1 <= discount_count / len(products_data) <= 0.3:
+            score += 25
+        categories = {}
+        for product in products_data:
+            categories.setdefault(product.get('category', 'other'), []).append(float(product['price']))
+        category_consistency = 0
+        for category_prices in categories.values():
+            if len(category_prices) > 1 and price_volatility(category_prices) < 15:
+                category_consistency += 1
+        if categories and category_consistency / len(categories) >= 0.7:
+            score += 25
+        return score
+    except Exception:
+        return 0
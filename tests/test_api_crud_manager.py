@@ -0,0 +1,114 @@
+import pytest
+
+from modules.api_crud_manager import ApiCrudManager
+from modules.cache_manager import NAMESPACE_SEPARATOR, CacheManager
+from modules.cache_registry import CacheNamespace
+from modules.disk_cache import DiskCache
+
+
+@pytest.fixture
+def disk(tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'))
+    yield disk
+    disk.close()
+
+
+def fresh_cache(disk=None):
+    """Nivel en memoria vacío, como el de un proceso recién iniciado que comparte el disco"""
+    return CacheNamespace(CacheManager(max_entries=100, max_bytes=10 ** 6, disk_cache=disk), 'tiendanube_api', 60)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ApiCrudManager()
+    manager.cache = fresh_cache()
+    manager.requests = []
+
+    def fake_request(method, endpoint, data=None):
+        manager.requests.append((method, endpoint))
+        if method == 'GET' and '?' in endpoint:
+            return [{'id': 1, 'name': 'Remera'}, {'id': 2, 'name': 'Buzo'}]
+        if method == 'GET':
+            return {'id': int(endpoint.rsplit('/', 1)[1]), 'name': 'Detalle'}
+        return {'id': 3, **(data or {})}
+
+    monkeypatch.setattr(manager, '_make_request', fake_request)
+    return manager
+
+
+def api_gets(manager):
+    return [endpoint for method, endpoint in manager.requests if method == 'GET']
+
+
+def load_list_and_details(manager):
+    manager.get_products('7')
+    manager.get_product('7', '1')
+    manager.get_product('7', '9')
+
+
+def test_invalidating_store_products_keeps_product_details(manager):
+    load_list_and_details(manager)
+    assert len(api_gets(manager)) == 3
+
+    manager.create_product('7', {'name': 'Gorra'})
+    manager.get_product('7', '1')
+    manager.get_product('7', '9')
+    assert len(api_gets(manager)) == 3
+
+    manager.get_products('7')
+    assert api_gets(manager)[-1] == 'store/7/products?page=1&per_page=10'
+
+
+def test_invalidation_applies_to_entries_promoted_from_disk(manager, disk):
+    manager.cache = fresh_cache(disk)
+    load_list_and_details(manager)
+
+    # Otro proceso lee las mismas claves desde el disco y las promueve a su memoria con sus etiquetas
+    manager.cache = fresh_cache(disk)
+    load_list_and_details(manager)
+    assert len(api_gets(manager)) == 3
+
+    manager.create_product('7', {'name': 'Gorra'})
+    manager.get_product('7', '1')
+    manager.get_product('7', '9')
+    assert len(api_gets(manager)) == 3
+
+    # El listado ya no está en el disco ni en la memoria del proceso que lo había promovido
+    prefix = f'tiendanube_api{NAMESPACE_SEPARATOR}'
+    assert disk.get(prefix + 'products_store_7_page_1_limit_10') is None
+    assert disk.get(prefix + 'product_7_1') is not None
+    manager.get_products('7')
+    assert api_gets(manager)[3:] == ['store/7/products?page=1&per_page=10']
+
+
+def test_updating_a_product_drops_only_the_pages_that_list_it(manager):
+    load_list_and_details(manager)
+    manager.update_product('7', '9', {'name': 'Otro'})
+    manager.get_products('7')
+    manager.get_product('7', '1')
+    manager.get_product('7', '9')
+    assert api_gets(manager)[3:] == ['store/7/products/9']
+
+    manager.update_product('7', '1', {'name': 'Otra'})
+    manager.get_products('7')
+    manager.get_product('7', '1')
+    manager.get_product('7', '9')
+    assert api_gets(manager)[4:] == ['store/7/products?page=1&per_page=10', 'store/7/products/1']
+
+
+def test_bulk_update_drops_only_the_details_it_changed(manager, monkeypatch):
+    load_list_and_details(manager)
+    manager.get_product('7', '2')
+
+    def fake_send(method, endpoint, payload):
+        product_id = endpoint.rsplit('/', 1)[1]
+        return ({'error': '500'}, 3) if product_id == '2' else ({'id': int(product_id), **payload}, 1)
+
+    monkeypatch.setattr(manager, '_send_write', fake_send)
+    report = manager.bulk_update_products('7', [{'id': 1, 'price': 10}, {'id': 2, 'price': 20}])
+    assert (report['succeeded'], report['failed']) == (1, 1)
+
+    for product_id in ('1', '2', '9'):
+        manager.get_product('7', product_id)
+    manager.get_products('7')
+    assert api_gets(manager)[4:] == ['store/7/products/1', 'store/7/products?page=1&per_page=10']
@@ -0,0 +1,78 @@
+"""Benchmarks de las rutas vectorizadas frente a las implementaciones por fila (pytest --runslow -s)"""
+import os
+import random
+import time
+
+import pytest
+
+import legacy_competitor_analyzer as legacy
+from conftest import FIXTURES
+from modules.competitor_analyzer import CompetitorAnalyzer
+from modules.storefront_extractor import extract_store_features
+from test_competitor_analyzer import generated_products, random_store
+from test_storefront_extractor import STOREFRONTS, legacy_parse_store_info, normalize
+
+pytestmark = pytest.mark.slow
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return CompetitorAnalyzer()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def test_price_history_100k_rows(analyzer):
+    # 12.500 productos x 8 puntos de historial = 100.000 filas
+    products = generated_products(12500, seed=7, history_points=8)
+    expected, before = timed(legacy.analyze_price_trends, products)
+    result, after = timed(analyzer._analyze_price_trends, products)
+    print(f'\nHistorial de precios (100k filas): por fila {before:.3f} s, vectorizado {after:.3f} s')
+    assert result['historical_trend'] == expected['historical_trend']
+
+
+def test_score_10k_stores(analyzer):
+    rng = random.Random(5)
+    # Tiendas bien formadas: las malformadas se puntúan por tienda en ambos caminos
+    stores = [random_store(rng, malformed=False) for _ in range(10000)]
+    expected, before = timed(
+        lambda: [analyzer._calculate_competitive_score(store['store_info'], store['products']) for store in stores]
+    )
+    result, after = timed(analyzer.score_stores, stores)
+    print(f'\nPuntuación de 10.000 tiendas: por tienda {before:.3f} s, vectorizado {after:.3f} s')
+    assert result == expected
+
+
+def large_storefront(target_bytes=650 * 1024):
+    """Página de tienda grande: la grilla de productos de la tienda grabada repetida hasta el tamaño pedido"""
+    with open(os.path.join(FIXTURES, 'storefronts', 'tienda_ropa.html'), encoding='utf-8') as f:
+        html = f.read()
+    start = html.index('<div class="item-product')
+    end = html.index('</section>', start)
+    grid = html[start:end]
+    copies = target_bytes // len(grid) + 1
+    return html[:start] + grid * copies + html[end:]
+
+
+def test_storefront_extractor_against_beautifulsoup():
+    pages = []
+    for path in STOREFRONTS:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+
+    expected, before = timed(lambda: [legacy_parse_store_info(html) for html in pages * 200])
+    result, after = timed(lambda: [extract_store_features(html) for html in pages * 200])
+    print(f'\nTiendas grabadas (x200): BeautifulSoup {before:.3f} s, extractor {after:.3f} s')
+    assert [normalize(features) for features in result] == [normalize(features) for features in expected]
+    assert after * 2 < before
+
+    html = large_storefront()
+    expected, before = timed(legacy_parse_store_info, html)
+    result, after = timed(extract_store_features, html)
+    print(f'Tienda de {len(html) // 1024} KB: BeautifulSoup {before:.3f} s, extractor {after:.3f} s')
+    assert normalize(result) == normalize(expected)
+    assert after * 2 < before
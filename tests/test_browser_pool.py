@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException, WebDriverException
+
+from modules.browser_pool import BrowserPool, _PooledBrowser
+from modules.resilience import CircuitOpenError, Resilience
+
+
+@pytest.fixture
+def pool():
+    pool = BrowserPool(size=1)
+    driver = mock.Mock()
+    driver.execute_script.return_value = 1
+    browser = _PooledBrowser(driver)
+
+    def launch():
+        pool._all.append(browser)
+        return browser
+
+    with mock.patch.object(pool, '_launch', side_effect=launch):
+        yield pool, driver
+
+
+def test_page_timeout_keeps_the_warm_browser(pool):
+    pool, driver = pool
+    driver.get.side_effect = TimeoutException('carga lenta')
+    with pytest.raises(TimeoutException):
+        pool.render('https://tienda.example')
+    stats = pool.stats()
+    assert stats['discarded'] == 0 and stats['idle'] == 1
+    driver.execute_script.assert_any_call('window.stop()')
+
+
+def test_dead_session_discards_the_browser(pool):
+    pool, driver = pool
+    driver.get.side_effect = InvalidSessionIdException('sesión cerrada')
+    with pytest.raises(InvalidSessionIdException):
+        pool.render('https://tienda.example')
+    stats = pool.stats()
+    assert stats['discarded'] == 1 and stats['alive'] == 0
+
+
+def test_failed_health_check_discards_the_browser(pool):
+    pool, driver = pool
+    driver.get.side_effect = TimeoutException('carga lenta')
+    driver.execute_script.side_effect = Exception('chrome no responde')
+    with pytest.raises(TimeoutException):
+        pool.render('https://tienda.example')
+    assert pool.stats()['discarded'] == 1
+
+
+def test_failed_launches_open_the_browser_circuit(monkeypatch):
+    monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '2')
+    monkeypatch.setenv('CIRCUIT_RECOVERY_SECONDS', '60')
+    pool = BrowserPool(size=1)
+    pool.resilience = Resilience()
+    chrome = mock.Mock(side_effect=WebDriverException('chrome no instalado'))
+    monkeypatch.setattr('selenium.webdriver.Chrome', chrome)
+
+    for _ in range(2):
+        with pytest.raises(WebDriverException):
+            pool.render('https://tienda.example')
+    # Con el circuito abierto ya no se intenta iniciar Chrome en cada pedido
+    for _ in range(3):
+        with pytest.raises(CircuitOpenError):
+            pool.render('https://tienda.example')
+    assert chrome.call_count == 2
+    assert pool.stats()['launched'] == 0
@@ -0,0 +1,221 @@
+import threading
+import time
+
+import pytest
+
+from modules.cache_manager import CacheManager, _estimate_size
+
+
+class FakeClock:
+    """Reloj monótono controlado por la prueba"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return CacheManager(expiration_minutes=1, max_entries=100, max_bytes=10 ** 6, clock=clock)
+
+
+def test_evicts_least_recently_used_by_entry_count(clock):
+    cache = CacheManager(max_entries=3, max_bytes=10 ** 6, clock=clock)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'  # 'a' pasa a ser la más reciente
+
+    cache.set('d', 'D')
+    assert len(cache) == 3
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['A', 'C', 'D']
+    assert cache.stats()['']['evictions'] == 1
+
+
+def test_evicts_least_recently_used_by_bytes(clock):
+    value = 'x' * 1000
+    entry_size = _estimate_size('k1') + _estimate_size(value)
+    cache = CacheManager(max_entries=100, max_bytes=3 * entry_size + entry_size // 2, clock=clock)
+    for key in ('k1', 'k2', 'k3'):
+        cache.set(key, value)
+    assert cache.total_bytes == 3 * entry_size
+    cache.get('k1')
+
+    cache.set('k4', value)
+    assert cache.get('k2') is None
+    assert {key for key in ('k1', 'k3', 'k4') if cache.get(key) is not None} == {'k1', 'k3', 'k4'}
+    assert cache.total_bytes == 3 * entry_size
+
+
+def test_value_larger_than_budget_is_not_stored(clock):
+    cache = CacheManager(max_entries=100, max_bytes=500, clock=clock)
+    cache.set('small', 'ok')
+    cache.set('big', 'x' * 1000)
+    assert cache.get('big') is None
+    assert cache.get('small') == 'ok'
+
+
+def test_entries_expire_on_the_monotonic_clock(cache, clock):
+    cache.set('short', 1, ttl=10)
+    cache.set('long', 2, ttl=30)
+    clock.advance(9.9)
+    assert cache.get('short') == 1
+
+    clock.advance(0.1)
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+
+
+def test_expiry_heap_purges_without_reading_the_entries(cache, clock):
+    for index in range(5):
+        cache.set(f'k{index}', index, ttl=10 + index)
+    clock.advance(12)
+    cache.cleanup_expired()
+    assert len(cache) == 2
+    assert cache.stats()['']['expirations'] == 3
+
+    # Cada escritura también descarta lo que venció, sin pasar por cleanup_expired
+    clock.advance(10)
+    cache.set('new', 'v', ttl=10)
+    assert len(cache) == 1
+
+
+def test_replaced_entry_keeps_its_new_expiry(cache, clock):
+    cache.set('key', 'old', ttl=10)
+    cache.set('key', 'new', ttl=100)
+    clock.advance(20)
+    cache.cleanup_expired()
+    assert cache.get('key') == 'new'
+
+    clock.advance(100)
+    cache.cleanup_expired()
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+
+
+def start_concurrent_callers(cache, key, loader, count=10, **kwargs):
+    """Lanza `count` llamadas a get_or_compute y espera a que todas menos el líder queden esperando la carga"""
+    outcomes = [None] * count
+
+    def call(position):
+        try:
+            outcomes[position] = ('ok', cache.get_or_compute(key, loader, **kwargs))
+        except Exception as e:
+            outcomes[position] = ('error', e)
+
+    threads = [threading.Thread(target=call, args=(position,)) for position in range(count)]
+    for thread in threads:
+        thread.start()
+
+    def followers_waiting():
+        flight = cache._in_flight.get(key)
+        return flight is not None and len(flight._condition._waiters) == count - 1
+
+    deadline = time.monotonic() + 5
+    while not followers_waiting():
+        assert time.monotonic() < deadline, 'las llamadas concurrentes no llegaron a esperar la carga'
+        time.sleep(0.001)
+    return threads, outcomes
+
+
+def blocking_loader(release, result=None, error=None):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return loader, calls
+
+
+def test_concurrent_callers_share_a_single_load(cache):
+    release = threading.Event()
+    loader, calls = blocking_loader(release, result={'id': 1})
+    threads, outcomes = start_concurrent_callers(cache, 'key', loader)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert outcomes == [('ok', {'id': 1})] * 10
+    assert cache.get('key') == {'id': 1}
+    assert cache._in_flight == {}
+
+
+def test_loader_exception_reaches_every_waiter_and_is_not_cached(cache):
+    release = threading.Event()
+    error = RuntimeError('falló la carga')
+    loader, calls = blocking_loader(release, error=error)
+    threads, outcomes = start_concurrent_callers(cache, 'key', loader)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(kind == 'error' and raised is error for kind, raised in outcomes)
+    assert cache.get('key') is None
+    assert cache._in_flight == {}
+
+    # El siguiente pedido vuelve a intentar la carga
+    assert cache.get_or_compute('key', lambda: 'ok') == 'ok'
+
+
+def test_rejected_results_are_shared_but_not_cached(cache):
+    release = threading.Event()
+    loader, calls = blocking_loader(release, result={'error': 'no disponible'})
+    threads, outcomes = start_concurrent_callers(
+        cache, 'key', loader, should_cache=lambda data: 'error' not in data
+    )
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert outcomes == [('ok', {'error': 'no disponible'})] * 10
+    assert cache.get('key') is None
+
+    cache.get_or_compute('key', loader, should_cache=lambda data: 'error' not in data)
+    assert len(calls) == 2
+
+
+def test_stale_entry_is_served_while_it_reloads_in_background(cache, clock):
+    cache.set('key', 'old', ttl=10, stale_ttl=100)
+    clock.advance(20)
+
+    release = threading.Event()
+    loader, calls = blocking_loader(release, result='new')
+    assert cache.get_or_compute('key', loader, ttl=10, stale_ttl=100) == 'old'
+    flight = cache._in_flight['key']
+    assert not flight.done()
+
+    # Mientras la recarga sigue en curso se sigue sirviendo el valor vencido sin otra carga
+    assert cache.get_or_compute('key', loader, ttl=10, stale_ttl=100) == 'old'
+    release.set()
+    assert flight.result(5) == 'new'
+    assert len(calls) == 1
+    assert cache.get('key') == 'new'
+    assert cache.stats()['']['stale_hits'] == 2
+
+
+def test_get_does_not_serve_or_count_stale_entries(cache, clock):
+    cache.set('key', 'old', ttl=10, stale_ttl=100)
+    clock.advance(20)
+    assert cache.get('key') is None
+    stats = cache.stats()['']
+    assert (stats['stale_hits'], stats['misses']) == (0, 1)
+
+    # La entrada se conserva para get_or_compute hasta su expiración definitiva
+    assert cache.get_or_compute('key', lambda: 'new', ttl=10, stale_ttl=100) == 'old'
+    assert cache.stats()['']['stale_hits'] == 1
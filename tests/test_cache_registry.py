@@ -0,0 +1,78 @@
+import pytest
+
+from modules.cache_manager import NAMESPACE_SEPARATOR, _estimate_size
+from modules.cache_registry import CacheRegistry
+
+
+@pytest.fixture
+def registry():
+    return CacheRegistry(max_entries=100, max_bytes=10 ** 6)
+
+
+def test_entry_quota_evicts_only_inside_its_namespace(registry):
+    small = registry.namespace('small', max_entries=2)
+    other = registry.namespace('other')
+    for index in range(5):
+        other.set(f'k{index}', index)
+    small.set('a', 1)
+    small.set('b', 2)
+    assert small.get('a') == 1
+
+    small.set('c', 3)
+    assert small.get('b') is None
+    assert (small.get('a'), small.get('c')) == (1, 3)
+    assert [other.get(f'k{index}') for index in range(5)] == [0, 1, 2, 3, 4]
+    assert small.stats()['evictions'] == 1
+    assert other.stats()['evictions'] == 0
+
+
+def test_byte_quota_evicts_only_inside_its_namespace(registry):
+    value = 'x' * 2000
+    entry_size = _estimate_size(f'small{NAMESPACE_SEPARATOR}k0') + _estimate_size(value)
+    small = registry.namespace('small', max_mb=(2 * entry_size + 100) / (1024 * 1024))
+    other = registry.namespace('other')
+    other.set('big', value)
+    for index in range(3):
+        small.set(f'k{index}', value)
+
+    assert small.get('k0') is None
+    assert small.stats()['entries'] == 2
+    assert small.stats()['bytes'] <= 2 * entry_size + 100
+    assert other.get('big') == value
+
+
+def test_same_key_is_isolated_between_namespaces(registry):
+    first, second = registry.namespace('first'), registry.namespace('second')
+    first.set('key', 'uno', tags=['t'])
+    second.set('key', 'dos', tags=['t'])
+
+    assert first.invalidate_tag('t') == 1
+    assert first.get('key') is None
+    assert second.get('key') == 'dos'
+
+    second.clear()
+    assert registry.cache.stats().get('second', {}).get('entries', 0) == 0
+
+
+def test_stats_are_reported_per_namespace(registry):
+    products, stores = registry.namespace('products'), registry.namespace('stores')
+    products.set('p1', {'id': 1})
+    products.get('p1')
+    products.get('p1')
+    products.get('missing')
+    stores.get('missing')
+
+    assert products.stats()['entries'] == 1
+    assert (products.stats()['hits'], products.stats()['misses']) == (2, 1)
+    assert (stores.stats()['hits'], stores.stats()['misses']) == (0, 1)
+
+    exported = registry.export_stats()
+    assert exported['total_entries'] == 1
+    assert exported['total_bytes'] == products.stats()['bytes']
+    assert set(exported['namespaces']) == {'products', 'stores'}
+
+
+def test_invalid_namespace_names_are_rejected(registry):
+    for name in ('', f'a{NAMESPACE_SEPARATOR}b'):
+        with pytest.raises(ValueError):
+            registry.namespace(name)
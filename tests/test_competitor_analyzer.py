@@ -0,0 +1,222 @@
+import math
+import random
+import warnings
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+import requests
+
+import legacy_competitor_analyzer as legacy
+from modules.competitor_analyzer import RENDER_PENDING, CompetitorAnalyzer
+
+STATIC_HTML = '<html><head><meta property="og:site_name" content="Tienda JS"></head><body><div id="app"></div></body></html>'
+RENDERED_HTML = '<div class="item-product"><span class="price">$1.500</span></div>' * 3
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return CompetitorAnalyzer()
+
+
+def http_response(status, body=b'', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.encoding = 'utf-8'
+    return response
+
+
+@pytest.fixture
+def with_browser_fallback(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer, 'browser_fallback', True)
+
+
+@pytest.mark.usefixtures('with_browser_fallback')
+def test_rendered_result_is_reused_while_the_page_is_unchanged(analyzer):
+    url = 'https://tienda-js.example/'
+    responses = [
+        http_response(200, STATIC_HTML.encode(), {'ETag': '"v1"'}),
+        http_response(304, headers={'ETag': '"v1"'})
+    ]
+    with mock.patch.object(analyzer.fetcher.http, 'get', side_effect=responses), \
+            mock.patch.object(analyzer.browser_pool, 'render', return_value=RENDERED_HTML) as render:
+        first = analyzer._fetch_store_info(url)
+        second = analyzer._fetch_store_info(url)
+    assert first['productos'] == 3
+    assert second == first
+    assert render.call_count == 1
+
+
+@pytest.mark.usefixtures('with_browser_fallback')
+def test_failed_render_keeps_validators_and_is_retried_on_the_next_fetch(analyzer):
+    url = 'https://tienda-js-caida.example/'
+    responses = [
+        http_response(200, STATIC_HTML.encode(), {'ETag': '"v1"'}),
+        http_response(304, headers={'ETag': '"v1"'}),
+        http_response(304, headers={'ETag': '"v1"'})
+    ]
+    with mock.patch.object(analyzer.fetcher.http, 'get', side_effect=responses) as get, \
+            mock.patch.object(analyzer.browser_pool, 'render', side_effect=[Exception('chrome'), RENDERED_HTML]) as render:
+        first = analyzer._fetch_store_info(url)
+        second = analyzer._fetch_store_info(url)
+        third = analyzer._fetch_store_info(url)
+    assert first['productos'] == 0
+    assert RENDER_PENDING not in first
+    # Tras el fallo se conservaron los validadores: la página no se volvió a descargar ni a parsear
+    assert get.call_args_list[1].kwargs['headers']['If-None-Match'] == '"v1"'
+    assert second['productos'] == 3
+    # El resultado renderizado reemplazó al estático junto a los mismos validadores
+    assert third == second
+    assert render.call_count == 2
+
+
+def test_browser_fallback_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('BROWSER_FALLBACK_ENABLED')
+    assert CompetitorAnalyzer().browser_fallback is False
+
+
+def generated_products(count, seed, days=45, history_points=8):
+    """Productos con historial de precios que incluye fechas fuera de la ventana de 30 días y fechas repetidas"""
+    rng = random.Random(seed)
+    today = date.today()
+    products = []
+    for i in range(count):
+        product = {'price': str(round(rng.uniform(50, 1500), 2)), 'category': rng.choice(['remeras', 'jeans', 'otros'])}
+        if rng.random() < 0.2:
+            product['discount_price'] = float(product['price']) * 0.9
+        if rng.random() < 0.8:
+            product['price_history'] = {
+                (today - timedelta(days=rng.randrange(days))).isoformat(): round(rng.uniform(50, 1500), 2)
+                for _ in range(history_points)
+            }
+        products.append(product)
+    return products
+
+
+HISTORY_CASES = {
+    'generada': generated_products(60, seed=1),
+    'un_punto': [{'price': 300, 'price_history': {date.today().isoformat(): 300}}],
+    'fechas_repetidas': [
+        {'price': 100, 'price_history': {(date.today() - timedelta(days=d)).isoformat(): 100 + d for d in range(8)}},
+        {'price': 200, 'price_history': {(date.today() - timedelta(days=d)).isoformat(): 200 - d for d in range(8)}}
+    ],
+    'sin_historial': [{'price': 120}, {'price': 130, 'price_history': {}}],
+    'vacio': []
+}
+
+
+@pytest.mark.parametrize('products', HISTORY_CASES.values(), ids=HISTORY_CASES.keys())
+def test_historical_prices_match_row_loop(analyzer, products):
+    assert analyzer._get_historical_prices(products) == legacy.get_historical_prices(products)
+
+
+@pytest.mark.parametrize('products', HISTORY_CASES.values(), ids=HISTORY_CASES.keys())
+def test_price_trends_match_row_loop(analyzer, products):
+    result = analyzer._analyze_price_trends(products)
+    expected = legacy.analyze_price_trends(products)
+    assert result['historical_trend'] == expected['historical_trend']
+    assert result['current_avg'] == pytest.approx(expected['current_avg'])
+    assert result['price_volatility'] == pytest.approx(expected['price_volatility'])
+    if expected['price_prediction'] is None:
+        assert result['price_prediction'] is None
+    else:
+        assert [p['date'] for p in result['price_prediction']] == [p['date'] for p in expected['price_prediction']]
+        assert [p['predicted_price'] for p in result['price_prediction']] == \
+            pytest.approx([p['predicted_price'] for p in expected['price_prediction']])
+
+
+@pytest.mark.parametrize('products', [HISTORY_CASES['un_punto'], HISTORY_CASES['fechas_repetidas']], ids=['un_punto', 'fechas_repetidas'])
+def test_batched_prediction_matches_per_day_prediction(analyzer, products):
+    history = legacy.get_historical_prices(products)
+    result = analyzer._predict_future_prices(history)
+    expected = legacy.predict_future_prices(history)
+    assert [p['date'] for p in result] == [p['date'] for p in expected]
+    assert [p['predicted_price'] for p in result] == pytest.approx([p['predicted_price'] for p in expected])
+
+
+PRICING_CASES = [generated_products(n, seed=n) for n in (1, 2, 5, 10, 40)] + [
+    [],
+    [{'price': 150, 'category': 'a'}, {'price': 150, 'category': 'a'}, {'price': 900, 'category': 'b', 'discount_price': 800}],
+    [{'price': 0}, {'price': 0}],
+    [{'price': 100}, {'category': 'x'}]
+]
+
+
+@pytest.mark.parametrize('products', PRICING_CASES)
+def test_pricing_strategy_matches_row_loop(analyzer, products):
+    assert analyzer._evaluate_pricing_strategy(products) == legacy.evaluate_pricing_strategy(products)
+
+
+@pytest.mark.parametrize('prices', [[], [0.0], [0.0, 0.0, 0.0], [0, 0.0]])
+def test_price_volatility_of_zero_or_empty_prices_does_not_warn(analyzer, prices):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        volatility = analyzer._calculate_price_volatility(prices)
+        score = analyzer._evaluate_pricing_strategy([{'price': price, 'category': 'a'} for price in prices])
+    assert volatility == 0 if len(prices) < 2 else math.isnan(volatility)
+    assert score == legacy.evaluate_pricing_strategy([{'price': price, 'category': 'a'} for price in prices])
+
+
+def random_store(rng, malformed=True):
+    """Tienda aleatoria con claves faltantes, catálogos vacíos y, si se pide, algunos datos malformados"""
+    store_info = {}
+    if rng.random() < 0.8:
+        store_info['social_networks'] = {
+            platform: {key: rng.choice([0, 500, 1500, 3, 5, 1001]) for key in ('followers', 'posts_last_month')
+                       if rng.random() < 0.7}
+            for platform in ('facebook', 'instagram', 'twitter', 'tiktok', 'youtube') if rng.random() < 0.5
+        }
+    if rng.random() < 0.8:
+        service = {}
+        for key, choices in (('avg_response_time', [0.5, 1, 2, 4, 4.5, 10]), ('customer_rating', [3.5, 4.0, 4.2, 4.5, 5]),
+                             ('support_channels', [[], ['email'], ['email', 'chat'], ['email', 'chat', 'tel']]),
+                             ('has_return_policy', [True, False, 1, 0, None])):
+            if rng.random() < 0.75:
+                service[key] = rng.choice(choices)
+        store_info['customer_service'] = service
+
+    products = []
+    for _ in range(rng.choice([0, 0, 1, 2, 5, 20, 150])):
+        product = {}
+        if not malformed or rng.random() < 0.97:
+            product['price'] = rng.choice([0, 0.0, 99.99, 100, 150, 500, 1000, 1000.01, round(rng.uniform(1, 3000), 2)])
+        if rng.random() < 0.6:
+            product['category'] = rng.choice(['a', 'b', 'c', 7])
+        if rng.random() < 0.2:
+            product['discount_price'] = rng.choice([0, None, 80])
+        products.append(product)
+
+    if not malformed:
+        return {'store_info': store_info, 'products': products}
+
+    kind = rng.random()
+    if kind < 0.03:
+        products = None
+    elif kind < 0.06:
+        store_info['social_networks'] = ['instagram']
+    elif kind < 0.09:
+        store_info.setdefault('social_networks', {})['instagram'] = {'followers': '2k'}
+    elif kind < 0.12:
+        store_info.setdefault('customer_service', {})['support_channels'] = 'email'
+    elif kind < 0.15 and products:
+        products[0]['category'] = ['no', 'hashable']
+    return {'store_info': store_info, 'products': products}
+
+
+def test_score_stores_matches_per_store_scores(analyzer):
+    rng = random.Random(11)
+    stores = [random_store(rng) for _ in range(500)]
+    stores += [
+        {'store_info': {}, 'products': []},
+        {'store_info': {}, 'products': [{'price': 0}, {'price': 0}]},
+        {'store_info': {'customer_service': {}}, 'products': [{'price': 120, 'category': 'a'}] * 3},
+        {'store_info': None, 'products': [{'price': 10}]}
+    ]
+    expected = [analyzer._calculate_competitive_score(store['store_info'], store['products']) for store in stores]
+    assert analyzer.score_stores(stores) == expected
+
+
+def test_score_stores_handles_an_empty_batch(analyzer):
+    assert analyzer.score_stores([]) == []
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from conftest import FIXTURES
+from modules.competitor_discovery import CompetitorDiscovery, ListingParser, normalize_domain
+from test_competitor_analyzer import http_response
+
+LISTING = 'https://www.tiendanube.com/tiendas/ropa'
+
+
+@pytest.fixture
+def discovery():
+    discovery = CompetitorDiscovery(':memory:')
+    yield discovery
+    discovery.close()
+
+
+def listing(pages):
+    """Listado falso: cada página tiene sus tiendas y apunta a la siguiente"""
+    def fetch(page_url):
+        index = 0 if page_url == LISTING else int(page_url.rsplit('=', 1)[1])
+        next_page = f'{LISTING}?page={index + 1}' if index + 1 < len(pages) else None
+        return [f'https://{domain}/' for domain in pages[index]], next_page
+    return fetch
+
+
+def test_slow_first_crawl_returns_what_was_found_in_time(discovery, monkeypatch):
+    release = threading.Event()
+    fetch = listing([['uno.com', 'dos.com'], ['tres.com']])
+
+    def slow_fetch(page_url):
+        if page_url != LISTING:
+            release.wait(5)
+        return fetch(page_url)
+
+    monkeypatch.setattr(discovery, '_fetch_listing', slow_fetch)
+    start = time.monotonic()
+    found = discovery.competitors('ropa', timeout=0.3)
+    assert time.monotonic() - start < 2
+    assert sorted(found) == ['https://dos.com/', 'https://uno.com/']
+
+    # El recorrido sigue en segundo plano y completa el nicho
+    release.set()
+    discovery.refresh_async('ropa').result(5)
+    assert len(discovery.competitors('ropa')) == 3
+
+
+def test_caller_timeout_is_capped_by_the_first_crawl_timeout(discovery, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(discovery, '_fetch_listing', lambda page_url: release.wait(5) and ([], None))
+    discovery.first_crawl_timeout = 0.2
+    start = time.monotonic()
+    assert discovery.competitors('ropa', timeout=30) == []
+    assert time.monotonic() - start < 2
+    release.set()
+
+
+def test_stores_not_seen_within_max_age_leave_the_list(discovery, monkeypatch):
+    monkeypatch.setattr(discovery, '_fetch_listing', listing([['viva.com', 'cerrada.com']]))
+    discovery.refresh('ropa')
+    old = time.time() - discovery.max_age - 60
+    discovery._conn.execute('UPDATE known_competitors SET last_seen = ? WHERE domain = ?', (old, 'cerrada.com'))
+    assert discovery.competitors('ropa') == ['https://viva.com/']
+
+    # El siguiente recorrido la borra si sigue sin aparecer
+    monkeypatch.setattr(discovery, '_fetch_listing', listing([['viva.com']]))
+    discovery.refresh('ropa')
+    assert discovery._known_domains('ropa') == {'viva.com'}
+
+
+def test_full_crawl_when_stores_are_close_to_expiring(discovery, monkeypatch):
+    pages = [['a.com'], ['b.com'], ['c.com'], ['profunda.com']]
+    monkeypatch.setattr(discovery, '_fetch_listing', listing(pages))
+    discovery.refresh('ropa')
+
+    # Sin tiendas por vencer el recorrido incremental corta antes de llegar a la última página
+    aging = time.time() - discovery.max_age * 0.4
+    discovery._conn.execute('UPDATE known_competitors SET last_seen = ? WHERE domain = ?', (aging, 'profunda.com'))
+    discovery.refresh('ropa')
+    assert discovery._oldest_seen('ropa') == pytest.approx(aging)
+
+    # Pasada la mitad del plazo se recorre todo el listado y se vuelve a marcar
+    aging = time.time() - discovery.max_age * 0.6
+    discovery._conn.execute('UPDATE known_competitors SET last_seen = ? WHERE domain = ?', (aging, 'profunda.com'))
+    discovery.refresh('ropa')
+    assert discovery._oldest_seen('ropa') > time.time() - 60
+
+
+def listing_page(name):
+    with open(os.path.join(FIXTURES, 'listings', name), 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('url, domain', [
+    ('https://www.Moda-Sur.com.ar/?utm_source=tiendanube', 'moda-sur.com.ar'),
+    ('http://urbana.store:80/productos/', 'urbana.store'),
+    ('https://www.kids-planet.com:443/', 'kids-planet.com'),
+    ('https://tienda.example:8080/', 'tienda.example:8080'),
+    ('/tiendas/ropa', ''),
+])
+def test_domains_are_normalized(url, domain):
+    assert normalize_domain(url) == domain
+
+
+def test_parser_takes_the_first_link_of_each_card_and_the_next_page():
+    parser = ListingParser()
+    parser.feed(listing_page('ropa_pagina_1.html').decode('utf-8'))
+    parser.close()
+    assert parser.store_links == [
+        'https://www.moda-sur.com.ar/?utm_source=tiendanube',
+        'http://Urbana.Store:80/productos/',
+        '//www.lanas-del-sur.com/',
+        '/tiendas/ropa/destacadas',
+        'https://moda-sur.com.ar/ofertas',
+    ]
+    assert parser.next_page == '/tiendas/ropa?page=2'
+
+
+def test_recorded_listing_is_crawled_and_deduplicated_across_pages(discovery, monkeypatch):
+    pages = {
+        LISTING: listing_page('ropa_pagina_1.html'),
+        f'{LISTING}?page=2': listing_page('ropa_pagina_2.html'),
+    }
+    http = mock.Mock()
+    http.get.side_effect = lambda url, **kwargs: http_response(200, pages[url])
+    monkeypatch.setattr(discovery, 'http', http)
+    monkeypatch.setattr(discovery, '_ua', mock.Mock(random='Mozilla/5.0 (pruebas)'))
+
+    assert discovery.refresh('ropa') == 4
+    assert [call.args[0] for call in http.get.call_args_list] == list(pages)
+    assert http.get.call_args.kwargs['headers'] == {'User-Agent': 'Mozilla/5.0 (pruebas)'}
+    # Se guarda la primera URL con la que apareció cada dominio
+    assert sorted(discovery.competitors('ropa')) == [
+        'http://Urbana.Store:80/productos/',
+        'https://www.kids-planet.com:443/',
+        'https://www.lanas-del-sur.com/',
+        'https://www.moda-sur.com.ar/?utm_source=tiendanube',
+    ]
+    assert discovery._known_domains('ropa') == {'moda-sur.com.ar', 'urbana.store', 'lanas-del-sur.com', 'kids-planet.com'}
@@ -0,0 +1,89 @@
+import pickle
+import time
+import zlib
+
+import pytest
+
+from modules.cache_manager import CacheManager
+from modules.disk_cache import DiskCache
+from test_cache_manager import FakeClock
+
+
+@pytest.fixture
+def disk(tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'))
+    yield disk
+    disk.close()
+
+
+def raw_rows(disk):
+    with disk._lock:
+        return disk._conn.execute('SELECT key, value FROM cache_entries ORDER BY key').fetchall()
+
+
+def test_values_round_trip_through_zlib_and_pickle(disk):
+    value = {'products': [{'id': i, 'name': 'Remera lisa', 'price': 1500.5} for i in range(50)], 'tags': {'a', 'b'}}
+    disk.set('key', value, ttl=60, stale_ttl=30, tags=['store:7', 'store:7:products'])
+
+    (key, blob), = raw_rows(disk)
+    assert pickle.loads(zlib.decompress(blob)) == value
+    assert len(blob) < len(pickle.dumps(value))
+
+    stored, fresh_remaining, remaining, tags = disk.get('key')
+    assert stored == value
+    assert 55 < fresh_remaining <= 60
+    assert 85 < remaining <= 90
+    assert tags == {'store:7', 'store:7:products'}
+
+
+def test_unpicklable_values_stay_only_in_memory(disk):
+    cache = CacheManager(disk_cache=disk)
+    loader = lambda: None
+    cache.set('fn', loader)
+    assert raw_rows(disk) == []
+    assert cache.get('fn') is loader
+
+
+def test_expired_entries_are_not_returned(disk):
+    disk.set('expired', 'old', ttl=-1)
+    disk.set('stale', 'old', ttl=-1, stale_ttl=60)
+    assert disk.get('expired') is None
+
+    value, fresh_remaining, remaining, _ = disk.get('stale')
+    assert value == 'old'
+    assert fresh_remaining < 0 < remaining
+
+
+def test_compaction_runs_in_background(tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), compaction_interval=0.05)
+    try:
+        disk.set('expired', 'old', ttl=-1, tags=['t'])
+        disk.set('live', 'new', ttl=60, tags=['t'])
+        deadline = time.monotonic() + 5
+        while [key for key, _ in raw_rows(disk)] != ['live']:
+            assert time.monotonic() < deadline, 'la compactación no eliminó la entrada expirada'
+            time.sleep(0.01)
+        with disk._lock:
+            tagged = disk._conn.execute('SELECT key FROM cache_tags').fetchall()
+        assert tagged == [('live',)]
+    finally:
+        disk.close()
+
+
+def test_disk_hits_are_promoted_with_their_remaining_ttl(disk):
+    CacheManager(disk_cache=disk).set('key', 'value', ttl=60, tags=['store:7'])
+
+    clock = FakeClock()
+    cache = CacheManager(disk_cache=disk, clock=clock)
+    assert cache.get('key') == 'value'
+    assert len(cache) == 1
+    assert cache._cache['key'].tags == {'store:7'}
+
+    # Ya promovida, se sirve desde memoria aunque desaparezca del disco...
+    with disk._lock:
+        disk._conn.execute('DELETE FROM cache_entries')
+    assert cache.get('key') == 'value'
+
+    # ...hasta que vence el TTL que le quedaba en el disco
+    clock.advance(61)
+    assert cache.get('key') is None
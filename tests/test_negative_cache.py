@@ -0,0 +1,124 @@
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from modules.cache_manager import CacheManager
+from modules.cache_registry import CacheNamespace
+from modules.competitor_analyzer import CompetitorAnalyzer
+from modules.http_client import RateLimitedError
+from modules.negative_cache import NegativeCache, classify_error
+from test_cache_manager import FakeClock
+from test_resilience import http_error
+
+STORE_URL = 'https://tienda.example.com'
+STORE_INFO = {'nombre': 'Tienda', 'productos': [{'nombre': 'Remera', 'precio': 1500.0}]}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def namespace(clock, name):
+    return CacheNamespace(CacheManager(max_entries=100, max_bytes=10 ** 6, clock=clock), name, 60)
+
+
+@pytest.fixture
+def negative(clock):
+    negative = NegativeCache()
+    negative.cache = namespace(clock, 'negative_results')
+    return negative
+
+
+@pytest.mark.parametrize('error, kind', [
+    (http_error(404), 'not_found'),
+    (http_error(410), 'not_found'),
+    (http_error(429), 'rate_limited'),
+    (http_error(403), 'client_error'),
+    (http_error(503), 'server_error'),
+    (requests.exceptions.ReadTimeout('lento'), 'timeout'),
+    (requests.exceptions.ConnectionError('sin conexión'), 'connection'),
+    (RateLimitedError('limitado'), 'rate_limited'),
+    (ValueError('HTML inválido'), 'invalid_content'),
+    (RuntimeError('otro'), 'unknown'),
+])
+def test_errors_are_classified(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_each_error_class_expires_after_its_own_ttl(negative, clock):
+    assert negative.ttls['not_found'] == 3600
+    assert negative.ttls['timeout'] == 60
+    negative.record('store_info', 'https://borrada.example.com', http_error(404))
+    negative.record('store_info', 'https://lenta.example.com', requests.exceptions.ReadTimeout('lento'))
+
+    clock.advance(59)
+    assert negative.check('store_info', 'https://lenta.example.com')['kind'] == 'timeout'
+    clock.advance(2)
+    assert negative.check('store_info', 'https://lenta.example.com') is None
+    assert negative.check('store_info', 'https://borrada.example.com')['kind'] == 'not_found'
+
+    clock.advance(3600)
+    assert negative.check('store_info', 'https://borrada.example.com') is None
+    assert negative.stats() == {
+        'recorded': {'not_found': 1, 'timeout': 1},
+        'avoided': {'timeout': 1, 'not_found': 1},
+        'total_avoided': 2
+    }
+
+
+def test_ttls_can_be_configured_per_error_class(monkeypatch):
+    monkeypatch.setenv('NEGATIVE_CACHE_TTL_TIMEOUT', '5')
+    assert NegativeCache().ttls['timeout'] == 5
+
+
+@pytest.fixture(scope='module')
+def shared_analyzer():
+    return CompetitorAnalyzer()
+
+
+@pytest.fixture
+def analyzer(shared_analyzer, negative, clock, monkeypatch):
+    monkeypatch.setattr(shared_analyzer, 'cache', namespace(clock, 'competitor_analyzer'))
+    monkeypatch.setattr(shared_analyzer, 'negative_cache', negative)
+    monkeypatch.setattr(shared_analyzer, '_fetch_store_info', mock.Mock(return_value=STORE_INFO))
+    return shared_analyzer
+
+
+def test_recorded_failure_does_not_hide_a_cached_store(analyzer, negative):
+    analyzer.cache.set(STORE_URL, STORE_INFO)
+    negative.record('store_info', STORE_URL, requests.exceptions.ReadTimeout('lento'))
+
+    assert analyzer._get_store_info(STORE_URL) == STORE_INFO
+    analyzer._fetch_store_info.assert_not_called()
+    assert negative.stats()['total_avoided'] == 0
+
+
+def test_stale_store_is_served_while_a_failure_is_recorded(analyzer, negative, clock):
+    analyzer.cache.set(STORE_URL, STORE_INFO, ttl=10, stale_ttl=100)
+    clock.advance(20)
+    negative.record('store_info', STORE_URL, requests.exceptions.ReadTimeout('lento'))
+
+    assert analyzer._get_store_info(STORE_URL) == STORE_INFO
+    in_flight = analyzer.cache._manager._in_flight
+    deadline = time.monotonic() + 5
+    while in_flight:
+        assert time.monotonic() < deadline, 'la revalidación en segundo plano no terminó'
+        time.sleep(0.01)
+
+    # La revalidación se salteó por el fallo registrado y la versión vencida se conserva
+    analyzer._fetch_store_info.assert_not_called()
+    assert analyzer._get_store_info(STORE_URL) == STORE_INFO
+
+
+def test_recorded_failure_skips_the_fetch_on_a_cache_miss(analyzer, negative):
+    negative.record('store_info', STORE_URL, http_error(404))
+
+    assert analyzer._get_store_info(STORE_URL) == {'error': 'Error al obtener información de la tienda: 404'}
+    analyzer._fetch_store_info.assert_not_called()
+
+    negative.forget('store_info', STORE_URL)
+    assert analyzer._get_store_info(STORE_URL) == STORE_INFO
+    analyzer._fetch_store_info.assert_called_once_with(STORE_URL)
@@ -0,0 +1,112 @@
+import random
+import sqlite3
+from unittest import mock
+
+import pytest
+
+from modules.price_index import DEFAULT_CATEGORY, PriceIndex, QuantileSketch
+
+
+@pytest.fixture
+def index():
+    index = PriceIndex(':memory:')
+    yield index
+    index.close()
+
+
+def test_reindexing_a_changed_store_replaces_its_prices(index):
+    index.observe_store('https://a.example', [100.0, 200.0, 300.0])
+    index.observe_store('https://b.example', [150.0, 250.0])
+    assert index.add_store('ropa', 'https://a.example')
+    assert index.add_store('ropa', 'https://b.example')
+    assert index.summary('ropa')['count'] == 5
+
+    index.observe_store('https://a.example', [1000.0, 2000.0, 3000.0])
+    assert index.add_store('ropa', 'https://a.example')
+    summary = index.summary('ropa')
+    assert summary['count'] == 5
+    assert summary['min'] == 150.0 and summary['max'] == 3000.0
+
+
+def test_unchanged_store_is_not_counted_twice(index):
+    index.observe_store('https://a.example', [100.0, 200.0])
+    assert index.add_store('ropa', 'https://a.example')
+    index.observe_store('https://a.example', [100.0, 200.0])
+    assert not index.add_store('ropa', 'https://a.example')
+    assert index.summary('ropa')['count'] == 2
+
+
+def test_rebuilt_sketch_is_persisted(index):
+    index.observe_store('https://a.example', [100.0, 200.0])
+    index.add_store('ropa', 'https://a.example')
+    index.observe_store('https://a.example', [500.0])
+    index.add_store('ropa', 'https://a.example')
+    index._sketches.clear()
+    assert index.summary('ropa')['count'] == 1
+
+
+def test_sketch_quantiles_stay_within_relative_accuracy():
+    rng = random.Random(3)
+    values = sorted(rng.lognormvariate(7, 1) for _ in range(20000))
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(values)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+    assert sketch.rank(values[len(values) // 2]) == pytest.approx(50, abs=1)
+
+
+def test_changed_store_is_subtracted_without_rebuilding_the_niche(index, monkeypatch):
+    rng = random.Random(11)
+    stores = {f'https://{n}.example': [round(rng.uniform(10, 5000), 2) for _ in range(50)] for n in range(20)}
+    for url, prices in stores.items():
+        index.observe_store(url, prices)
+        index.add_store('ropa', url)
+
+    monkeypatch.setattr(index, '_rebuild', mock.Mock(side_effect=AssertionError('no debe recorrer el nicho')))
+    stores['https://3.example'] = [0.0, 7.5, 9000.0]
+    stores['https://4.example'] = [round(rng.uniform(10, 5000), 2) for _ in range(80)]
+    for url in ('https://3.example', 'https://4.example'):
+        index.observe_store(url, stores[url])
+        assert index.add_store('ropa', url)
+
+    expected = QuantileSketch(index.relative_accuracy, index.max_buckets)
+    for prices in stores.values():
+        expected.update(prices)
+    sketch = index._sketches[('ropa', DEFAULT_CATEGORY)]
+    assert (sketch.count, sketch.zero_count, sketch.min, sketch.max) == \
+        (expected.count, expected.zero_count, expected.min, expected.max)
+    assert sketch.total == pytest.approx(expected.total)
+    for q in (0.1, 0.5, 0.9):
+        assert sketch.quantile(q) == expected.quantile(q)
+
+    # Al desaparecer los precios extremos se recalculan con los de las demás tiendas
+    index.observe_store('https://3.example', [100.0])
+    index.add_store('ropa', 'https://3.example')
+    summary = index.summary('ropa')
+    assert summary['min'] == min(min(p) for url, p in stores.items() if url != 'https://3.example')
+    assert summary['max'] == max(max(p) for url, p in stores.items() if url != 'https://3.example')
+
+
+def test_store_indexed_by_an_older_schema_is_rebuilt_once(tmp_path):
+    path = str(tmp_path / 'prices.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE indexed_stores (niche TEXT NOT NULL, category TEXT NOT NULL, url TEXT NOT NULL, '
+                 'fingerprint TEXT NOT NULL, PRIMARY KEY (niche, category, url))')
+    conn.execute("INSERT INTO indexed_stores VALUES ('ropa', 'general', 'https://a.example', 'viejo')")
+    conn.commit()
+    conn.close()
+
+    index = PriceIndex(path)
+    try:
+        index.observe_store('https://a.example', [100.0, 200.0])
+        index.observe_store('https://b.example', [300.0])
+        assert index.add_store('ropa', 'https://b.example')
+        assert index.add_store('ropa', 'https://a.example')
+        assert index.summary('ropa')['count'] == 3
+
+        index.observe_store('https://a.example', [150.0])
+        assert index.add_store('ropa', 'https://a.example')
+        assert index.summary('ropa')['count'] == 2
+    finally:
+        index.close()
@@ -0,0 +1,51 @@
+import pytest
+import requests
+
+from modules.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, Resilience
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f'{status}', response=response)
+
+
+def failing(status):
+    def call():
+        raise http_error(status)
+    return call
+
+
+@pytest.fixture
+def resilience(monkeypatch):
+    monkeypatch.setenv('CIRCUIT_FAILURE_THRESHOLD', '3')
+    monkeypatch.setenv('CIRCUIT_RECOVERY_SECONDS', '0')
+    return Resilience()
+
+
+def test_client_errors_do_not_reset_consecutive_failures(resilience):
+    breaker = resilience.breaker('api')
+    breaker.recovery_timeout = 60
+    for status in (500, 404, 500, 404, 500):
+        with pytest.raises(requests.exceptions.HTTPError):
+            resilience.call('api', failing(status), retries=0)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        resilience.call('api', lambda: 'ok')
+
+
+def test_client_error_on_half_open_trial_keeps_circuit_half_open(resilience):
+    breaker = resilience.breaker('api')
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            resilience.call('api', failing(503), retries=0)
+    assert breaker.state == OPEN
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.call('api', failing(404), retries=0)
+    assert breaker.state == HALF_OPEN
+    assert breaker.failures == 3
+
+    # El lugar de prueba quedó libre: el siguiente pedido exitoso cierra el circuito
+    assert resilience.call('api', lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
@@ -0,0 +1,87 @@
+import glob
+import os
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import FIXTURES
+from modules.storefront_extractor import extract_store_features
+
+STOREFRONTS = sorted(glob.glob(os.path.join(FIXTURES, 'storefronts', '*.html')))
+
+
+def legacy_parse_store_info(html):
+    """Extracción con BeautifulSoup tal como la hacía CompetitorAnalyzer antes del extractor de un recorrido"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    social_links = []
+    for link in soup.find_all('a', href=True):
+        for platform, pattern in {'facebook': r'facebook\.com', 'instagram': r'instagram\.com',
+                                  'twitter': r'twitter\.com', 'tiktok': r'tiktok\.com'}.items():
+            if re.search(pattern, link['href'], re.I):
+                social_links.append(platform)
+
+    payment_methods = []
+    payment_section = soup.find('div', class_=re.compile(r'payment-methods|medios-pago'))
+    if payment_section:
+        payment_methods = [img['alt'] for img in payment_section.find_all('img', alt=True)]
+
+    shipping_methods = []
+    shipping_section = soup.find('div', class_=re.compile(r'shipping-methods|metodos-envio'))
+    if shipping_section:
+        shipping_methods = [method.text.strip() for method in shipping_section.find_all(['span', 'p'])]
+
+    prices = []
+    for price in soup.find_all('span', {'class': 'price'}):
+        try:
+            prices.append(float(price.text.strip().replace('$', '').replace('.', '').replace(',', '.')))
+        except ValueError:
+            continue
+    price_range = {'min': min(prices), 'max': max(prices), 'avg': sum(prices) / len(prices)} if prices \
+        else {'min': 0, 'max': 0, 'avg': 0}
+
+    return {
+        'nombre': soup.find('meta', property='og:site_name')['content'] if soup.find('meta', property='og:site_name') else '',
+        'descripcion': soup.find('meta', property='og:description')['content'] if soup.find('meta', property='og:description') else '',
+        'productos': len(soup.find_all('div', class_='item-product')) if soup.find_all('div', class_='item-product') else 0,
+        'categorias': len(soup.find_all('a', class_='item-category')) if soup.find_all('a', class_='item-category') else 0,
+        'redes_sociales': list(set(social_links)),
+        'medios_pago': payment_methods,
+        'envios': shipping_methods,
+        'envio_gratis': bool(soup.find(string=lambda t: 'envío gratis' in t.lower() if t else False)),
+        'rango_precios': price_range,
+        'tiene_descuentos': bool(soup.find(string=lambda t: 'descuento' in t.lower() if t else False)),
+        'tiene_chat': bool(soup.find(string=lambda t: 'chat' in t.lower() if t else False)),
+        'tiene_blog': bool(soup.find('a', href=lambda h: 'blog' in h.lower() if h else False)),
+        'tiene_wishlist': bool(soup.find(string=lambda t: 'wishlist' in t.lower() or 'favoritos' in t.lower() if t else False)),
+        'tiene_reviews': bool(soup.find(string=lambda t: 'review' in t.lower() or 'opiniones' in t.lower() if t else False)),
+        'tiene_meta_desc': bool(soup.find('meta', {'name': 'description'})),
+        'tiene_alt_imgs': bool(soup.find('img', alt=True))
+    }
+
+
+def normalize(features):
+    """Las redes sociales se comparan como conjunto: el orden venía de un set"""
+    return dict(features, redes_sociales=sorted(features['redes_sociales']))
+
+
+@pytest.mark.parametrize('path', STOREFRONTS, ids=os.path.basename)
+def test_extractor_matches_beautifulsoup_output(path):
+    with open(path, encoding='utf-8') as f:
+        html = f.read()
+    assert normalize(extract_store_features(html)) == normalize(legacy_parse_store_info(html))
+
+
+def test_fixtures_cover_products_and_sections():
+    with open(os.path.join(FIXTURES, 'storefronts', 'tienda_ropa.html'), encoding='utf-8') as f:
+        features = extract_store_features(f.read())
+    assert features['productos'] == 4
+    assert features['medios_pago'] == ['Visa', 'Mastercard', 'Mercado Pago']
+    assert features['rango_precios']['min'] == 12500.0
+
+
+def test_prices_are_collected_in_the_same_pass():
+    prices = []
+    extract_store_features('<span class="price">$1.200,50</span><span class="price">n/d</span>', prices)
+    assert prices == [1200.5]